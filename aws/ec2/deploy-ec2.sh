@@ -192,6 +192,8 @@ Environment="PATH=/opt/missing-roles-agent/venv/bin"
 ExecStart=/opt/missing-roles-agent/venv/bin/gunicorn \
     --bind 127.0.0.1:8000 \
     --workers 3 \
+    --worker-class gthread \
+    --threads 8 \
     --timeout 120 \
     --access-logfile - \
     --error-logfile - \
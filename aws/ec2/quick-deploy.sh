@@ -170,6 +170,8 @@ Environment="PATH=${APP_DIR}/venv/bin"
 ExecStart=${APP_DIR}/venv/bin/gunicorn \
     --bind 127.0.0.1:8000 \
     --workers 3 \
+    --worker-class gthread \
+    --threads 8 \
     --timeout 120 \
     --access-logfile - \
     --error-logfile - \
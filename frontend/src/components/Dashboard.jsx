@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { getJobRoleStats, getWorkloadStats } from '../services/api';
+import { getDashboardSnapshot } from '../services/api';
 import { Link } from 'react-router-dom';
 
 export default function Dashboard() {
@@ -13,12 +13,9 @@ export default function Dashboard() {
 
   const loadData = async () => {
     try {
-      const [statsRes, workloadRes] = await Promise.all([
-        getJobRoleStats(),
-        getWorkloadStats()
-      ]);
-      setStats(statsRes.data);
-      setWorkloadStats(workloadRes.data);
+      const { data } = await getDashboardSnapshot();
+      setStats(data.job_roles);
+      setWorkloadStats(data.workload);
     } catch (error) {
       console.error('Error loading dashboard data:', error);
     } finally {
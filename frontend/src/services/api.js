@@ -10,19 +10,23 @@ const api = axios.create({
 });
 
 // Job Roles API
-export const getJobRoles = () => api.get('/job-roles/');
+export const getJobRoles = (params = {}) => api.get('/job-roles/', { params });
 export const getJobRoleStats = () => api.get('/job-roles/statistics/');
 export const getJobRolesByDepartment = () => api.get('/job-roles/by_department/');
 export const getOrgChart = () => api.get('/job-roles/org_chart/');
 
 // Employees API
-export const getEmployees = () => api.get('/employees/');
+export const getEmployees = (params = {}) => api.get('/employees/', { params });
 export const getWorkloadStats = () => api.get('/employees/workload_stats/');
 
+// Dashboard API (all dashboard numbers in one response)
+export const getDashboardSnapshot = () => api.get('/dashboard/snapshot/');
+
 // Analysis API
 export const getAnalysisRuns = () => api.get('/analysis-runs/');
-export const getLatestAnalysis = () => api.get('/analysis-runs/latest/');
-export const getAnalysisById = (id) => api.get(`/analysis-runs/${id}/`);
+export const getLatestAnalysis = () => api.get('/analysis-runs/latest/', { params: { expand: 'missing_roles' } });
+export const getAnalysisById = (id) => api.get(`/analysis-runs/${id}/`, { params: { expand: 'missing_roles' } });
+export const getAnalysisSection = (id, section) => api.get(`/analysis-runs/${id}/sections/${section}/`);
 export const triggerAnalysis = (departments = null) => {
   const data = departments ? { departments } : {};
   return api.post('/analysis-runs/trigger/', data);
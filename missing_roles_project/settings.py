@@ -3,6 +3,7 @@ Django settings for Missing Job Roles AI Agent project.
 """
 
 from pathlib import Path
+import json
 import os
 from dotenv import load_dotenv
 
@@ -57,6 +58,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # For static files in production
+    'roles_analyzer.middleware.CompressionMiddleware',  # Brotli (if installed) or gzip for large responses
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -107,6 +109,18 @@ DATABASES = {
     'default': db_config
 }
 
+# Cache
+# LocMemCache is per-process; with several gunicorn workers point CACHE_BACKEND
+# at a shared backend (e.g. django.core.cache.backends.redis.RedisCache) so that
+# write invalidation reaches every worker.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'roles-analyzer'),
+        'TIMEOUT': int(os.getenv('CACHE_TIMEOUT', '300')),
+    }
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -175,5 +189,73 @@ AI_CONFIG = {
     'TEMPERATURE': float(os.getenv('LLM_TEMPERATURE', '0.2')),
     'OPENAI_API_KEY': os.getenv('OPENAI_API_KEY', ''),
     'ANTHROPIC_API_KEY': os.getenv('ANTHROPIC_API_KEY', ''),
+    # Ordered "provider:model" list, e.g. "openai:gpt-4o,anthropic:claude-3-5-sonnet-latest";
+    # two or more routes enable failover (and hedging) across providers
+    'ROUTES': os.getenv('LLM_ROUTES', ''),
+    'HEDGE': os.getenv('LLM_HEDGE', 'True') == 'True',
+    'ROUTE_MAX_RETRIES': int(os.getenv('LLM_ROUTE_MAX_RETRIES', '1')),
+    'REQUEST_TIMEOUT': float(os.getenv('LLM_REQUEST_TIMEOUT', '60')),
+    # Per-node model and temperature; an empty model falls back to MODEL. A model
+    # may also be a "provider:model,..." route list
+    'NODE_MODELS': {
+        'org_structure': {'model': os.getenv('LLM_ANALYZER_MODEL', ''), 'temperature': 0.1},
+        'responsibilities': {'model': os.getenv('LLM_ANALYZER_MODEL', ''), 'temperature': 0.1},
+        'workload': {'model': os.getenv('LLM_ANALYZER_MODEL', ''), 'temperature': 0.1},
+        'skills': {'model': os.getenv('LLM_ANALYZER_MODEL', ''), 'temperature': 0.1},
+        'synthesize': {'model': os.getenv('LLM_SYNTHESIS_MODEL', ''), 'temperature': 0.3},
+    },
+    # Prompts above this estimated size go to LARGE_PROMPT_MODEL regardless of node (0 disables)
+    'LARGE_PROMPT_TOKENS': int(os.getenv('LLM_LARGE_PROMPT_TOKENS', '0')),
+    'LARGE_PROMPT_MODEL': os.getenv('LLM_LARGE_PROMPT_MODEL', ''),
+    # Serialization of agent input tables (json, json_compact, tsv, tsv_dict) and the
+    # token budget for each agent's data; over budget, sections are summarized then truncated
+    'PROMPT_ENCODING': os.getenv('LLM_PROMPT_ENCODING', 'tsv'),
+    'PROMPT_TOKEN_BUDGET': int(os.getenv('LLM_PROMPT_TOKEN_BUDGET', '12000')),
+    # USD per 1M tokens by model-name prefix, for per-node cost estimates; cached_input
+    # and cache_write price prompt-prefix cache reads and writes (default: input price)
+    'MODEL_PRICES': json.loads(os.getenv('LLM_MODEL_PRICES', 'null')) or {
+        'gpt-4o-mini': {'input': 0.15, 'cached_input': 0.075, 'output': 0.60},
+        'gpt-4o': {'input': 2.50, 'cached_input': 1.25, 'output': 10.00},
+        'gpt-4-turbo': {'input': 10.00, 'output': 30.00},
+        'gpt-4': {'input': 30.00, 'output': 60.00},
+        'claude-3-5-haiku': {'input': 0.80, 'cached_input': 0.08, 'cache_write': 1.00, 'output': 4.00},
+        'claude-3-5-sonnet': {'input': 3.00, 'cached_input': 0.30, 'cache_write': 3.75, 'output': 15.00},
+        'claude-3-haiku': {'input': 0.25, 'cached_input': 0.03, 'cache_write': 0.30, 'output': 1.25},
+    },
+    # Chatbot answers reused for near-identical questions on unchanged data
+    'SEMANTIC_CACHE': {
+        'ENABLED': os.getenv('CHAT_SEMANTIC_CACHE', 'True') == 'True',
+        'SIMILARITY': float(os.getenv('CHAT_SEMANTIC_CACHE_SIMILARITY', '0.9')),
+        'MAX_ENTRIES': int(os.getenv('CHAT_SEMANTIC_CACHE_MAX_ENTRIES', '2000')),
+    },
+    # Seconds after which an identical analysis no longer waits on a run whose worker died
+    'ANALYSIS_LOCK_TTL': int(os.getenv('ANALYSIS_LOCK_TTL', '1800')),
+    # Background analysis runs executing at once per process, and runs allowed to wait for one
+    'ANALYSIS_WORKERS': int(os.getenv('ANALYSIS_WORKERS', '2')),
+    'ANALYSIS_QUEUE_SIZE': int(os.getenv('ANALYSIS_QUEUE_SIZE', '10')),
+    # A pending/running run whose worker has not renewed its heartbeat for this long is failed
+    'ANALYSIS_LEASE_SECONDS': int(os.getenv('ANALYSIS_LEASE_SECONDS', '120')),
+    # Change-driven background analysis (python manage.py run_analysis_scheduler --loop)
+    'ANALYSIS_SCHEDULER': {
+        # Quiet period after the last edit before a run starts, and the longest a change waits regardless
+        'DEBOUNCE_MINUTES': float(os.getenv('ANALYSIS_SCHEDULER_DEBOUNCE_MINUTES', '15')),
+        'MAX_DELAY_MINUTES': float(os.getenv('ANALYSIS_SCHEDULER_MAX_DELAY_MINUTES', '720')),
+        'MIN_INTERVAL_MINUTES': float(os.getenv('ANALYSIS_SCHEDULER_MIN_INTERVAL_MINUTES', '60')),
+        # Comma-separated HH:MM-HH:MM ranges in TIME_ZONE (may wrap midnight); empty means any time
+        'WINDOWS': os.getenv('ANALYSIS_SCHEDULER_WINDOWS', '20:00-07:00'),
+        'QUIET_HOURS': os.getenv('ANALYSIS_SCHEDULER_QUIET_HOURS', ''),
+        # LLM spend of all analysis runs per day, in USD (0 disables the limit)
+        'DAILY_BUDGET_USD': float(os.getenv('ANALYSIS_SCHEDULER_DAILY_BUDGET_USD', '0')),
+    },
+    # LangGraph checkpoints of analysis runs (resume after a failed node)
+    'CHECKPOINT_DB': os.getenv('ANALYSIS_CHECKPOINT_DB', str(BASE_DIR / 'analysis_checkpoints.sqlite3')),
+    # Provider limits shared by all workers (0 disables the limit)
+    'RATE_LIMIT': {
+        'REQUESTS_PER_MINUTE': int(os.getenv('LLM_REQUESTS_PER_MINUTE', '0')),
+        'TOKENS_PER_MINUTE': int(os.getenv('LLM_TOKENS_PER_MINUTE', '0')),
+        'BACKGROUND_RESERVE': float(os.getenv('LLM_BACKGROUND_RESERVE', '0.2')),
+        'MAX_RETRIES': int(os.getenv('LLM_MAX_RETRIES', '5')),
+        'MAX_WAIT': float(os.getenv('LLM_MAX_WAIT', '300')),
+    },
 }
 
@@ -2,7 +2,25 @@
 Django Admin configuration for Job Roles Analyzer
 """
 from django.contrib import admin
-from .models import JobRole, Employee, AnalysisRun, MissingRole, Conversation, ConversationMessage
+from .models import (
+    CanonicalTitle, Skill, JobRole, Employee, AnalysisRun, MissingRole, DashboardSnapshot,
+    Conversation, ConversationMessage
+)
+
+
+@admin.register(CanonicalTitle)
+class CanonicalTitleAdmin(admin.ModelAdmin):
+    list_display = ['id', 'title', 'normalized_key', 'created_at']
+    search_fields = ['title', 'normalized_key']
+    readonly_fields = ['created_at']
+    ordering = ['title']
+
+
+@admin.register(Skill)
+class SkillAdmin(admin.ModelAdmin):
+    list_display = ['id', 'name', 'normalized_name']
+    search_fields = ['name', 'normalized_name']
+    ordering = ['name']
 
 
 @admin.register(JobRole)
@@ -37,6 +55,12 @@ class MissingRoleAdmin(admin.ModelAdmin):
     ordering = ['-analysis_run__run_date', 'priority']
 
 
+@admin.register(DashboardSnapshot)
+class DashboardSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['id', 'version', 'org_stale', 'analysis_stale', 'refreshed_at']
+    readonly_fields = ['version', 'data', 'refreshed_at']
+
+
 @admin.register(Conversation)
 class ConversationAdmin(admin.ModelAdmin):
     list_display = ['conversation_id', 'message_count', 'created_at', 'updated_at']
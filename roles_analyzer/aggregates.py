@@ -0,0 +1,56 @@
+"""
+DB-side aggregate queries shared by the API views
+"""
+from collections import OrderedDict
+from django.db.models import Count, Sum
+
+from .models import JobRole
+from .serializers import JobRoleSerializer
+from .cache_utils import cached_for_data
+
+
+def job_role_statistics() -> dict:
+    """Overall job role statistics computed with DB-side aggregation (2 queries)"""
+    totals = JobRole.objects.aggregate(
+        total_roles=Count('role_id'),
+        total_headcount=Sum('current_headcount'),
+    )
+    departments = list(
+        JobRole.objects.order_by('department').values_list('department', flat=True).distinct()
+    )
+    return {
+        'total_roles': totals['total_roles'],
+        'total_headcount': totals['total_headcount'] or 0,
+        'total_departments': len(departments),
+        'departments': departments,
+    }
+
+
+def job_roles_by_department() -> dict:
+    """Job roles grouped by department from a single ordered fetch"""
+    roles = JobRole.objects.order_by('department', 'level', 'role_title')
+    result = OrderedDict()
+    for role_data in JobRoleSerializer(roles, many=True).data:
+        result.setdefault(role_data['department'], []).append(role_data)
+    return result
+
+
+def org_statistics() -> dict:
+    """
+    Job role statistics alone (2 queries on a miss)
+    
+    Cached until the next JobRole/Employee write bumps the org data version.
+    """
+    return cached_for_data('org', 'org_statistics', job_role_statistics)
+
+
+def org_summary() -> dict:
+    """
+    Combined job role statistics and roles-by-department
+    
+    Cached until the next JobRole/Employee write bumps the org data version.
+    """
+    return cached_for_data('org', 'org_summary', lambda: {
+        'statistics': org_statistics(),
+        'by_department': job_roles_by_department(),
+    })
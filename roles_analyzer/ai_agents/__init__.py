@@ -1,7 +1,7 @@
 """
 AI Agents for Missing Job Roles Analysis
 """
-from .workflow import create_analysis_workflow, run_analysis
+from .workflow import create_analysis_workflow, run_analysis, resume_analysis, can_resume_analysis
 
-__all__ = ['create_analysis_workflow', 'run_analysis']
+__all__ = ['create_analysis_workflow', 'run_analysis', 'resume_analysis', 'can_resume_analysis']
 
@@ -1,11 +1,19 @@
 """
 Individual AI agents for analyzing different aspects of organizational structure
 """
-import json
 import sys
-from typing import Dict, Any
+import time
+from collections import Counter
+from typing import Dict, Any, List, Tuple
 from langchain_core.prompts import ChatPromptTemplate
-from .llm_factory import get_llm
+from langchain_core.runnables import RunnableConfig
+from .llm_factory import get_llm, bind_structured_output, stream_text
+from .model_policy import select_model, usage_metrics
+from .prompt_encoding import (
+    PromptSection, describe_sections, encode_table, fit_to_budget, format_note, prompt_settings,
+)
+from .json_stream import IncrementalJSONArrayParser
+from .recommendation_schema import RecommendationBatch, validate_recommendation
 from .state import AnalysisState
 
 # Set UTF-8 encoding for stdout on Windows
@@ -34,52 +42,194 @@ except ImportError:
     print = safe_print
 
 
-def org_structure_analyzer(state: AnalysisState) -> Dict[str, Any]:
+def _invoke_node(node: str, prompt: ChatPromptTemplate, inputs: Dict[str, Any],
+                 default_temperature: float, sections: List[PromptSection] = None) -> Tuple[Any, Dict[str, Any]]:
     """
-    Analyzes organizational structure for gaps and inefficiencies
-    - Span of control issues
-    - Missing management layers
-    - Reporting structure problems
+    Run a node's prompt on the model its policy selects
+    
+    Args:
+        sections: Encoded data sections already rendered into inputs; their
+                  sizes are added to the metrics
+    
+    Returns:
+        (AI message, {node: usage metrics}) for the node_metrics state key
     """
-    print("🔍 Running Organizational Structure Analysis...")
+    messages = prompt.format_messages(**inputs)
+    choice = select_model(node, messages, default_temperature)
+    llm = get_llm(temperature=choice.temperature, model=choice.model, cache_key=f"analysis-{node}")
+    started = time.perf_counter()
+    response = llm.invoke(messages)
+    metrics = usage_metrics(choice, response, started)
+    if sections:
+        metrics['prompt_sections'] = describe_sections(sections)
+    return response, {node: metrics}
+
+
+def responsibility_rows(job_roles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Department, title, headcount and responsibilities of each job role"""
+    return [
+        {
+            'department': role['department'],
+            'role': role['role_title'],
+            'headcount': role['current_headcount'],
+            'responsibilities': role['responsibilities'],
+        }
+        for role in job_roles
+    ]
+
+
+def responsibility_sections(rows: List[Dict[str, Any]], encoding: str) -> List[PromptSection]:
+    """Responsibilities per role (responsibility_rows()), summarized to a few per role and then per department"""
+    columns = ['department', 'role', 'headcount', 'responsibilities']
+    codes = {'department': 'D'}
+    
+    def first_items(max_items):
+        return [
+            {**row, 'responsibilities': row['responsibilities'][:max_items] + (
+                [f"+{len(row['responsibilities']) - max_items} more"]
+                if len(row['responsibilities']) > max_items else []
+            )}
+            for row in rows
+        ]
+    
+    def by_department():
+        departments = {}
+        for row in rows:
+            dept = departments.setdefault(row['department'], {
+                'department': row['department'], 'roles': 0, 'headcount': 0, 'responsibilities': [],
+            })
+            dept['roles'] += 1
+            dept['headcount'] += row['headcount'] or 0
+            for item in row['responsibilities']:
+                if item not in dept['responsibilities'] and len(dept['responsibilities']) < 12:
+                    dept['responsibilities'].append(item)
+        return encode_table(list(departments.values()), ['department', 'roles', 'headcount', 'responsibilities'],
+                            encoding, codes)
+    
+    return [PromptSection('responsibilities_table', [
+        lambda: encode_table(rows, columns, encoding, codes),
+        lambda: encode_table(first_items(3), columns, encoding, codes),
+        by_department,
+    ])]
+
+
+def workload_tables(job_roles: List[Dict[str, Any]], employees: List[Dict[str, Any]],
+                    departments: List[str]) -> Tuple[Dict[str, Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Workload statistics per department and per role
+    
+    Returns:
+        (department -> stats, list of role rows)
+    """
+    status_counts = Counter()
+    role_overloaded = Counter()
+    for e in employees:
+        status_counts[(e['department'], e['workload_status'])] += 1
+        if e['workload_status'] == 'overloaded':
+            role_overloaded[e['role_id']] += 1
+    return workload_rows(job_roles, status_counts, role_overloaded, departments)
+
+
+def workload_rows(job_roles: List[Dict[str, Any]], status_counts: Counter, role_overloaded: Counter,
+                  departments: List[str]) -> Tuple[Dict[str, Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Workload tables from employee counts
     
-    llm = get_llm(temperature=0.1)
+    Args:
+        status_counts: (department, workload_status) -> employees
+        role_overloaded: role_id -> overloaded employees
     
-    # Prepare data summary
-    roles = state['job_roles']
-    total_roles = len(roles)
+    Returns:
+        (department -> stats, list of role rows)
+    """
+    department_totals = Counter()
+    for (dept, _), count in status_counts.items():
+        department_totals[dept] += count
+    
+    workload_stats = {}
+    for dept in departments:
+        total = department_totals[dept]
+        overloaded = status_counts[(dept, 'overloaded')]
+        workload_stats[dept] = {
+            'total_employees': total,
+            'overloaded_count': overloaded,
+            'overloaded_percentage': round((overloaded / total * 100), 1) if total > 0 else 0,
+            'underutilized_count': status_counts[(dept, 'underutilized')],
+        }
     
-    # Build org hierarchy summary
-    hierarchy_summary = []
-    for role in roles:
-        hierarchy_summary.append({
+    role_workload = []
+    for role in job_roles:
+        responsibility_count = len(role['responsibilities'])
+        role_workload.append({
             'role': role['role_title'],
             'department': role['department'],
-            'level': role['level'],
             'headcount': role['current_headcount'],
-            'team_size': role['team_size'],
-            'reports_to': role.get('reports_to', 'None')
+            'overloaded_employees': role_overloaded[role['role_id']],
+            'responsibilities_count': responsibility_count,
+            'responsibilities_per_person': round(responsibility_count / max(role['current_headcount'], 1), 2)
         })
+    return workload_stats, role_workload
+
+
+def workload_sections(workload_stats: Dict[str, Dict[str, Any]], role_workload: List[Dict[str, Any]],
+                      encoding: str) -> List[PromptSection]:
+    """Department workload table plus role table, narrowed to roles under pressure when over budget"""
+    dept_rows = [{'department': dept, **stats} for dept, stats in workload_stats.items()]
+    dept_columns = ['department', 'total_employees', 'overloaded_count', 'overloaded_percentage',
+                    'underutilized_count']
+    role_columns = ['role', 'department', 'headcount', 'overloaded_employees', 'responsibilities_count',
+                    'responsibilities_per_person']
+    codes = {'department': 'D'}
     
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are an organizational structure expert specializing in HR analytics.
-
-Analyze the organizational hierarchy for structural inefficiencies and gaps:
-
-1. **Span of Control**: Identify managers with too many direct reports (>8-10 is problematic)
-2. **Management Layers**: Check if there are missing middle management positions
+    under_pressure = [
+        row for row in role_workload
+        if row['overloaded_employees'] or row['responsibilities_per_person'] >= 2 or row['headcount'] <= 1
+    ]
+    under_pressure.sort(key=lambda row: (-row['overloaded_employees'], -row['responsibilities_per_person']))
+    
+    def narrowed(limit=None):
+        rows = under_pressure[:limit] if limit else under_pressure
+        omitted = len(role_workload) - len(rows)
+        note = (f"\n({omitted} other roles omitted: no overloaded employees, under 2 responsibilities "
+                f"per person and more than one person)") if omitted else ''
+        return encode_table(rows, role_columns, encoding, codes) + note
+    
+    return [
+        PromptSection('workload_dept_table', [encode_table(dept_rows, dept_columns, encoding)]),
+        PromptSection('workload_role_table', [
+            lambda: encode_table(role_workload, role_columns, encoding, codes),
+            narrowed,
+            lambda: narrowed(30),
+        ]),
+    ]
+
+
+# Prompts are built once at import. Each system message is fully static (no
+# variables), so every call starts with an identical prefix that providers
+# can cache; per-run data only appears in the user message after it.
+ORG_STRUCTURE_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are an organizational structure expert specializing in HR analytics.
+
+You receive structural findings that were computed exactly from HR data:
+span-of-control outliers, missing management layers, single points of failure,
+hierarchy depth and flat departments. Do not recount or second-guess the numbers.
+
+Interpret the findings for structural inefficiencies and gaps:
+
+1. **Span of Control**: Which overloaded managers need team leads or a split team
+2. **Management Layers**: Which missing middle management positions matter most
 3. **Flat Structures**: Large departments without proper hierarchy
 4. **Single Points of Failure**: Critical functions with only one person
-5. **Missing Roles**: Identify structural gaps (e.g., no team leads between ICs and managers)
+5. **Missing Roles**: Structural roles to add (e.g., team leads between ICs and managers)
 
-Provide specific, actionable findings with evidence from the data."""),
-        ("user", """
+Provide specific, actionable findings citing the computed evidence."""),
+    ("user", """
 Organization Data:
 - Total Roles: {total_roles}
 - Departments: {departments}
 
-Organizational Hierarchy:
-{hierarchy_json}
+Computed Structural Findings:
+{structure_facts}
 
 Analyze the structure and identify gaps. Focus on:
 - Which departments need additional management layers?
@@ -88,58 +238,49 @@ Analyze the structure and identify gaps. Focus on:
 
 Provide your analysis in a structured format with specific recommendations.
 """)
-    ])
+])
+
+
+def org_structure_analyzer(state: AnalysisState) -> Dict[str, Any]:
+    """
+    Analyzes organizational structure for gaps and inefficiencies
+    - Span of control issues
+    - Missing management layers
+    - Reporting structure problems
+    """
+    print("🔍 Running Organizational Structure Analysis...")
+    
+    # Structural gaps were computed exactly in the snapshot; the LLM only interprets them
+    summary = state['org_summary']['org_structure']
+    sections = [PromptSection('structure_facts', [summary['structure_facts']])]
+    structure_facts = fit_to_budget(sections, prompt_settings()['budget'])['structure_facts']
     
     try:
-        chain = prompt | llm
-        response = chain.invoke({
-            "total_roles": total_roles,
+        response, metrics = _invoke_node("org_structure", ORG_STRUCTURE_PROMPT, {
+            "total_roles": summary['total_roles'],
             "departments": ", ".join(state['departments']),
-            "hierarchy_json": json.dumps(hierarchy_summary, indent=2)
-        })
+            "structure_facts": structure_facts
+        }, default_temperature=0.1, sections=sections)
         
         analysis_text = response.content
         
         return {
             "org_structure_analysis": analysis_text,
-            "analysis_progress": state.get("analysis_progress", []) + ["org_structure"]
+            "analysis_progress": ["org_structure"],
+            "node_metrics": metrics
         }
     
     except Exception as e:
         print(f"❌ Error in org structure analysis: {e}")
         return {
             "org_structure_analysis": f"Error: {str(e)}",
-            "analysis_progress": state.get("analysis_progress", []) + ["org_structure_error"],
+            "analysis_progress": ["org_structure_error"],
             "error": str(e)
         }
 
 
-def responsibility_analyzer(state: AnalysisState) -> Dict[str, Any]:
-    """
-    Analyzes whether critical business responsibilities are covered
-    - Missing critical functions
-    - Overlap and redundancy
-    - Coverage gaps
-    """
-    print("🔍 Running Responsibility Coverage Analysis...")
-    
-    llm = get_llm(temperature=0.1)
-    
-    # Collect all responsibilities by department
-    dept_responsibilities = {}
-    for role in state['job_roles']:
-        dept = role['department']
-        if dept not in dept_responsibilities:
-            dept_responsibilities[dept] = []
-        
-        dept_responsibilities[dept].append({
-            'role': role['role_title'],
-            'responsibilities': role['responsibilities'],
-            'headcount': role['current_headcount']
-        })
-    
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are a business operations expert specializing in organizational design.
+RESPONSIBILITY_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are a business operations expert specializing in organizational design.
 
 Analyze the distribution of responsibilities across the organization:
 
@@ -158,81 +299,54 @@ Common gaps to look for:
 - Support: Customer Success, Technical Support
 
 Provide specific missing role recommendations based on responsibility gaps."""),
-        ("user", """
+    ("user", """
 Responsibilities by Department:
-{responsibilities_json}
+{responsibilities_table}
+
+{format_note}
 
 Analyze what critical responsibilities are NOT being covered and recommend specific roles needed.
 """)
-    ])
+])
+
+
+def responsibility_analyzer(state: AnalysisState) -> Dict[str, Any]:
+    """
+    Analyzes whether critical business responsibilities are covered
+    - Missing critical functions
+    - Overlap and redundancy
+    - Coverage gaps
+    """
+    print("🔍 Running Responsibility Coverage Analysis...")
+    
+    # Responsibilities per role, compactly encoded and kept within the token budget
+    encoding_settings = prompt_settings()
+    sections = responsibility_sections(state['org_summary']['responsibilities']['roles'], encoding_settings['encoding'])
+    inputs = fit_to_budget(sections, encoding_settings['budget'])
     
     try:
-        chain = prompt | llm
-        response = chain.invoke({
-            "responsibilities_json": json.dumps(dept_responsibilities, indent=2)
-        })
+        response, metrics = _invoke_node("responsibilities", RESPONSIBILITY_PROMPT, {
+            **inputs,
+            "format_note": format_note(encoding_settings['encoding'])
+        }, default_temperature=0.1, sections=sections)
         
         return {
             "responsibility_analysis": response.content,
-            "analysis_progress": state.get("analysis_progress", []) + ["responsibilities"]
+            "analysis_progress": ["responsibilities"],
+            "node_metrics": metrics
         }
     
     except Exception as e:
         print(f"❌ Error in responsibility analysis: {e}")
         return {
             "responsibility_analysis": f"Error: {str(e)}",
-            "analysis_progress": state.get("analysis_progress", []) + ["responsibilities_error"],
+            "analysis_progress": ["responsibilities_error"],
             "error": str(e)
         }
 
 
-def workload_analyzer(state: AnalysisState) -> Dict[str, Any]:
-    """
-    Analyzes workload and capacity issues
-    - Overloaded employees
-    - Understaffed roles
-    - Capacity constraints
-    """
-    print("🔍 Running Workload & Capacity Analysis...")
-    
-    llm = get_llm(temperature=0.1)
-    
-    # Calculate workload statistics
-    workload_stats = {}
-    for dept in state['departments']:
-        dept_employees = [e for e in state['employees'] if e['department'] == dept]
-        
-        total = len(dept_employees)
-        overloaded = len([e for e in dept_employees if e['workload_status'] == 'overloaded'])
-        underutilized = len([e for e in dept_employees if e['workload_status'] == 'underutilized'])
-        
-        workload_stats[dept] = {
-            'total_employees': total,
-            'overloaded_count': overloaded,
-            'overloaded_percentage': round((overloaded / total * 100), 1) if total > 0 else 0,
-            'underutilized_count': underutilized,
-        }
-    
-    # Role-level analysis
-    role_workload = []
-    for role in state['job_roles']:
-        role_employees = [e for e in state['employees'] if e['role_id'] == role['role_id']]
-        
-        overloaded = len([e for e in role_employees if e['workload_status'] == 'overloaded'])
-        
-        responsibility_count = len(role['responsibilities'])
-        
-        role_workload.append({
-            'role': role['role_title'],
-            'department': role['department'],
-            'headcount': role['current_headcount'],
-            'overloaded_employees': overloaded,
-            'responsibilities_count': responsibility_count,
-            'responsibilities_per_person': round(responsibility_count / max(role['current_headcount'], 1), 2)
-        })
-    
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are a workforce planning expert.
+WORKLOAD_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are a workforce planning expert.
 
 Analyze workload distribution and capacity constraints:
 
@@ -246,80 +360,62 @@ When overload is high, recommend either:
 - New specialized roles to offload specific responsibilities
 
 Be specific about which roles are needed and why."""),
-        ("user", """
+    ("user", """
 Workload Statistics by Department:
-{workload_dept_json}
+{workload_dept_table}
 
 Role-Level Workload Analysis:
-{workload_role_json}
+{workload_role_table}
+
+{format_note}
 
 Identify which roles are understaffed or need new supporting roles.
 """)
-    ])
+])
+
+
+def workload_analyzer(state: AnalysisState) -> Dict[str, Any]:
+    """
+    Analyzes workload and capacity issues
+    - Overloaded employees
+    - Understaffed roles
+    - Capacity constraints
+    """
+    print("🔍 Running Workload & Capacity Analysis...")
+    
+    summary = state['org_summary']['workload']
+    
+    encoding_settings = prompt_settings()
+    sections = workload_sections(summary['workload_stats'], summary['role_workload'], encoding_settings['encoding'])
+    inputs = fit_to_budget(sections, encoding_settings['budget'])
     
     try:
-        chain = prompt | llm
-        response = chain.invoke({
-            "workload_dept_json": json.dumps(workload_stats, indent=2),
-            "workload_role_json": json.dumps(role_workload, indent=2)
-        })
+        response, metrics = _invoke_node("workload", WORKLOAD_PROMPT, {
+            **inputs,
+            "format_note": format_note(encoding_settings['encoding'])
+        }, default_temperature=0.1, sections=sections)
         
         return {
             "workload_analysis": response.content,
-            "analysis_progress": state.get("analysis_progress", []) + ["workload"]
+            "analysis_progress": ["workload"],
+            "node_metrics": metrics
         }
     
     except Exception as e:
         print(f"❌ Error in workload analysis: {e}")
         return {
             "workload_analysis": f"Error: {str(e)}",
-            "analysis_progress": state.get("analysis_progress", []) + ["workload_error"],
+            "analysis_progress": ["workload_error"],
             "error": str(e)
         }
 
 
-def skills_analyzer(state: AnalysisState) -> Dict[str, Any]:
-    """
-    Analyzes skills gaps in the organization
-    - Missing critical skills
-    - Emerging skill requirements
-    - Skills concentration risks
-    """
-    print("🔍 Running Skills Gap Analysis...")
-    
-    llm = get_llm(temperature=0.1)
-    
-    # Collect required vs available skills
-    required_skills_by_dept = {}
-    available_skills_by_dept = {}
-    
-    for dept in state['departments']:
-        # Required skills (from job roles)
-        dept_roles = [r for r in state['job_roles'] if r['department'] == dept]
-        required = set()
-        for role in dept_roles:
-            required.update(role['required_skills'])
-        required_skills_by_dept[dept] = list(required)
-        
-        # Available skills (from employees)
-        dept_employees = [e for e in state['employees'] if e['department'] == dept]
-        available = set()
-        for emp in dept_employees:
-            available.update(emp['skills'])
-        available_skills_by_dept[dept] = list(available)
-    
-    # Find gaps
-    skills_gaps = {}
-    for dept in state['departments']:
-        required_set = set(required_skills_by_dept.get(dept, []))
-        available_set = set(available_skills_by_dept.get(dept, []))
-        missing = required_set - available_set
-        
-        if missing:
-            skills_gaps[dept] = list(missing)
-    
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are a talent acquisition and workforce planning expert.
+SKILLS_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are a talent acquisition and workforce planning expert.
+
+You receive skill coverage figures computed exactly from HR data: per-department
+coverage of required skills, bus factor (fewest holders of any required skill),
+missing required skills and skills held by too few people.
 
 Analyze skills gaps across the organization:
 
@@ -339,54 +435,96 @@ Consider modern business needs like:
 - Security and compliance
 - Customer experience
 - Automation and efficiency"""),
-        ("user", """
-Skills Analysis:
-
-Required Skills by Department:
-{required_skills_json}
-
-Available Skills by Department:
-{available_skills_json}
-
-Identified Skills Gaps:
-{skills_gaps_json}
+    ("user", """
+Computed Skill Coverage:
+{skill_facts}
 
 Recommend specific roles to fill these skills gaps, prioritizing by business impact.
 """)
-    ])
+])
+
+
+def skills_analyzer(state: AnalysisState) -> Dict[str, Any]:
+    """
+    Analyzes skills gaps in the organization
+    - Missing critical skills
+    - Emerging skill requirements
+    - Skills concentration risks
+    """
+    print("🔍 Running Skills Gap Analysis...")
+    
+    # Coverage, bus factor and missing skills were computed exactly in the snapshot
+    sections = [PromptSection('skill_facts', [state['org_summary']['skills']['skill_facts']])]
+    skill_facts = fit_to_budget(sections, prompt_settings()['budget'])['skill_facts']
     
     try:
-        chain = prompt | llm
-        response = chain.invoke({
-            "required_skills_json": json.dumps(required_skills_by_dept, indent=2),
-            "available_skills_json": json.dumps(available_skills_by_dept, indent=2),
-            "skills_gaps_json": json.dumps(skills_gaps, indent=2)
-        })
+        response, metrics = _invoke_node("skills", SKILLS_PROMPT, {
+            "skill_facts": skill_facts
+        }, default_temperature=0.1, sections=sections)
         
         return {
             "skills_analysis": response.content,
-            "analysis_progress": state.get("analysis_progress", []) + ["skills"]
+            "analysis_progress": ["skills"],
+            "node_metrics": metrics
         }
     
     except Exception as e:
         print(f"❌ Error in skills analysis: {e}")
         return {
             "skills_analysis": f"Error: {str(e)}",
-            "analysis_progress": state.get("analysis_progress", []) + ["skills_error"],
+            "analysis_progress": ["skills_error"],
             "error": str(e)
         }
 
 
-def synthesizer(state: AnalysisState) -> Dict[str, Any]:
-    """
-    Synthesizes all analyses into prioritized, actionable recommendations
-    """
-    print("🔍 Synthesizing Final Recommendations...")
+def synthesis_sections(state: AnalysisState, encoding: str) -> List[PromptSection]:
+    """Agent analyses plus previous recommendations (deduplicated, then grouped by department)"""
+    previous = [
+        {
+            "role_title": rec.get("role_title", ""),
+            "department": rec.get("department", ""),
+            "level": rec.get("level", ""),
+        }
+        for rec in state.get("previous_recommendations") or []
+    ]
+    columns = ["role_title", "department", "level"]
+    codes = {"department": "D"}
+    
+    def deduplicated():
+        seen = {}
+        for rec in previous:
+            seen.setdefault((rec["role_title"].lower(), rec["department"].lower()), rec)
+        return encode_table(list(seen.values()), columns, encoding, codes)
     
-    llm = get_llm(temperature=0.3)  # Slightly higher for creative synthesis
+    def by_department():
+        titles = {}
+        for rec in previous:
+            dept_titles = titles.setdefault(rec["department"], [])
+            if rec["role_title"] not in dept_titles:
+                dept_titles.append(rec["role_title"])
+        rows = [{"department": dept, "role_titles": names} for dept, names in titles.items()]
+        return encode_table(rows, ["department", "role_titles"], encoding)
     
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are a senior HR strategy consultant synthesizing multiple analyses.
+    sections = [
+        PromptSection(name, [state.get(key) or "No analysis available"])
+        for name, key in (
+            ("org_structure", "org_structure_analysis"),
+            ("responsibilities", "responsibility_analysis"),
+            ("workload", "workload_analysis"),
+            ("skills", "skills_analysis"),
+        )
+    ]
+    if previous:
+        sections.append(PromptSection("previous_recommendations", [
+            lambda: encode_table(previous, columns, encoding, codes), deduplicated, by_department,
+        ]))
+    else:
+        sections.append(PromptSection("previous_recommendations", ["None"]))
+    return sections
+
+
+SYNTHESIS_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are a senior HR strategy consultant synthesizing multiple analyses.
 
 Your task: Combine all the analyses into a prioritized list of missing job role recommendations.
 
@@ -417,21 +555,21 @@ Return ONLY a valid JSON array of role objects. No other text.
 Example format:
 [
   {{
-    "role_title": "QA Engineer",
-    "department": "Engineering",
-    "level": "mid",
-    "gap_type": "responsibility",
-    "justification": "Currently no dedicated testing role. Developers are doing their own QA, leading to quality issues and slower delivery. The org structure analysis found this is a common gap in the engineering team.",
-    "expected_impact": "Improved product quality, faster release cycles, reduced production bugs by 40%",
-    "priority": "critical",
-    "recommended_headcount": 2,
-    "estimated_timeline": "Immediate",
-    "required_skills": ["Test Automation", "Selenium", "API Testing", "CI/CD", "Quality Assurance"],
-    "responsibilities": ["Create test plans", "Automate testing", "Bug tracking", "Quality metrics", "Release validation"]
+"role_title": "QA Engineer",
+"department": "Engineering",
+"level": "mid",
+"gap_type": "responsibility",
+"justification": "Currently no dedicated testing role. Developers are doing their own QA, leading to quality issues and slower delivery. The org structure analysis found this is a common gap in the engineering team.",
+"expected_impact": "Improved product quality, faster release cycles, reduced production bugs by 40%",
+"priority": "critical",
+"recommended_headcount": 2,
+"estimated_timeline": "Immediate",
+"required_skills": ["Test Automation", "Selenium", "API Testing", "CI/CD", "Quality Assurance"],
+"responsibilities": ["Create test plans", "Automate testing", "Bug tracking", "Quality metrics", "Release validation"]
   }}
 ]
 """),
-        ("user", """
+    ("user", """
 ORGANIZATIONAL STRUCTURE ANALYSIS:
 {org_structure}
 
@@ -447,6 +585,8 @@ SKILLS GAP ANALYSIS:
 PREVIOUS RECOMMENDATIONS (DO NOT DUPLICATE THESE):
 {previous_recommendations}
 
+{format_note}
+
 ---
 
 Now synthesize these into a prioritized JSON array of 5-10 missing role recommendations.
@@ -454,71 +594,76 @@ IMPORTANT: Do NOT recommend any roles that appear in the PREVIOUS RECOMMENDATION
 Only recommend NEW roles that haven't been suggested before.
 Return ONLY the JSON array, no other text.
 """)
-    ])
+])
+
+
+def synthesizer(state: AnalysisState, config: RunnableConfig = None) -> Dict[str, Any]:
+    """
+    Synthesizes all analyses into prioritized, actionable recommendations
+    
+    Pass an on_recommendation callable in config["configurable"] to receive
+    each validated recommendation as soon as it is streamed.
+    """
+    print("🔍 Synthesizing Final Recommendations...")
     
+    recommendations = []
     try:
-        # Format previous recommendations for the prompt
-        previous_recs = state.get("previous_recommendations", [])
-        previous_recs_text = "None" if not previous_recs else json.dumps(
-            [
-                {
-                    "role_title": rec.get("role_title", ""),
-                    "department": rec.get("department", ""),
-                    "level": rec.get("level", ""),
-                }
-                for rec in previous_recs
-            ],
-            indent=2
-        )
+        # Analyses and previous recommendations share the token budget;
+        # previous recommendations are summarized first, analyses only truncated
+        encoding_settings = prompt_settings()
+        sections = synthesis_sections(state, encoding_settings['encoding'])
+        inputs = fit_to_budget(sections, encoding_settings['budget'])
         
-        chain = prompt | llm
-        response = chain.invoke({
-            "org_structure": state.get("org_structure_analysis", "No analysis available"),
-            "responsibilities": state.get("responsibility_analysis", "No analysis available"),
-            "workload": state.get("workload_analysis", "No analysis available"),
-            "skills": state.get("skills_analysis", "No analysis available"),
-            "previous_recommendations": previous_recs_text,
-        })
-        
-        # Parse JSON response
-        content = response.content.strip()
+        # Recommendations are validated and handed to on_recommendation one
+        # by one as each object closes in the stream; a malformed item is
+        # repaired or dropped on its own instead of failing the whole run
+        on_recommendation = (config or {}).get("configurable", {}).get("on_recommendation")
+        messages = SYNTHESIS_PROMPT.format_messages(**inputs, format_note=format_note(encoding_settings['encoding']))
+        # Slightly higher default temperature for creative synthesis
+        choice = select_model("synthesize", messages, default_temperature=0.3)
+        llm = get_llm(temperature=choice.temperature, model=choice.model, cache_key="analysis-synthesize")
+        parser = IncrementalJSONArrayParser()
+        dropped = 0
+        started = time.perf_counter()
+        streamed = None
         
-        # Handle markdown code blocks
-        if content.startswith("```"):
-            # Extract JSON from markdown code block
-            lines = content.split("\n")
-            json_lines = []
-            in_code_block = False
-            for line in lines:
-                if line.startswith("```"):
-                    in_code_block = not in_code_block
+        for chunk in bind_structured_output(llm, RecommendationBatch).stream(messages):
+            streamed = chunk if streamed is None else streamed + chunk
+            for item in parser.feed(stream_text(chunk)):
+                recommendation = validate_recommendation(item)
+                if recommendation is None:
+                    dropped += 1
                     continue
-                if in_code_block or (not line.startswith("```")):
-                    json_lines.append(line)
-            content = "\n".join(json_lines).strip()
+                recommendations.append(recommendation)
+                if on_recommendation is not None:
+                    on_recommendation(recommendation)
+        parser.close()
+        dropped += len(parser.errors)
+        metrics = {"synthesize": {**usage_metrics(choice, streamed, started),
+                                  "prompt_sections": describe_sections(sections)}}
         
-        recommendations = json.loads(content)
+        print(f"✅ Generated {len(recommendations)} recommendations"
+              + (f" ({dropped} malformed dropped)" if dropped else ""))
         
-        print(f"✅ Generated {len(recommendations)} recommendations")
+        if not recommendations and (dropped or not parser.done):
+            return {
+                "recommendations": [],
+                "analysis_progress": ["synthesis_error"],
+                "error": "Failed to parse recommendations: no valid recommendation in model output"
+            }
         
         return {
             "recommendations": recommendations,
-            "analysis_progress": state.get("analysis_progress", []) + ["synthesis_complete"]
+            "analysis_progress": ["synthesis_complete"],
+            "node_metrics": metrics
         }
     
-    except json.JSONDecodeError as e:
-        print(f"❌ Error parsing recommendations JSON: {e}")
-        print(f"Response was: {response.content}")
-        return {
-            "recommendations": [],
-            "analysis_progress": state.get("analysis_progress", []) + ["synthesis_error"],
-            "error": f"Failed to parse recommendations: {str(e)}"
-        }
     except Exception as e:
         print(f"❌ Error in synthesis: {e}")
+        # Keep whatever was streamed (and possibly persisted) before the failure
         return {
-            "recommendations": [],
-            "analysis_progress": state.get("analysis_progress", []) + ["synthesis_error"],
+            "recommendations": recommendations,
+            "analysis_progress": ["synthesis_error"],
             "error": str(e)
         }
 
@@ -0,0 +1,119 @@
+"""
+Cooperative cancellation of analysis workflows
+
+A CancellationToken passed to run_analysis()/resume_analysis() is checked
+before every node, and a callback checks it before every model request and
+on every streamed chunk (raising there also closes the provider's HTTP
+stream). While a token is in scope, the LLM scheduler's rate-limit and
+retry waits wake up as soon as it fires.
+"""
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+class AnalysisCancelled(RuntimeError):
+    """The analysis run was cancelled"""
+
+    def __init__(self, message: str = 'Analysis run cancelled'):
+        super().__init__(message)
+
+
+class CancellationToken:
+    """
+    Thread-safe cancellation flag of one analysis run
+
+    Args:
+        parent: Token whose cancellation also cancels this one (e.g. the run's
+                token for one of several racing model calls)
+    """
+
+    def __init__(self, parent: Optional['CancellationToken'] = None):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._children: 'weakref.WeakSet[CancellationToken]' = weakref.WeakSet()
+        if parent is not None:
+            parent._add_child(self)
+
+    def _add_child(self, child: 'CancellationToken'):
+        with self._lock:
+            self._children.add(child)
+        if self.cancelled:
+            child.cancel()
+
+    def cancel(self):
+        self._event.set()
+        with self._lock:
+            children = list(self._children)
+        for child in children:
+            child.cancel()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise AnalysisCancelled()
+
+    def sleep(self, seconds: float):
+        """time.sleep() that raises AnalysisCancelled as soon as the token fires"""
+        if self._event.wait(max(seconds, 0.0)):
+            raise AnalysisCancelled()
+
+
+_current_token: ContextVar[Optional[CancellationToken]] = ContextVar('analysis_cancellation', default=None)
+
+
+@contextmanager
+def cancellation_scope(token: Optional[CancellationToken]):
+    """Make a token the current one (inherited by the graph's node threads)"""
+    reset = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(reset)
+
+
+def current_token() -> Optional[CancellationToken]:
+    """Token of the current scope, if any"""
+    return _current_token.get()
+
+
+def raise_if_cancelled():
+    """Raise AnalysisCancelled if the current token has fired"""
+    token = _current_token.get()
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+def cancellable_sleep(seconds: float):
+    """Sleep, waking up with AnalysisCancelled if the current token fires"""
+    token = _current_token.get()
+    if token is None:
+        time.sleep(seconds)
+    else:
+        token.sleep(seconds)
+
+
+class CancellationCallbackHandler(BaseCallbackHandler):
+    """Stops the model calls of a cancelled run, before the request and at each streamed chunk"""
+
+    raise_error = True
+
+    def __init__(self, token: CancellationToken):
+        self.token = token
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.token.raise_if_cancelled()
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.token.raise_if_cancelled()
+
+    def on_llm_new_token(self, token, **kwargs):
+        self.token.raise_if_cancelled()
@@ -0,0 +1,84 @@
+"""
+Local fake chat providers with injectable latency and errors
+
+Used to exercise routing, hedging and circuit breakers without network
+access or API keys (see the benchmark_llm_router management command).
+"""
+import random
+import threading
+import time
+from typing import Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+class FakeProviderError(RuntimeError):
+    """Provider-side failure; carries a status code like the SDK errors do"""
+
+    def __init__(self, message: str, status_code: int = 503):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class FakeProviderChatModel(BaseChatModel):
+    """
+    Chat model that answers after a simulated delay, sometimes slowly or with an error
+
+    Attributes:
+        provider_name: Label included in responses
+        response: Text returned for every call
+        latency: Normal response time in seconds
+        jitter: Uniform random extra latency in seconds
+        slow_probability: Chance that a call takes slow_latency instead
+        slow_latency: Tail response time in seconds
+        error_rate: Chance that a call fails (after error_latency)
+        error_latency: Time before a failing call raises
+        down: Fail every call (provider outage)
+        seed: Random seed for reproducible runs
+    """
+    provider_name: str = 'fake'
+    response: str = 'ok'
+    latency: float = 0.05
+    jitter: float = 0.0
+    slow_probability: float = 0.0
+    slow_latency: float = 2.0
+    error_rate: float = 0.0
+    error_latency: float = 0.01
+    down: bool = False
+    seed: Optional[int] = None
+
+    def model_post_init(self, __context):
+        self._random = random.Random(self.seed)
+        self._lock = threading.Lock()
+        self._calls = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return 'fake-provider'
+
+    @property
+    def calls(self) -> int:
+        return self._calls
+
+    def _simulate(self) -> None:
+        with self._lock:
+            self._calls += 1
+            fails = self.down or self._random.random() < self.error_rate
+            slow = self._random.random() < self.slow_probability
+            extra = self._random.uniform(0, self.jitter) if self.jitter else 0.0
+        if fails:
+            time.sleep(self.error_latency)
+            raise FakeProviderError(f"{self.provider_name} unavailable")
+        time.sleep((self.slow_latency if slow else self.latency) + extra)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self._simulate()
+        message = AIMessage(content=self.response, response_metadata={'provider': self.provider_name})
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        self._simulate()
+        for i in range(0, len(self.response), 8):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=self.response[i:i + 8]))
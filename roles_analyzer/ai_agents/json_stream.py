@@ -0,0 +1,166 @@
+"""
+Incremental JSON array parsing for streamed LLM output
+
+The parser is fed text chunks as they arrive and yields every element of
+the first JSON array of objects in the stream as soon as that element's
+closing brace is seen. Text before the array (markdown fences, a wrapping
+object such as {"recommendations": [...]}, prose with brackets such as
+"the roles [see below]:") is skipped: a '[' whose first element is not an
+object is taken for prose, and the search goes on at the next '['. Elements that are not valid JSON
+are repaired where possible; the rest are reported as errors instead of
+failing the whole array.
+"""
+import json
+import re
+from typing import Any, Iterator, List, Optional, Tuple
+
+
+# Trailing commas before a closing bracket, e.g. {"a": 1,}
+_TRAILING_COMMA_RE = re.compile(r',\s*([}\]])')
+
+_SMART_QUOTES = str.maketrans({'“': '"', '”': '"', '‘': "'", '’': "'"})
+
+
+def repair_json(text: str) -> Optional[Any]:
+    """
+    Parse a JSON value, applying a few common LLM-output repairs if needed
+
+    Args:
+        text: JSON text of a single value
+
+    Returns:
+        Parsed value, or None if it could not be repaired
+    """
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+
+    repaired = _TRAILING_COMMA_RE.sub(r'\1', text.translate(_SMART_QUOTES))
+    # Raw newlines/tabs inside strings are invalid JSON but common in LLM output
+    try:
+        return json.loads(repaired, strict=False)
+    except json.JSONDecodeError:
+        return None
+
+
+class IncrementalJSONArrayParser:
+    """
+    Streaming parser for the elements of a top-level JSON array
+
+    Usage:
+        parser = IncrementalJSONArrayParser()
+        for chunk in stream:
+            for item in parser.feed(chunk):
+                handle(item)
+        parser.close()
+
+    Attributes:
+        errors: (element text, reason) for elements that could not be parsed
+        done: True once the array's closing bracket has been seen
+    """
+
+    def __init__(self):
+        self.errors: List[Tuple[str, str]] = []
+        self.done = False
+        self._started = False
+        # Set once the first element has shown this is the array of objects
+        self._confirmed = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._element: List[str] = []
+
+    def feed(self, chunk: str) -> Iterator[Any]:
+        """
+        Consume a chunk of text
+
+        Yields:
+            Each array element completed within this chunk
+        """
+        for char in chunk or '':
+            if self.done:
+                return
+
+            if not self._started:
+                if char == '[':
+                    self._started = True
+                continue
+
+            if self._in_string:
+                self._element.append(char)
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if self._depth == 0:
+                # Between elements of the top-level array
+                if char == ']':
+                    item = self._finish_element()
+                    if not self._started:
+                        continue
+                    self.done = True
+                    if item is not None:
+                        yield item
+                    return
+                if char == ',':
+                    item = self._finish_element()
+                    if item is not None:
+                        yield item
+                    continue
+                if char.isspace() and not self._element:
+                    continue
+
+            self._element.append(char)
+            if char == '"':
+                self._in_string = True
+            elif char in '{[':
+                self._depth += 1
+            elif char in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    # Emit objects as soon as they close, without waiting for the comma
+                    item = self._finish_element()
+                    if item is not None:
+                        yield item
+
+    def close(self):
+        """Flag an element left unfinished by a truncated stream"""
+        text = ''.join(self._element).strip()
+        if text:
+            self.errors.append((text, 'truncated'))
+        self._element = []
+
+    def _finish_element(self) -> Optional[Any]:
+        text = ''.join(self._element).strip()
+        self._element = []
+        self._depth = 0
+        if not text:
+            return None
+        if not self._confirmed:
+            if not text.startswith('{'):
+                # Brackets in prose, not the array: look for the next '['
+                self._started = False
+                return None
+            self._confirmed = True
+        value = repair_json(text)
+        if value is None:
+            self.errors.append((text, 'invalid JSON'))
+        return value
+
+
+def parse_json_array(text: str) -> Tuple[List[Any], List[Tuple[str, str]]]:
+    """
+    Parse the elements of the first JSON array in a complete text
+
+    Returns:
+        (elements, errors)
+    """
+    parser = IncrementalJSONArrayParser()
+    items = list(parser.feed(text))
+    parser.close()
+    return items, parser.errors
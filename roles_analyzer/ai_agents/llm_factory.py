@@ -1,48 +1,287 @@
 """
 Factory for creating LLM instances based on configuration
 """
+from typing import List, Optional, Tuple
+
 from django.conf import settings
+from langchain_core.messages import BaseMessage, SystemMessage
 from langchain_openai import ChatOpenAI
 from langchain_anthropic import ChatAnthropic
+from .llm_scheduler import ScheduledChatModelMixin, PRIORITY_BACKGROUND, PRIORITIES
+from .llm_router import RoutingChatModel
+
+
+class ScheduledChatOpenAI(ScheduledChatModelMixin, ChatOpenAI):
+    """ChatOpenAI whose calls go through the shared LLM scheduler"""
+    llm_priority: str = PRIORITY_BACKGROUND
+    llm_max_retries: Optional[int] = None
+
+
+class ScheduledChatAnthropic(ScheduledChatModelMixin, ChatAnthropic):
+    """
+    ChatAnthropic whose calls go through the shared LLM scheduler
+    
+    With prompt_caching on, the leading system prompt is marked as a cache
+    breakpoint so Anthropic caches tools + system prompt across calls
+    (prefixes under the model's minimum cacheable size are simply not cached).
+    """
+    llm_priority: str = PRIORITY_BACKGROUND
+    llm_max_retries: Optional[int] = None
+    prompt_caching: bool = True
+    
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.prompt_caching:
+            messages = mark_cache_breakpoint(messages)
+        return super()._generate(messages, stop, run_manager, **kwargs)
+    
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.prompt_caching:
+            messages = mark_cache_breakpoint(messages)
+        return super()._stream(messages, stop, run_manager, **kwargs)
+
+
+def mark_cache_breakpoint(messages: List[BaseMessage]) -> List[BaseMessage]:
+    """
+    Copy of messages with an Anthropic cache_control breakpoint after the leading system messages
+    
+    Everything up to the breakpoint (tool definitions and system prompt) is
+    cached; the dynamic messages after it are not.
+    """
+    last_system = None
+    for index, message in enumerate(messages):
+        if not isinstance(message, SystemMessage):
+            break
+        last_system = index
+    if last_system is None:
+        return messages
+    
+    message = messages[last_system]
+    if isinstance(message.content, str):
+        blocks = [{'type': 'text', 'text': message.content}]
+    else:
+        blocks = [dict(block) if isinstance(block, dict) else {'type': 'text', 'text': str(block)}
+                  for block in message.content]
+    if not blocks or blocks[-1].get('type') != 'text':
+        return messages
+    blocks[-1]['cache_control'] = {'type': 'ephemeral'}
+    
+    marked = list(messages)
+    marked[last_system] = message.model_copy(update={'content': blocks})
+    return marked
+
 
+PROVIDER_CLASSES = {
+    'openai': (ScheduledChatOpenAI, 'OPENAI_API_KEY'),
+    'anthropic': (ScheduledChatAnthropic, 'ANTHROPIC_API_KEY'),
+}
 
-def get_llm(temperature: float = None):
+
+def parse_routes(routes) -> List[Tuple[str, str]]:
+    """
+    Parse route specs like "openai:gpt-4o" into (provider, model) pairs
+    
+    Args:
+        routes: Comma-separated string or list of "provider:model" strings
+    
+    Returns:
+        List of (provider, model) tuples in preference order
+    """
+    if isinstance(routes, str):
+        routes = routes.split(',')
+    parsed = []
+    for spec in routes:
+        spec = spec.strip()
+        if not spec:
+            continue
+        provider, sep, model = spec.partition(':')
+        if not sep or not model:
+            raise ValueError(f"Invalid LLM route '{spec}', expected provider:model")
+        parsed.append((provider.strip(), model.strip()))
+    return parsed
+
+
+def _build_provider_llm(provider: str, model: str, temperature: float, priority: str,
+                        max_retries: Optional[int] = None, cache_key: Optional[str] = None):
+    """Scheduled chat model for one provider; raises ValueError if it can't be configured"""
+    ai_config = settings.AI_CONFIG
+    if provider not in PROVIDER_CLASSES:
+        raise ValueError(f"Unsupported LLM provider: {provider}")
+    
+    llm_class, key_setting = PROVIDER_CLASSES[provider]
+    api_key = ai_config.get(key_setting)
+    if not api_key:
+        raise ValueError(f"{key_setting} not configured in settings")
+    
+    extra = {}
+    if provider == 'openai':
+        extra['stream_usage'] = True  # Token usage for per-node metrics of streamed calls
+        if cache_key:
+            # Requests sharing a key land on the same cache shard, so the
+            # automatically cached prompt prefix is hit more often
+            extra['model_kwargs'] = {'prompt_cache_key': cache_key}
+    
+    return llm_class(
+        model=model,
+        temperature=temperature,
+        api_key=api_key,
+        timeout=ai_config.get('REQUEST_TIMEOUT', 60.0),
+        max_retries=0,  # Retries are handled by the scheduler
+        llm_priority=priority,
+        llm_max_retries=max_retries,
+        **extra,
+    )
+
+
+def get_llm(temperature: float = None, priority: str = PRIORITY_BACKGROUND, model: str = None,
+            cache_key: str = None):
     """
     Get configured LLM instance
     
+    With two or more usable routes the result is a RoutingChatModel that
+    fails over (and optionally hedges) across them; routes whose API key is
+    missing are skipped. Otherwise a single provider model is returned.
+    
     Args:
         temperature: Override default temperature
+        priority: 'interactive' (chat) or 'background' (analysis); interactive
+                  calls may use the rate-limit reserve that background calls leave
+        model: Override AI_CONFIG['MODEL'] (served by AI_CONFIG['PROVIDER']), or a
+               "provider:model,..." route list overriding AI_CONFIG['ROUTES']
+        cache_key: OpenAI prompt_cache_key for calls sharing a static prompt prefix
     
     Returns:
         LangChain LLM instance
     """
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown LLM priority: {priority}")
+    
     ai_config = settings.AI_CONFIG
-    provider = ai_config.get('PROVIDER', 'openai')
-    model = ai_config.get('MODEL', 'gpt-4')
     temp = temperature if temperature is not None else ai_config.get('TEMPERATURE', 0.2)
     
-    if provider == 'openai':
-        api_key = ai_config.get('OPENAI_API_KEY')
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY not configured in settings")
-        
-        return ChatOpenAI(
-            model=model,
-            temperature=temp,
-            api_key=api_key
-        )
+    if model and ':' in model:
+        route_specs = parse_routes(model)
+    elif model:
+        route_specs = []
+    else:
+        route_specs = parse_routes(ai_config.get('ROUTES') or [])
     
-    elif provider == 'anthropic':
-        api_key = ai_config.get('ANTHROPIC_API_KEY')
-        if not api_key:
-            raise ValueError("ANTHROPIC_API_KEY not configured in settings")
-        
-        return ChatAnthropic(
-            model=model,
-            temperature=temp,
-            api_key=api_key
+    routes = []
+    for provider, route_model in route_specs:
+        if not ai_config.get(PROVIDER_CLASSES.get(provider, (None, ''))[1]):
+            continue
+        # Few retries per provider: failing over is faster than backing off
+        llm = _build_provider_llm(
+            provider, route_model, temp, priority, ai_config.get('ROUTE_MAX_RETRIES', 1), cache_key
         )
+        routes.append((f"{provider}:{route_model}", llm))
+    if len(routes) >= 2:
+        return RoutingChatModel(routes=routes, hedge=ai_config.get('HEDGE', True))
+    if routes:
+        return routes[0][1].model_copy(update={'llm_max_retries': None})
+    if model and ':' in model:
+        raise ValueError(f"No LLM route in '{model}' has an API key configured")
     
-    else:
-        raise ValueError(f"Unsupported LLM provider: {provider}")
+    return _build_provider_llm(
+        ai_config.get('PROVIDER', 'openai'), model or ai_config.get('MODEL', 'gpt-4'), temp, priority,
+        cache_key=cache_key,
+    )
+
+
+# OpenAI models accepting response_format json_schema (structured outputs); older
+# ones (gpt-4, gpt-4-turbo, gpt-3.5-turbo) reject it with a 400
+JSON_SCHEMA_MODEL_PREFIXES = ('gpt-4o', 'chatgpt-4o', 'gpt-4.1', 'gpt-4.5', 'gpt-5', 'o1', 'o3', 'o4')
+JSON_SCHEMA_UNSUPPORTED_MODELS = ('gpt-4o-2024-05-13', 'o1-mini', 'o1-preview')
+
+
+def supports_json_schema(model: str) -> bool:
+    """Whether an OpenAI model (or a fine-tune of one) accepts json_schema response_format"""
+    name = (model or '').removeprefix('ft:').lower()
+    return name.startswith(JSON_SCHEMA_MODEL_PREFIXES) and not name.startswith(JSON_SCHEMA_UNSUPPORTED_MODELS)
+
 
+def bind_structured_output(llm, schema):
+    """
+    Bind a pydantic schema as the provider's structured-output format, keeping the output streamable
+    
+    OpenAI models get JSON-schema response_format where they support it;
+    Anthropic models are forced to call a tool whose input is the schema. A
+    RoutingChatModel binds each of its routes for its own provider. Other
+    chat models (including older OpenAI ones) are returned unchanged and
+    are expected to follow the prompt's JSON format.
+    
+    Args:
+        llm: LangChain chat model
+        schema: Pydantic model class describing the output
+    
+    Returns:
+        Runnable to stream from; use stream_text() to get the JSON text of each chunk
+    """
+    if isinstance(llm, RoutingChatModel):
+        return llm.map_routes(lambda route: bind_structured_output(route, schema))
+    
+    if isinstance(llm, ChatOpenAI) and supports_json_schema(llm.model_name):
+        return llm.bind(response_format={
+            'type': 'json_schema',
+            'json_schema': {
+                'name': schema.__name__,
+                'schema': schema.model_json_schema(),
+                'strict': False,
+            },
+        })
+    
+    if isinstance(llm, ChatAnthropic):
+        return llm.bind_tools([schema], tool_choice=schema.__name__)
+    
+    return llm
+
+
+def bind_chat_tools(llm, tools, call_tools: bool = True, route: Optional[str] = None):
+    """
+    Let a chat model call the given tools
+    
+    A RoutingChatModel binds the tools on each of its routes. Chat models
+    without tool calling are returned unchanged and answer from the prompt.
+    
+    Args:
+        llm: LangChain chat model
+        tools: LangChain tools (e.g. StructuredTool) the model may call
+        call_tools: False keeps the tools defined, as a history holding tool
+                    calls and results requires, but makes the model answer in text
+        route: Only use this route of a RoutingChatModel (the provider whose
+               tool calls the history holds, from response_metadata['llm_route'])
+    
+    Returns:
+        Runnable whose responses may carry tool_calls
+    """
+    if isinstance(llm, RoutingChatModel):
+        if route:
+            llm = llm.only_route(route)
+        return llm.map_routes(lambda provider_llm: bind_chat_tools(provider_llm, tools, call_tools))
+    
+    if isinstance(llm, ChatOpenAI):
+        return llm.bind_tools(tools) if call_tools else llm.bind_tools(tools, tool_choice='none')
+    
+    if isinstance(llm, ChatAnthropic):
+        return llm.bind_tools(tools) if call_tools else llm.bind_tools(tools, tool_choice={'type': 'none'})
+    
+    return llm
+
+
+def stream_text(chunk) -> str:
+    """
+    JSON text carried by one streamed message chunk
+    
+    Tool-call argument deltas take precedence over content; list content
+    keeps only text blocks (tool input deltas are already in the tool call).
+    """
+    tool_call_chunks = getattr(chunk, 'tool_call_chunks', None)
+    if tool_call_chunks:
+        return ''.join(tc.get('args') or '' for tc in tool_call_chunks)
+    content = chunk.content
+    if isinstance(content, str):
+        return content
+    return ''.join(
+        block.get('text', '') if isinstance(block, dict) else str(block)
+        for block in content
+        if not isinstance(block, dict) or block.get('type') == 'text'
+    )
@@ -0,0 +1,375 @@
+"""
+Routing across several LLM providers: failover, hedging and circuit breakers
+
+RoutingChatModel holds an ordered list of provider models. A call goes to
+the first provider whose circuit breaker is closed; if it fails, the next
+one is tried. With hedging enabled, a backup call is also fired when the
+current call outlives that provider's p95 latency, and whichever response
+arrives first wins. Latency and breaker state are tracked per provider for
+the whole process, so they carry over between get_llm() calls.
+
+Route calls run on pool threads in a copy of the caller's context (so the
+current cancellation token reaches the rate limiter's waits) and as child
+runs of the routing call, so its callbacks see them. Once a hedged call has
+won, the calls still racing it are cancelled.
+"""
+import contextvars
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from django.db import close_old_connections
+from langchain_core.callbacks import CallbackManager
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import ensure_config
+
+from .cancellation import (
+    AnalysisCancelled, CancellationCallbackHandler, CancellationToken, cancellation_scope, current_token,
+)
+
+
+# Hedge deadline bounds (seconds) and the deadline used before enough samples exist
+MIN_HEDGE_DEADLINE = 2.0
+MAX_HEDGE_DEADLINE = 30.0
+DEFAULT_HEDGE_DEADLINE = 10.0
+MIN_LATENCY_SAMPLES = 20
+
+# Consecutive failures that open a provider's breaker, and how long it stays open
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_SECONDS = 30.0
+
+# Route calls are child runs of the routing call, which already streams their
+# tokens; LangGraph's message stream skips runs with this tag
+NESTED_RUN_TAG = 'nostream'
+
+
+class AllProvidersFailed(RuntimeError):
+    """Every route failed (or was skipped by an open breaker)"""
+
+    def __init__(self, errors: List[Tuple[str, Exception]]):
+        detail = '; '.join(f"{name}: {error}" for name, error in errors) or 'no provider available'
+        super().__init__(f"All LLM providers failed ({detail})")
+        self.errors = errors
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies"""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(round(pct / 100.0 * (len(samples) - 1))))]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'samples': len(self),
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+        }
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after N consecutive failures; half-open after a cooldown
+
+    While half-open a single trial call is let through: success closes the
+    breaker, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_seconds: float = BREAKER_RESET_SECONDS, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if self.clock() - self.opened_at >= self.reset_seconds:
+            return 'half_open'
+        return 'open'
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+
+
+class ProviderStats:
+    """Process-wide latency tracker and circuit breaker per route name"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency: Dict[str, LatencyTracker] = {}
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+    def for_route(self, name: str) -> Tuple[LatencyTracker, CircuitBreaker]:
+        with self._lock:
+            if name not in self.latency:
+                self.latency[name] = LatencyTracker()
+                self.breakers[name] = CircuitBreaker()
+            return self.latency[name], self.breakers[name]
+
+    def reset(self):
+        with self._lock:
+            self.latency.clear()
+            self.breakers.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            names = list(self.latency)
+        return {
+            name: {**self.latency[name].snapshot(), 'breaker': self.breakers[name].state}
+            for name in names
+        }
+
+
+provider_stats = ProviderStats()
+
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='llm-route')
+
+
+def _run_in_worker(fn, *args):
+    try:
+        return fn(*args)
+    finally:
+        # Worker threads may touch the DB (rate limiter); don't leak connections
+        close_old_connections()
+
+
+class RoutingChatModel(BaseChatModel):
+    """
+    Chat model that routes each call over an ordered list of providers
+
+    Attributes:
+        routes: (name, runnable) pairs in preference order; each runnable takes
+                a message list and returns an AIMessage (a chat model, or one
+                bound to a structured-output format)
+        hedge: Fire a backup request when the current one exceeds its p95
+        hedge_deadline: Fixed hedge deadline in seconds (None = from p95)
+        min_hedge_deadline: Lower bound for the p95-derived deadline
+    """
+    routes: List[Tuple[str, Any]]
+    hedge: bool = True
+    hedge_deadline: Optional[float] = None
+    min_hedge_deadline: float = MIN_HEDGE_DEADLINE
+
+    @property
+    def _llm_type(self) -> str:
+        return 'routing'
+
+    @property
+    def route_names(self) -> List[str]:
+        return [name for name, _ in self.routes]
+
+    def map_routes(self, transform: Callable[[Any], Any]) -> 'RoutingChatModel':
+        """Copy with every route runnable transformed (e.g. bound to a schema)"""
+        return self.model_copy(update={'routes': [(name, transform(route)) for name, route in self.routes]})
+
+    def only_route(self, name: str) -> 'RoutingChatModel':
+        """Copy restricted to one route (unchanged if there is no route of that name)"""
+        routes = [(route_name, route) for route_name, route in self.routes if route_name == name]
+        return self.model_copy(update={'routes': routes}) if routes else self
+
+    def _deadline(self, name: str) -> float:
+        if self.hedge_deadline is not None:
+            return self.hedge_deadline
+        tracker, _ = provider_stats.for_route(name)
+        p95 = tracker.percentile(95) if len(tracker) >= MIN_LATENCY_SAMPLES else None
+        if p95 is None:
+            return DEFAULT_HEDGE_DEADLINE
+        return min(MAX_HEDGE_DEADLINE, max(self.min_hedge_deadline, p95))
+
+    def _candidates(self) -> List[Tuple[str, Any]]:
+        available = [
+            (name, route) for name, route in self.routes
+            if provider_stats.for_route(name)[1].state != 'open'
+        ]
+        # With every breaker open, trying the preferred provider beats failing outright
+        return available or self.routes[:1]
+
+    def _call_route(self, name: str, route: Any, messages, config: Dict[str, Any],
+                    token: CancellationToken) -> AIMessage:
+        tracker, breaker = provider_stats.for_route(name)
+        start = time.perf_counter()
+        try:
+            with cancellation_scope(token):
+                message = route.invoke(messages, config=config)
+        except AnalysisCancelled:
+            # Lost the race or the run was cancelled: says nothing about the provider
+            raise
+        except Exception:
+            breaker.record_failure()
+            raise
+        tracker.record(time.perf_counter() - start)
+        breaker.record_success()
+        return message
+
+    @staticmethod
+    def _route_config(run_manager, token: Optional[CancellationToken] = None) -> Dict[str, Any]:
+        if run_manager is not None:
+            # What ParentRunManager.get_child() does; LLM run managers lack it
+            callbacks = CallbackManager(handlers=[], parent_run_id=run_manager.run_id)
+            callbacks.set_handlers(run_manager.inheritable_handlers)
+            callbacks.add_tags(run_manager.inheritable_tags)
+            callbacks.add_metadata(run_manager.inheritable_metadata)
+        else:
+            # _stream() is never given a run manager: use the callbacks in scope (e.g. the graph node's)
+            callbacks = CallbackManager.configure(ensure_config().get('callbacks'))
+        callbacks.add_tags([NESTED_RUN_TAG], inherit=False)
+        if token is not None:
+            callbacks.add_handler(CancellationCallbackHandler(token), inherit=True)
+        return {'callbacks': callbacks}
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if stop:
+            kwargs['stop'] = stop
+        candidates = self._candidates()
+        # Fires once a response has won (or with the run's own token)
+        racing = CancellationToken(parent=current_token())
+        config = self._route_config(run_manager, racing)
+        pending: Dict[Any, str] = {}
+        errors: List[Tuple[str, Exception]] = []
+        next_index = 0
+        last_launch = 0.0
+        last_name = None
+
+        def launch():
+            nonlocal next_index, last_launch, last_name
+            while next_index < len(candidates):
+                name, route = candidates[next_index]
+                next_index += 1
+                # Half-open breakers let a single trial call through
+                if not provider_stats.for_route(name)[1].allow() and len(candidates) > 1:
+                    continue
+                bound = route.bind(**kwargs) if kwargs else route
+                pending[_executor.submit(
+                    contextvars.copy_context().run, _run_in_worker, self._call_route, name, bound, messages,
+                    config, racing,
+                )] = name
+                last_launch, last_name = time.monotonic(), name
+                return
+
+        try:
+            launch()
+            while pending:
+                timeout = None
+                if self.hedge and next_index < len(candidates):
+                    timeout = max(0.0, last_launch + self._deadline(last_name) - time.monotonic())
+                done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    launch()  # Hedge: the current call is slower than usual for its provider
+                    continue
+                for future in done:
+                    name = pending.pop(future)
+                    try:
+                        message = future.result()
+                    except AnalysisCancelled:
+                        raise
+                    except Exception as exc:
+                        errors.append((name, exc))
+                        continue
+                    message.response_metadata = {**(message.response_metadata or {}), 'llm_route': name}
+                    return ChatResult(generations=[ChatGeneration(message=message)])
+                if not pending and next_index < len(candidates):
+                    launch()  # Failover
+            raise AllProvidersFailed(errors)
+        finally:
+            # Hedged calls still in flight stop at their next cancellation point
+            racing.cancel()
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        """Failover only: a stream can't be hedged once chunks have been handed out"""
+        if stop:
+            kwargs['stop'] = stop
+        errors: List[Tuple[str, Exception]] = []
+        candidates = self._candidates()
+        for name, route in candidates:
+            tracker, breaker = provider_stats.for_route(name)
+            if not breaker.allow() and len(candidates) > 1:
+                continue
+            bound = route.bind(**kwargs) if kwargs else route
+            start = time.perf_counter()
+            iterator = iter(bound.stream(messages, config=self._route_config(run_manager)))
+            try:
+                first = next(iterator)
+            except StopIteration:
+                breaker.record_success()
+                return
+            except AnalysisCancelled:
+                raise
+            except Exception as exc:
+                breaker.record_failure()
+                errors.append((name, exc))
+                continue
+            first = _as_chunk(first)
+            first.response_metadata = {**(first.response_metadata or {}), 'llm_route': name}
+            try:
+                yield ChatGenerationChunk(message=first)
+                for chunk in iterator:
+                    yield ChatGenerationChunk(message=_as_chunk(chunk))
+            finally:
+                # A consumer that stops early (e.g. a cancelled run) closes the provider's stream too
+                close = getattr(iterator, 'close', None)
+                if close is not None:
+                    close()
+            tracker.record(time.perf_counter() - start)
+            breaker.record_success()
+            return
+        raise AllProvidersFailed(errors)
+
+
+def _as_chunk(message) -> AIMessageChunk:
+    if isinstance(message, AIMessageChunk):
+        return message
+    return AIMessageChunk(
+        content=message.content,
+        additional_kwargs=getattr(message, 'additional_kwargs', {}),
+        response_metadata=getattr(message, 'response_metadata', {}),
+        tool_call_chunks=[
+            {'name': tc['name'], 'args': json.dumps(tc['args']), 'id': tc.get('id'), 'index': i}
+            for i, tc in enumerate(getattr(message, 'tool_calls', None) or [])
+        ],
+    )
@@ -0,0 +1,329 @@
+"""
+LLM call scheduling: shared rate limits, retries and priorities
+
+Every LLM call takes one request and its estimated tokens from two token
+buckets (requests/min, tokens/min) stored in the database, so all worker
+processes share the same budget. Background calls (analysis agents) must
+leave a reserve in both buckets, which interactive calls (chat) may use,
+so chat is served first when the budget runs low. Rate-limit (429),
+timeout and 5xx responses are retried with jittered exponential backoff,
+honoring Retry-After when the provider sends it. Waits end early when the
+analysis run making the call is cancelled.
+"""
+import random
+import time
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+
+from .cancellation import cancellable_sleep
+
+
+PRIORITY_INTERACTIVE = 'interactive'
+PRIORITY_BACKGROUND = 'background'
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND)
+
+REQUESTS_BUCKET = 'requests_per_minute'
+TOKENS_BUCKET = 'tokens_per_minute'
+
+# Completion size assumed before the provider reports actual usage
+DEFAULT_COMPLETION_TOKENS = 1000
+
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+RETRYABLE_ERROR_NAMES = {'APIConnectionError', 'APITimeoutError', 'RateLimitError', 'InternalServerError'}
+
+
+class RateLimitTimeout(RuntimeError):
+    """Raised when a call could not get rate-limit budget within max_wait seconds"""
+
+
+def estimate_tokens(messages, max_tokens: Optional[int] = None) -> int:
+    """Rough prompt + completion token estimate (4 characters per token)"""
+    chars = 0
+    for message in messages:
+        content = getattr(message, 'content', message)
+        chars += len(content) if isinstance(content, str) else len(str(content))
+    return chars // 4 + (DEFAULT_COMPLETION_TOKENS if max_tokens is None else max_tokens)
+
+
+def retry_after(exc: Exception) -> Tuple[bool, Optional[float]]:
+    """
+    Classify a provider error
+
+    Returns:
+        (retryable, seconds the provider asked us to wait or None)
+    """
+    response = getattr(exc, 'response', None)
+    status = getattr(exc, 'status_code', None) or getattr(response, 'status_code', None)
+    retryable = (
+        (status is not None and (status in RETRYABLE_STATUS_CODES or 500 <= status < 600))
+        or (status is None and type(exc).__name__ in RETRYABLE_ERROR_NAMES)
+    )
+
+    delay = None
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        if headers.get('retry-after-ms'):
+            delay = float(headers['retry-after-ms']) / 1000.0
+        elif headers.get('retry-after'):
+            delay = float(headers['retry-after'])
+    except (TypeError, ValueError):
+        delay = None
+    return retryable, delay
+
+
+class DatabaseRateLimiter:
+    """
+    Requests/min and tokens/min token buckets in the llm_rate_limit_buckets table
+
+    Both buckets are refilled continuously and taken from in one
+    transaction, so a call never holds budget from one without the other.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float,
+                 background_reserve: float = 0.2):
+        self.capacities = {REQUESTS_BUCKET: float(requests_per_minute), TOKENS_BUCKET: float(tokens_per_minute)}
+        self.background_reserve = background_reserve
+
+    def _amounts(self, tokens: int):
+        return {
+            REQUESTS_BUCKET: 1.0,
+            # A single call larger than the whole bucket would otherwise wait forever
+            TOKENS_BUCKET: min(float(tokens), self.capacities[TOKENS_BUCKET]),
+        }
+
+    def _locked_buckets(self, now: float):
+        from ..models import LLMRateLimitBucket
+
+        names = sorted(name for name, capacity in self.capacities.items() if capacity > 0)
+        if connection.vendor == 'sqlite':
+            # SQLite ignores FOR UPDATE; taking the write lock up front makes
+            # concurrent callers queue on busy_timeout instead of failing
+            # with "database is locked" when upgrading a read transaction
+            LLMRateLimitBucket.objects.filter(name__in=names).update(updated_at=F('updated_at'))
+        buckets = {b.name: b for b in LLMRateLimitBucket.objects.select_for_update().filter(name__in=names)}
+        missing = [name for name in names if name not in buckets]
+        if missing:
+            try:
+                with transaction.atomic():
+                    LLMRateLimitBucket.objects.bulk_create([
+                        LLMRateLimitBucket(name=name, tokens=self.capacities[name], updated_at=now)
+                        for name in missing
+                    ])
+            except IntegrityError:
+                pass  # Another worker created them first
+            buckets = {b.name: b for b in LLMRateLimitBucket.objects.select_for_update().filter(name__in=names)}
+        return buckets
+
+    def try_acquire(self, tokens: int, priority: str = PRIORITY_BACKGROUND) -> float:
+        """
+        Take one request and `tokens` tokens if available
+
+        Returns:
+            0 if acquired, otherwise the estimated seconds to wait before retrying
+        """
+        now = time.time()
+        amounts = self._amounts(tokens)
+        reserve = self.background_reserve if priority == PRIORITY_BACKGROUND else 0.0
+
+        with transaction.atomic():
+            buckets = self._locked_buckets(now)
+            wait = 0.0
+            levels = {}
+            for name, bucket in buckets.items():
+                capacity = self.capacities[name]
+                rate = capacity / 60.0
+                level = min(capacity, bucket.tokens + (now - bucket.updated_at) * rate)
+                levels[name] = level
+                shortfall = amounts[name] + reserve * capacity - level
+                if shortfall > 0:
+                    wait = max(wait, shortfall / rate)
+
+            for name, bucket in buckets.items():
+                bucket.tokens = levels[name] - (amounts[name] if wait == 0 else 0.0)
+                bucket.updated_at = now
+                bucket.save(update_fields=['tokens', 'updated_at'])
+        return wait
+
+    def adjust_tokens(self, delta: int):
+        """Correct the tokens bucket once actual usage is known (positive delta = used more)"""
+        if not delta or self.capacities[TOKENS_BUCKET] <= 0:
+            return
+        from ..models import LLMRateLimitBucket
+
+        LLMRateLimitBucket.objects.filter(name=TOKENS_BUCKET).update(tokens=F('tokens') - delta)
+
+
+class LLMScheduler:
+    """
+    Runs LLM calls under the shared rate limits with retries
+
+    Args:
+        limiter: DatabaseRateLimiter, or None for no rate limiting
+        max_retries: Retries after the first attempt for retryable errors
+        base_delay / max_delay: Backoff bounds in seconds
+        max_wait: Longest time a call may wait for rate-limit budget
+        sleep: Wait function (default: interrupted by the current run's cancellation)
+    """
+
+    def __init__(self, limiter: Optional[DatabaseRateLimiter] = None, max_retries: int = 5,
+                 base_delay: float = 1.0, max_delay: float = 60.0, max_wait: float = 300.0,
+                 sleep: Callable[[float], None] = cancellable_sleep):
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_wait = max_wait
+        self.sleep = sleep
+
+    def acquire(self, tokens: int, priority: str = PRIORITY_BACKGROUND):
+        """Block until the call fits in the rate limits"""
+        if self.limiter is None:
+            return
+        deadline = time.monotonic() + self.max_wait
+        # Interactive calls poll more often so they win the next free slot
+        poll = 0.25 if priority == PRIORITY_INTERACTIVE else 1.0
+        while True:
+            wait = self.limiter.try_acquire(tokens, priority)
+            if wait <= 0:
+                return
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise RateLimitTimeout(f"No LLM rate-limit budget within {self.max_wait:.0f}s")
+            self.sleep(min(wait, poll, remaining) * random.uniform(0.8, 1.2))
+
+    def backoff(self, attempt: int, hint: Optional[float] = None) -> float:
+        """Full-jitter exponential backoff, never shorter than the provider's Retry-After"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        return max(delay, hint or 0.0)
+
+    def record_usage(self, estimated: int, actual: Optional[int]):
+        if self.limiter is not None and actual:
+            self.limiter.adjust_tokens(actual - estimated)
+
+    def call(self, fn: Callable[[], Any], estimated_tokens: int,
+             priority: str = PRIORITY_BACKGROUND, max_retries: Optional[int] = None) -> Any:
+        """
+        Run fn() once budget is available, retrying retryable provider errors
+
+        Args:
+            fn: Zero-argument callable making the provider request
+            estimated_tokens: Tokens to take from the tokens/min bucket
+            priority: PRIORITY_INTERACTIVE or PRIORITY_BACKGROUND
+            max_retries: Override of the scheduler's retry count for this call
+        """
+        max_retries = self.max_retries if max_retries is None else max_retries
+        attempt = 0
+        while True:
+            self.acquire(estimated_tokens, priority)
+            try:
+                return fn()
+            except Exception as exc:
+                retryable, hint = retry_after(exc)
+                if not retryable or attempt >= max_retries:
+                    raise
+                self.sleep(self.backoff(attempt, hint))
+                attempt += 1
+
+    def stream(self, fn: Callable[[], Iterator[Any]], estimated_tokens: int,
+               priority: str = PRIORITY_BACKGROUND, max_retries: Optional[int] = None) -> Iterator[Any]:
+        """
+        Like call() for a streaming request
+
+        Errors are only retried before the first chunk; once output has been
+        yielded a retry would duplicate it.
+        """
+        max_retries = self.max_retries if max_retries is None else max_retries
+        attempt = 0
+        while True:
+            self.acquire(estimated_tokens, priority)
+            iterator = iter(fn())
+            try:
+                first = next(iterator)
+            except StopIteration:
+                return
+            except Exception as exc:
+                retryable, hint = retry_after(exc)
+                if not retryable or attempt >= max_retries:
+                    raise
+                self.sleep(self.backoff(attempt, hint))
+                attempt += 1
+                continue
+            yield first
+            yield from iterator
+            return
+
+
+_scheduler: Optional[LLMScheduler] = None
+
+
+def get_scheduler() -> LLMScheduler:
+    """Process-wide scheduler configured from AI_CONFIG['RATE_LIMIT']"""
+    global _scheduler
+    if _scheduler is None:
+        from django.conf import settings
+
+        config = settings.AI_CONFIG.get('RATE_LIMIT', {})
+        rpm = config.get('REQUESTS_PER_MINUTE', 0)
+        tpm = config.get('TOKENS_PER_MINUTE', 0)
+        limiter = None
+        if rpm > 0 or tpm > 0:
+            limiter = DatabaseRateLimiter(rpm, tpm, config.get('BACKGROUND_RESERVE', 0.2))
+        _scheduler = LLMScheduler(
+            limiter,
+            max_retries=config.get('MAX_RETRIES', 5),
+            base_delay=config.get('BASE_DELAY', 1.0),
+            max_delay=config.get('MAX_DELAY', 60.0),
+            max_wait=config.get('MAX_WAIT', 300.0),
+        )
+    return _scheduler
+
+
+def usage_total_tokens(message) -> Optional[int]:
+    """Total tokens reported on an AI message, if any"""
+    usage = getattr(message, 'usage_metadata', None) or {}
+    return usage.get('total_tokens')
+
+
+class ScheduledChatModelMixin:
+    """
+    Mixin for LangChain chat model classes that routes calls through the scheduler
+
+    Mixed into the provider classes (rather than wrapping the model) so
+    isinstance checks, bind() and bind_tools() keep working. The provider
+    SDK's own retries should be disabled (max_retries=0). Subclasses
+    declare an `llm_priority` field and may declare `llm_max_retries` to
+    override the scheduler's retry count (e.g. fewer retries when a router
+    can fail over to another provider instead).
+    """
+
+    def _scheduled_estimate(self, messages: List[Any]) -> int:
+        return estimate_tokens(messages, getattr(self, 'max_tokens', None))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        scheduler = get_scheduler()
+        estimated = self._scheduled_estimate(messages)
+        result = scheduler.call(
+            lambda: super(ScheduledChatModelMixin, self)._generate(messages, stop, run_manager, **kwargs),
+            estimated,
+            getattr(self, 'llm_priority', PRIORITY_BACKGROUND),
+            getattr(self, 'llm_max_retries', None),
+        )
+        if result.generations:
+            scheduler.record_usage(estimated, usage_total_tokens(result.generations[0].message))
+        return result
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        scheduler = get_scheduler()
+        estimated = self._scheduled_estimate(messages)
+        actual = 0
+        for chunk in scheduler.stream(
+            lambda: super(ScheduledChatModelMixin, self)._stream(messages, stop, run_manager, **kwargs),
+            estimated,
+            getattr(self, 'llm_priority', PRIORITY_BACKGROUND),
+            getattr(self, 'llm_max_retries', None),
+        ):
+            actual += usage_total_tokens(chunk.message) or 0
+            yield chunk
+        scheduler.record_usage(estimated, actual)
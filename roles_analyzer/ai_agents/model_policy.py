@@ -0,0 +1,110 @@
+"""
+Per-node model selection and usage accounting
+
+Each workflow node gets its model and temperature from
+AI_CONFIG['NODE_MODELS'], so the four analyzers (summarization over
+precomputed facts) can run on a small fast model while synthesis keeps the
+large one. Prompts larger than AI_CONFIG['LARGE_PROMPT_TOKENS'] are sent to
+AI_CONFIG['LARGE_PROMPT_MODEL'] instead, whatever the node. Latency, token
+usage (including prompt-cache reads and writes) and estimated cost of every
+call are returned as per-node metrics.
+"""
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+
+from .llm_scheduler import estimate_tokens
+
+
+@dataclass(frozen=True)
+class ModelChoice:
+    """Model picked for one node call and why"""
+    node: str
+    model: str
+    temperature: float
+    reason: str  # 'node', 'default' or 'prompt_size'
+
+
+def select_model(node: str, messages, default_temperature: float) -> ModelChoice:
+    """
+    Pick the model and temperature for a node's prompt
+
+    Args:
+        node: Workflow node name (org_structure, responsibilities, workload, skills, synthesize)
+        messages: Formatted prompt messages, used to estimate the prompt size
+        default_temperature: Temperature used when the node config sets none
+
+    Returns:
+        ModelChoice; `model` is a plain model name or a "provider:model,..." route list
+    """
+    ai_config = settings.AI_CONFIG
+    node_config = ai_config.get('NODE_MODELS', {}).get(node, {})
+    temperature = node_config.get('temperature')
+    if temperature is None:
+        temperature = default_temperature
+
+    large_model = ai_config.get('LARGE_PROMPT_MODEL')
+    threshold = ai_config.get('LARGE_PROMPT_TOKENS', 0)
+    if large_model and threshold > 0 and estimate_tokens(messages, 0) > threshold:
+        return ModelChoice(node, large_model, temperature, 'prompt_size')
+
+    if node_config.get('model'):
+        return ModelChoice(node, node_config['model'], temperature, 'node')
+    return ModelChoice(node, ai_config.get('MODEL', 'gpt-4'), temperature, 'default')
+
+
+def model_price(model: str) -> Optional[Dict[str, float]]:
+    """USD per 1M input/output tokens for a model, matched on the longest configured prefix"""
+    prices = settings.AI_CONFIG.get('MODEL_PRICES', {})
+    matches = [prefix for prefix in prices if model and model.startswith(prefix)]
+    return prices[max(matches, key=len)] if matches else None
+
+
+def usage_metrics(choice: ModelChoice, message, started: float) -> Dict[str, Any]:
+    """
+    Latency, tokens and estimated cost of one node call
+
+    Args:
+        choice: Model selection for the call
+        message: Final AIMessage (or aggregated stream chunk)
+        started: time.perf_counter() value taken before the call
+
+    Returns:
+        JSON-serializable metrics dictionary
+    """
+    usage = getattr(message, 'usage_metadata', None) or {}
+    metadata = getattr(message, 'response_metadata', None) or {}
+    # Providers report the exact model that served the call (may differ under routing)
+    model = metadata.get('model_name') or metadata.get('model') or choice.model
+    input_tokens = usage.get('input_tokens')
+    output_tokens = usage.get('output_tokens')
+    # Prompt-prefix cache hits and writes, both included in input_tokens
+    details = usage.get('input_token_details') or {}
+    cache_read = details.get('cache_read') or 0
+    cache_creation = details.get('cache_creation') or 0
+
+    cost = None
+    price = model_price(model)
+    if price and input_tokens is not None and output_tokens is not None:
+        uncached = max(input_tokens - cache_read - cache_creation, 0)
+        cost = round((
+            uncached * price['input']
+            + cache_read * price.get('cached_input', price['input'])
+            + cache_creation * price.get('cache_write', price['input'])
+            + output_tokens * price['output']
+        ) / 1_000_000, 6)
+
+    return {
+        'model': model,
+        'route': metadata.get('llm_route'),
+        'reason': choice.reason,
+        'temperature': choice.temperature,
+        'latency_seconds': round(time.perf_counter() - started, 3),
+        'input_tokens': input_tokens,
+        'output_tokens': output_tokens,
+        'cache_read_tokens': cache_read,
+        'cache_creation_tokens': cache_creation,
+        'cost_usd': cost,
+    }
@@ -0,0 +1,97 @@
+"""
+Immutable organization snapshot for one analysis run
+
+The raw job role and employee rows are read once, in a single pass over
+the employees (which may be a streaming queryset iterator), and reduced to
+the compact per-agent summaries the analyzers actually use: structural
+findings, responsibility rows, workload tables and skill coverage facts.
+Only the snapshot id and these summaries go into the LangGraph state, so
+the org is never copied through the graph, merged at every node or written
+into each checkpoint; summary size depends on roles and departments, not
+on employee count.
+"""
+import hashlib
+import json
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Tuple
+
+from ..skills_engine import SkillMatrix, compute_skill_coverage, format_skill_facts
+from ..structure_engine import analyze_structure, format_structure_facts
+from .agents import responsibility_rows, workload_rows
+
+
+@dataclass(frozen=True)
+class OrgSnapshot:
+    """
+    Per-agent summaries of the organization an analysis runs on
+
+    Attributes:
+        snapshot_id: Content hash of the summaries (identical data, identical id)
+        departments: Departments in scope
+        total_roles: Job roles in scope
+        total_employees: Employees read
+        summaries: Agent name -> JSON-serializable summary
+    """
+    snapshot_id: str
+    departments: Tuple[str, ...]
+    total_roles: int
+    total_employees: int
+    summaries: Dict[str, Dict[str, Any]]
+
+
+def build_org_snapshot(job_roles: List[Dict[str, Any]], employees: Iterable[Dict[str, Any]],
+                       departments: List[str]) -> OrgSnapshot:
+    """
+    Reduce raw org data to per-agent summaries
+
+    Args:
+        job_roles: Job role dictionaries
+        employees: Employee dictionaries (department, role_id, workload_status,
+                   skills); consumed once, so a queryset iterator works
+        departments: Departments in scope
+
+    Returns:
+        OrgSnapshot
+    """
+    in_scope = set(departments)
+    status_counts: Counter = Counter()
+    role_overloaded: Counter = Counter()
+
+    def employee_skills():
+        # Workload counts are taken in the same pass that feeds the skill matrix
+        for employee in employees:
+            department = employee['department']
+            status_counts[(department, employee['workload_status'])] += 1
+            if employee['workload_status'] == 'overloaded':
+                role_overloaded[employee['role_id']] += 1
+            if department in in_scope:
+                yield department, employee['skills']
+
+    matrix = SkillMatrix(
+        employee_skills(),
+        ((r['department'], r['required_skills']) for r in job_roles if r['department'] in in_scope),
+    )
+    skill_facts = format_skill_facts(compute_skill_coverage(matrix))
+    del matrix
+
+    workload_stats, role_workload = workload_rows(job_roles, status_counts, role_overloaded, departments)
+    summaries = {
+        'org_structure': {
+            'total_roles': len(job_roles),
+            'structure_facts': format_structure_facts(analyze_structure(job_roles)),
+        },
+        'responsibilities': {'roles': responsibility_rows(job_roles)},
+        'workload': {'workload_stats': workload_stats, 'role_workload': role_workload},
+        'skills': {'skill_facts': skill_facts},
+    }
+    digest = hashlib.sha256(
+        json.dumps([departments, summaries], sort_keys=True, default=str).encode('utf-8')
+    ).hexdigest()[:16]
+    return OrgSnapshot(
+        snapshot_id=digest,
+        departments=tuple(departments),
+        total_roles=len(job_roles),
+        total_employees=sum(status_counts.values()),
+        summaries=summaries,
+    )
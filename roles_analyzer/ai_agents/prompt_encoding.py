@@ -0,0 +1,274 @@
+"""
+Token-efficient serialization of agent inputs
+
+Tables are written header-once as TSV instead of indented JSON, which
+repeats every key (and the whitespace around it) on every row. The
+'tsv_dict' encoding also replaces repeated values of chosen columns
+(departments, skills) with short codes explained in a legend.
+
+Each agent's data is split into named sections with progressively coarser
+renderings. fit_to_budget() keeps the total under a token budget by moving
+the currently longest section to its next, more summarized rendering, and
+only truncates once every section is at its coarsest.
+"""
+import json
+import math
+import re
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+from django.conf import settings
+
+
+ENCODINGS = ('json', 'json_compact', 'tsv', 'tsv_dict')
+DEFAULT_ENCODING = 'tsv'
+DEFAULT_TOKEN_BUDGET = 12000
+
+LIST_SEPARATOR = '; '
+TRUNCATION_MARKER = '[... truncated to fit the prompt budget]'
+
+# Approximates BPE pre-tokenization when tiktoken's vocabulary isn't available
+_PRETOKEN_RE = re.compile(r" ?[A-Za-z]+| ?\d{1,3}| ?[^\sA-Za-z\d]+|\s+")
+
+_encoder = None
+
+
+def _get_encoder():
+    global _encoder
+    if _encoder is None:
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding('cl100k_base')
+        except Exception:
+            # tiktoken missing, or its vocabulary can't be downloaded (offline)
+            _encoder = False
+    return _encoder
+
+
+def token_counter_name() -> str:
+    """Which counter count_tokens() uses: 'tiktoken' or 'estimate'"""
+    return 'tiktoken' if _get_encoder() else 'estimate'
+
+
+def count_tokens(text: str) -> int:
+    """Prompt tokens of a text (exact with tiktoken, otherwise a close estimate)"""
+    if not text:
+        return 0
+    encoder = _get_encoder()
+    if encoder:
+        return len(encoder.encode(text, disallowed_special=()))
+    return sum(max(1, math.ceil(len(piece.strip() or piece) / 6)) for piece in _PRETOKEN_RE.findall(text))
+
+
+def prompt_settings() -> Dict[str, Any]:
+    """Encoding and per-agent token budget from AI_CONFIG"""
+    ai_config = settings.AI_CONFIG
+    encoding = ai_config.get('PROMPT_ENCODING', DEFAULT_ENCODING)
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown prompt encoding: {encoding}")
+    return {
+        'encoding': encoding,
+        'budget': ai_config.get('PROMPT_TOKEN_BUDGET', DEFAULT_TOKEN_BUDGET),
+    }
+
+
+class Codebook:
+    """Short codes for the repeated values of one column, most frequent first"""
+
+    def __init__(self, prefix: str, values, min_count: int = 2):
+        counts = Counter(values)
+        repeated = sorted(
+            ((value, count) for value, count in counts.items() if count >= min_count),
+            key=lambda item: (-item[1], str(item[0])),
+        )
+        self.prefix = prefix
+        self.codes = {value: f"{prefix}{i}" for i, (value, _) in enumerate(repeated, 1)}
+        self.saved_tokens = sum(
+            (count_tokens(str(value)) - count_tokens(code)) * counts[value] for value, code in self.codes.items()
+        ) - count_tokens(self.legend(''))
+
+    def encode(self, value):
+        return self.codes.get(value, value)
+
+    def legend(self, column: str) -> str:
+        return f"{column} codes: " + ', '.join(f"{code}={value}" for value, code in self.codes.items())
+
+
+def _cell(value: Any) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, (list, tuple)):
+        return LIST_SEPARATOR.join(_cell(item) for item in value)
+    if isinstance(value, float):
+        value = f"{value:g}"
+    # Tabs and newlines would break the row structure
+    return ' '.join(str(value).split())
+
+
+def encode_table(rows: Sequence[Dict[str, Any]], columns: Sequence[str], encoding: str = DEFAULT_ENCODING,
+                 codes: Optional[Dict[str, str]] = None) -> str:
+    """
+    Serialize rows of dicts for a prompt
+
+    Args:
+        rows: Records to serialize
+        columns: Keys to include, in order (the TSV header)
+        encoding: One of ENCODINGS
+        codes: Column -> code prefix for dictionary encoding ('tsv_dict' only);
+               list-valued columns have each item encoded
+
+    Returns:
+        Serialized text
+    """
+    if encoding == 'json':
+        return json.dumps([{c: row.get(c) for c in columns} for row in rows], indent=2)
+    if encoding == 'json_compact':
+        # One row per line so the budget can truncate between rows
+        return '[\n' + ',\n'.join(
+            json.dumps({c: row.get(c) for c in columns}, separators=(',', ':')) for row in rows
+        ) + '\n]'
+    if encoding not in ('tsv', 'tsv_dict'):
+        raise ValueError(f"Unknown prompt encoding: {encoding}")
+    if not rows:
+        return '(none)'
+
+    codebooks = {}
+    if encoding == 'tsv_dict':
+        for column, prefix in (codes or {}).items():
+            values = []
+            for row in rows:
+                value = row.get(column)
+                values.extend(value if isinstance(value, (list, tuple)) else [value])
+            codebook = Codebook(prefix, [v for v in values if v not in (None, '')])
+            # Codes only pay off when values repeat enough to cover the legend
+            if codebook.codes and codebook.saved_tokens > 0:
+                codebooks[column] = codebook
+
+    lines = [codebook.legend(column) for column, codebook in codebooks.items()]
+    lines.append('\t'.join(columns))
+    for row in rows:
+        cells = []
+        for column in columns:
+            value = row.get(column)
+            codebook = codebooks.get(column)
+            if codebook is not None:
+                value = [codebook.encode(v) for v in value] if isinstance(value, (list, tuple)) else codebook.encode(value)
+            cells.append(_cell(value))
+        lines.append('\t'.join(cells))
+    return '\n'.join(lines)
+
+
+def truncate_text(text: str, max_tokens: int) -> str:
+    """Keep whole leading lines of text within max_tokens, marking the cut"""
+    if count_tokens(text) <= max_tokens:
+        return text
+    budget = max(0, max_tokens - count_tokens(TRUNCATION_MARKER) - 1)
+    kept, used = [], 0
+    for line in text.split('\n'):
+        cost = count_tokens(line) + 1
+        if used + cost > budget:
+            if not kept:
+                # A single oversized line: keep a proportional prefix of it
+                kept.append(line[:len(line) * budget // cost])
+            break
+        kept.append(line)
+        used += cost
+    return '\n'.join(kept + [TRUNCATION_MARKER])
+
+
+Rendering = Union[str, Callable[[], str]]
+
+
+class PromptSection:
+    """
+    One prompt variable with renderings from most detailed to most summarized
+
+    Renderings may be callables so coarser summaries are only computed
+    when the budget needs them.
+    """
+
+    def __init__(self, name: str, renderings: Sequence[Rendering]):
+        if not renderings:
+            raise ValueError(f"Section {name} needs at least one rendering")
+        self.name = name
+        self.renderings = list(renderings)
+        self.level = 0
+        self._text = None
+        self._tokens = None
+        self.truncated = False
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            rendering = self.renderings[self.level]
+            self._text = rendering() if callable(rendering) else rendering
+        return self._text
+
+    @property
+    def tokens(self) -> int:
+        if self._tokens is None:
+            self._tokens = count_tokens(self.text)
+        return self._tokens
+
+    @property
+    def can_summarize(self) -> bool:
+        return self.level < len(self.renderings) - 1
+
+    def summarize(self):
+        self.level += 1
+        self._text = self._tokens = None
+
+    def truncate(self, max_tokens: int):
+        self._text = truncate_text(self.text, max_tokens)
+        self._tokens = None
+        self.truncated = True
+
+
+def fit_to_budget(sections: List[PromptSection], budget: Optional[int]) -> Dict[str, str]:
+    """
+    Render sections within a total token budget
+
+    The longest section that still has a coarser rendering is summarized
+    first, repeatedly; if everything is fully summarized and still over
+    budget, the longest sections are truncated.
+
+    Args:
+        sections: Prompt sections of one agent
+        budget: Token budget for all sections together (None or <= 0 = unlimited)
+
+    Returns:
+        Section name -> text to put in the prompt
+    """
+    if budget and budget > 0:
+        while sum(s.tokens for s in sections) > budget:
+            summarizable = [s for s in sections if s.can_summarize]
+            if not summarizable:
+                break
+            max(summarizable, key=lambda s: s.tokens).summarize()
+
+        excess = sum(s.tokens for s in sections) - budget
+        for section in sorted(sections, key=lambda s: s.tokens, reverse=True):
+            if excess <= 0:
+                break
+            before = section.tokens
+            section.truncate(max(before - excess, 0))
+            excess -= before - section.tokens
+    return {section.name: section.text for section in sections}
+
+
+def describe_sections(sections: List[PromptSection]) -> Dict[str, Dict[str, Any]]:
+    """Tokens, summary level and truncation of each section (for logs and benchmarks)"""
+    return {
+        section.name: {'tokens': section.tokens, 'level': section.level, 'truncated': section.truncated}
+        for section in sections
+    }
+
+
+def format_note(encoding: str) -> str:
+    """One-line explanation of the table format for the prompt"""
+    if encoding in ('tsv', 'tsv_dict'):
+        note = "Tables are tab-separated with a header row; list items are separated by ';'."
+        if encoding == 'tsv_dict':
+            note += " Coded values (e.g. D1) are explained in the codes line above each table."
+        return note
+    return "Data is given as JSON."
@@ -0,0 +1,112 @@
+"""
+Schema and validation for synthesized missing-role recommendations
+
+The same pydantic model is used as the provider structured-output schema
+(tool / JSON-schema mode) and, through a validator compiled once at import,
+to check and repair each recommendation individually.
+"""
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError, field_validator
+
+
+PRIORITIES = ('critical', 'high', 'medium', 'low')
+GAP_TYPES = ('structural', 'skills', 'workload', 'responsibility')
+
+# Keys LLMs commonly use instead of the schema's names
+KEY_ALIASES = {
+    'title': 'role_title',
+    'role': 'role_title',
+    'role_name': 'role_title',
+    'recommended_role_title': 'role_title',
+    'dept': 'department',
+    'seniority': 'level',
+    'headcount': 'recommended_headcount',
+    'timeline': 'estimated_timeline',
+    'skills': 'required_skills',
+    'impact': 'expected_impact',
+}
+
+
+def _as_list(value: Any) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        separator = '\n' if '\n' in value else ','
+        return [part.strip(' -*\t') for part in value.split(separator) if part.strip(' -*\t')]
+    return [str(item).strip() for item in value if str(item).strip()]
+
+
+class Recommendation(BaseModel):
+    """One recommended missing role"""
+    role_title: str = Field(min_length=1, max_length=200, description='Specific job title')
+    department: str = Field(default='Unknown', max_length=100)
+    level: str = Field(default='mid', description='junior/mid/senior/manager')
+    gap_type: str = Field(default='unknown', description='structural/skills/workload/responsibility')
+    justification: str = Field(default='', description='Why the role is needed, citing findings')
+    expected_impact: str = Field(default='')
+    priority: str = Field(default='medium', description='critical/high/medium/low')
+    recommended_headcount: int = Field(default=1, ge=1, le=100)
+    estimated_timeline: str = Field(default='', max_length=100)
+    required_skills: List[str] = Field(default_factory=list)
+    responsibilities: List[str] = Field(default_factory=list)
+
+    @field_validator('role_title', 'department', 'justification', 'expected_impact', 'estimated_timeline',
+                     mode='before')
+    @classmethod
+    def _strip(cls, value):
+        return str(value).strip() if value is not None else value
+
+    @field_validator('level', 'gap_type', mode='before')
+    @classmethod
+    def _lower(cls, value):
+        return str(value).strip().lower().replace(' ', '_') if value else value
+
+    @field_validator('priority', mode='before')
+    @classmethod
+    def _priority(cls, value):
+        value = str(value or 'medium').strip().lower()
+        return value if value in PRIORITIES else 'medium'
+
+    @field_validator('recommended_headcount', mode='before')
+    @classmethod
+    def _headcount(cls, value):
+        try:
+            return min(max(int(float(str(value).split()[0])), 1), 100)
+        except (TypeError, ValueError, IndexError):
+            return 1
+
+    @field_validator('required_skills', 'responsibilities', mode='before')
+    @classmethod
+    def _list(cls, value):
+        return _as_list(value)
+
+
+class RecommendationBatch(BaseModel):
+    """Structured-output envelope: providers require an object at the top level"""
+    recommendations: List[Recommendation]
+
+
+_recommendation_validator = TypeAdapter(Recommendation)
+
+
+def validate_recommendation(item: Any) -> Optional[Dict[str, Any]]:
+    """
+    Validate and repair a single recommendation
+
+    Args:
+        item: Parsed JSON value from the LLM
+
+    Returns:
+        Normalized recommendation dict, or None if it cannot be salvaged
+    """
+    if not isinstance(item, dict):
+        return None
+    data = {}
+    for key, value in item.items():
+        key = str(key).strip().lower().replace(' ', '_')
+        data.setdefault(KEY_ALIASES.get(key, key), value)
+    try:
+        return _recommendation_validator.validate_python(data).model_dump()
+    except ValidationError:
+        return None
@@ -1,16 +1,21 @@
 """
 Shared state definition for LangGraph workflow
 """
-from typing import TypedDict, List, Dict, Any, Optional
+import operator
+from typing import Annotated, TypedDict, List, Dict, Any, Optional
+
+
+def merge_dicts(left: Optional[Dict[str, Any]], right: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Reducer: each node adds its own keys"""
+    return {**(left or {}), **(right or {})}
 
 
 class AnalysisState(TypedDict):
     """State passed between agents in the workflow"""
     
-    # Input data
-    org_data: Dict[str, Any]  # Raw organizational data
-    job_roles: List[Dict[str, Any]]
-    employees: List[Dict[str, Any]]
+    # Input data: an OrgSnapshot's id and per-agent summaries (never the raw rows)
+    snapshot_id: str
+    org_summary: Dict[str, Dict[str, Any]]
     departments: List[str]
     
     # Previous recommendations to avoid duplicates
@@ -26,7 +31,10 @@ class AnalysisState(TypedDict):
     # Final output
     recommendations: Optional[List[Dict[str, Any]]]
     
-    # Metadata
-    analysis_progress: List[str]
+    # Metadata (each node appends its own entries)
+    analysis_progress: Annotated[List[str], operator.add]
     error: Optional[str]
+    
+    # Per-node model, latency, token usage and estimated cost
+    node_metrics: Annotated[Dict[str, Dict[str, Any]], merge_dicts]
 
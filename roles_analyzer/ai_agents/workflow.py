@@ -3,9 +3,20 @@ LangGraph workflow orchestration
 """
 import sys
 import os
-from typing import Dict, Any
+import inspect
+import sqlite3
+import threading
+from typing import Callable, Dict, Any, Optional
+from django.conf import settings
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.memory import InMemorySaver
 from langgraph.graph import StateGraph, END
 from .state import AnalysisState
+from .org_snapshot import OrgSnapshot, build_org_snapshot
+from .llm_factory import stream_text
+from .cancellation import (
+    AnalysisCancelled, CancellationCallbackHandler, CancellationToken, cancellation_scope, raise_if_cancelled,
+)
 from .agents import (
     org_structure_analyzer,
     responsibility_analyzer,
@@ -43,7 +54,69 @@ except ImportError:
     print = safe_print
 
 
-def create_analysis_workflow():
+class AnalysisNodeError(RuntimeError):
+    """An agent node reported an error; the run stops so it can be resumed from that node"""
+    
+    def __init__(self, node: str, message: str):
+        super().__init__(f"{node}: {message}")
+        self.node = node
+        self.message = message
+
+
+def _fail_on_error(node: str, agent: Callable) -> Callable:
+    """
+    Wrap an agent so an error it reports stops the graph
+    
+    Agents catch their own exceptions and return {"error": ...}. Raising
+    instead means the failed node's output is never checkpointed, so
+    resuming the thread re-runs exactly that node. A cancelled run stops
+    before the node, or with AnalysisCancelled if it is cancelled midway.
+    """
+    takes_config = 'config' in inspect.signature(agent).parameters
+    
+    def run(state: AnalysisState, config: RunnableConfig) -> Dict[str, Any]:
+        raise_if_cancelled()
+        result = agent(state, config) if takes_config else agent(state)
+        if result.get("error"):
+            # The agent reports the cancellation raised inside its model call as an error
+            raise_if_cancelled()
+            raise AnalysisNodeError(node, result["error"])
+        return result
+    
+    run.__name__ = agent.__name__
+    return run
+
+
+_checkpointer = None
+_checkpointer_lock = threading.Lock()
+
+
+def get_checkpointer():
+    """
+    Process-wide checkpointer for analysis runs
+    
+    Uses a SQLite file (AI_CONFIG['CHECKPOINT_DB']) when
+    langgraph-checkpoint-sqlite is installed, so runs can be resumed after
+    a restart; otherwise checkpoints are kept in memory.
+    """
+    global _checkpointer
+    if _checkpointer is None:
+        with _checkpointer_lock:
+            if _checkpointer is None:
+                try:
+                    from langgraph.checkpoint.sqlite import SqliteSaver
+                except ImportError:
+                    print("[*] langgraph-checkpoint-sqlite not installed, keeping analysis checkpoints in memory")
+                    _checkpointer = InMemorySaver()
+                else:
+                    path = settings.AI_CONFIG.get('CHECKPOINT_DB') or ':memory:'
+                    saver = SqliteSaver(sqlite3.connect(path, check_same_thread=False))
+                    saver.setup()
+                    _checkpointer = saver
+    return _checkpointer
+
+
+def create_analysis_workflow(checkpointer=None):
     """
     Creates the LangGraph workflow for multi-agent analysis
     
@@ -53,17 +126,20 @@ def create_analysis_workflow():
     3. Workload Analyzer
     4. Skills Analyzer
     5. Synthesizer (combines all findings)
+    
+    Args:
+        checkpointer: Optional LangGraph checkpointer; state is saved after every node
     """
     
     # Create state graph
     workflow = StateGraph(AnalysisState)
     
     # Add nodes (agents)
-    workflow.add_node("org_structure", org_structure_analyzer)
-    workflow.add_node("responsibilities", responsibility_analyzer)
-    workflow.add_node("workload", workload_analyzer)
-    workflow.add_node("skills", skills_analyzer)
-    workflow.add_node("synthesize", synthesizer)
+    workflow.add_node("org_structure", _fail_on_error("org_structure", org_structure_analyzer))
+    workflow.add_node("responsibilities", _fail_on_error("responsibilities", responsibility_analyzer))
+    workflow.add_node("workload", _fail_on_error("workload", workload_analyzer))
+    workflow.add_node("skills", _fail_on_error("skills", skills_analyzer))
+    workflow.add_node("synthesize", _fail_on_error("synthesize", synthesizer))
     
     # Define sequential flow
     workflow.set_entry_point("org_structure")
@@ -74,20 +150,139 @@ def create_analysis_workflow():
     workflow.add_edge("synthesize", END)
     
     # Compile the graph
-    app = workflow.compile()
+    app = workflow.compile(checkpointer=checkpointer)
     
     return app
 
 
-def run_analysis(job_roles: list, employees: list, departments: list, previous_recommendations: list = None) -> Dict[str, Any]:
+def _thread_config(thread_id, on_recommendation=None) -> Optional[Dict[str, Any]]:
+    configurable = {}
+    if thread_id is not None:
+        configurable["thread_id"] = str(thread_id)
+    if on_recommendation is not None:
+        configurable["on_recommendation"] = on_recommendation
+    return {"configurable": configurable} if configurable else None
+
+
+def _execute(workflow, graph_input, state: Dict[str, Any], config, thread_id,
+             on_node_complete: Callable[[str, Dict[str, Any]], None] = None,
+             on_node_start: Callable[[str], None] = None,
+             on_node_text: Callable[[str, str], None] = None,
+             cancel_token: CancellationToken = None) -> Dict[str, Any]:
+    """
+    Stream the graph node by node, reporting each started and finished node
+    
+    Task events (node starts) and model tokens are only streamed when the
+    matching callback is given. With a cancel_token, model calls always
+    stream so every chunk is a cancellation point.
+    
+    Returns:
+        run_analysis() result dictionary
+    """
+    state = dict(state)
+    stream_modes = ["updates"]
+    if on_node_start is not None:
+        stream_modes.append("tasks")
+    if on_node_text is not None or cancel_token is not None:
+        stream_modes.append("messages")
+    if cancel_token is not None:
+        config = dict(config or {})
+        config["callbacks"] = [CancellationCallbackHandler(cancel_token)]
+    try:
+        with cancellation_scope(cancel_token):
+            for mode, chunk in workflow.stream(graph_input, config=config, stream_mode=stream_modes):
+                if mode == "tasks":
+                    # Task starts carry the node input, task results do not
+                    if "input" in chunk and on_node_start is not None:
+                        on_node_start(chunk["name"])
+                    continue
+                if mode == "messages":
+                    message, metadata = chunk
+                    text = stream_text(message)
+                    if text and on_node_text is not None:
+                        on_node_text(metadata.get("langgraph_node"), text)
+                    continue
+                for node, output in chunk.items():
+                    if not output:
+                        continue
+                    # Mirror the graph's reducers for the keys that have one
+                    metrics = {**(state.get("node_metrics") or {}), **(output.get("node_metrics") or {})}
+                    progress = (state.get("analysis_progress") or []) + (output.get("analysis_progress") or [])
+                    state.update(output, node_metrics=metrics, analysis_progress=progress)
+                    if on_node_complete is not None:
+                        on_node_complete(node, output)
+    except Exception as e:
+        cancelled = isinstance(e, AnalysisCancelled) or (cancel_token is not None and cancel_token.cancelled)
+        if cancelled and thread_id is not None:
+            # Cancelled runs are final, like completed ones
+            get_checkpointer().delete_thread(str(thread_id))
+        print(f"\n❌ Analysis {'Cancelled' if cancelled else f'Failed: {e}'}\n")
+        return {
+            "success": False,
+            "cancelled": cancelled,
+            "recommendations": state.get("recommendations") or [],
+            "org_structure_analysis": state.get("org_structure_analysis"),
+            "responsibility_analysis": state.get("responsibility_analysis"),
+            "workload_analysis": state.get("workload_analysis"),
+            "skills_analysis": state.get("skills_analysis"),
+            "analysis_progress": state.get("analysis_progress", []),
+            "node_metrics": state.get("node_metrics") or {},
+            "failed_node": getattr(e, "node", None),
+            "resumable": thread_id is not None and not cancelled,
+            "error": str(AnalysisCancelled()) if cancelled else str(e),
+        }
+    
+    if thread_id is not None:
+        # Finished threads are never resumed
+        get_checkpointer().delete_thread(str(thread_id))
+    
+    print("\n" + "="*60)
+    print("✅ Analysis Complete!")
+    print("="*60 + "\n")
+    
+    return {
+        "success": True,
+        "recommendations": state.get("recommendations", []),
+        "org_structure_analysis": state.get("org_structure_analysis"),
+        "responsibility_analysis": state.get("responsibility_analysis"),
+        "workload_analysis": state.get("workload_analysis"),
+        "skills_analysis": state.get("skills_analysis"),
+        "analysis_progress": state.get("analysis_progress", []),
+        "node_metrics": state.get("node_metrics") or {},
+        "error": state.get("error"),
+    }
+
+
+def run_analysis(job_roles: list = None, employees=None, departments: list = None,
+                 previous_recommendations: list = None,
+                 on_recommendation: Callable[[Dict[str, Any]], None] = None,
+                 thread_id=None,
+                 on_node_complete: Callable[[str, Dict[str, Any]], None] = None,
+                 snapshot: OrgSnapshot = None,
+                 on_node_start: Callable[[str], None] = None,
+                 on_node_text: Callable[[str, str], None] = None,
+                 cancel_token: CancellationToken = None) -> Dict[str, Any]:
     """
     Run the full multi-agent analysis
     
     Args:
         job_roles: List of job role dictionaries
-        employees: List of employee dictionaries
+        employees: Employee dictionaries (any iterable; read once)
         departments: List of department names
         previous_recommendations: Optional list of previous recommendations to avoid duplicates
+        on_recommendation: Optional callback invoked with each validated recommendation
+                           as soon as synthesis streams it
+        thread_id: Optional checkpoint key (the AnalysisRun id); a failed run can then
+                   be continued with resume_analysis()
+        on_node_complete: Optional callback invoked with (node name, node output)
+                          as soon as each agent finishes
+        snapshot: OrgSnapshot already built from the data (job_roles, employees
+                  and departments are then ignored)
+        on_node_start: Optional callback invoked with the node name when a node starts
+        on_node_text: Optional callback invoked with (node name, text delta) as the
+                      node's model streams its answer
+        cancel_token: Optional CancellationToken; once it fires the run stops at the
+                      next node or streamed chunk and returns with cancelled=True
     
     Returns:
         Dictionary with analysis results and recommendations
@@ -97,18 +292,19 @@ def run_analysis(job_roles: list, employees: list, departments: list, previous_r
     print("="*60 + "\n")
     
     # Create workflow
-    workflow = create_analysis_workflow()
+    checkpointer = get_checkpointer() if thread_id is not None else None
+    if checkpointer is not None:
+        # A new run under an existing key starts from scratch
+        checkpointer.delete_thread(str(thread_id))
+    workflow = create_analysis_workflow(checkpointer)
     
-    # Prepare initial state
+    # The state references the snapshot's summaries; raw rows never enter the graph
+    if snapshot is None:
+        snapshot = build_org_snapshot(job_roles, employees, departments)
     initial_state: AnalysisState = {
-        "org_data": {
-            "job_roles": job_roles,
-            "employees": employees,
-            "departments": departments,
-        },
-        "job_roles": job_roles,
-        "employees": employees,
-        "departments": departments,
+        "snapshot_id": snapshot.snapshot_id,
+        "org_summary": snapshot.summaries,
+        "departments": list(snapshot.departments),
         "previous_recommendations": previous_recommendations or [],
         "org_structure_analysis": None,
         "responsibility_analysis": None,
@@ -117,32 +313,56 @@ def run_analysis(job_roles: list, employees: list, departments: list, previous_r
         "recommendations": None,
         "analysis_progress": [],
         "error": None,
+        "node_metrics": {},
     }
     
-    # Run workflow
-    try:
-        result = workflow.invoke(initial_state)
-        
-        print("\n" + "="*60)
-        print("✅ Analysis Complete!")
-        print("="*60 + "\n")
-        
-        return {
-            "success": True,
-            "recommendations": result.get("recommendations", []),
-            "org_structure_analysis": result.get("org_structure_analysis"),
-            "responsibility_analysis": result.get("responsibility_analysis"),
-            "workload_analysis": result.get("workload_analysis"),
-            "skills_analysis": result.get("skills_analysis"),
-            "analysis_progress": result.get("analysis_progress", []),
-            "error": result.get("error"),
-        }
-    
-    except Exception as e:
-        print(f"\n❌ Analysis Failed: {e}\n")
-        return {
-            "success": False,
-            "recommendations": [],
-            "error": str(e),
-        }
+    config = _thread_config(thread_id, on_recommendation)
+    return _execute(workflow, initial_state, initial_state, config, thread_id,
+                    on_node_complete, on_node_start, on_node_text, cancel_token)
 
+
+def can_resume_analysis(thread_id) -> bool:
+    """True if a checkpoint with unfinished nodes exists for this analysis run"""
+    workflow = create_analysis_workflow(get_checkpointer())
+    snapshot = workflow.get_state({"configurable": {"thread_id": str(thread_id)}})
+    return bool(snapshot.next)
+
+
+def resume_analysis(thread_id,
+                    on_recommendation: Callable[[Dict[str, Any]], None] = None,
+                    on_node_complete: Callable[[str, Dict[str, Any]], None] = None,
+                    on_node_start: Callable[[str], None] = None,
+                    on_node_text: Callable[[str, str], None] = None,
+                    cancel_token: CancellationToken = None) -> Dict[str, Any]:
+    """
+    Continue a failed analysis from its last completed node
+    
+    Nodes that already finished are not re-run (and their LLM calls are not
+    paid again); execution restarts at the node that failed.
+    
+    Args:
+        thread_id: Checkpoint key passed to run_analysis()
+        on_recommendation: See run_analysis()
+        on_node_complete: See run_analysis()
+        on_node_start: See run_analysis()
+        on_node_text: See run_analysis()
+        cancel_token: See run_analysis()
+    
+    Returns:
+        Dictionary with analysis results and recommendations
+    
+    Raises:
+        ValueError: If there is nothing to resume for this thread
+    """
+    workflow = create_analysis_workflow(get_checkpointer())
+    config = _thread_config(thread_id, on_recommendation)
+    snapshot = workflow.get_state(config)
+    if not snapshot.next:
+        raise ValueError(f"No resumable checkpoint for analysis run {thread_id}")
+    
+    print("\n" + "="*60)
+    print(f"🚀 Resuming Analysis Workflow at: {', '.join(snapshot.next)}")
+    print("="*60 + "\n")
+    
+    return _execute(workflow, None, snapshot.values, config, thread_id,
+                    on_node_complete, on_node_start, on_node_text, cancel_token)
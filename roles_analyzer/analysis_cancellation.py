@@ -0,0 +1,94 @@
+"""
+Cancellation of analysis runs executing in this process
+
+Every run executing here registers a CancellationToken. Cancelling a run
+(from any worker) sets its status to 'cancelled' in the database: a cancel
+request served by the executing worker fires the token at once, and one
+watcher thread per process polls the status of the registered runs so
+cancellations made by other workers fire within WATCH_INTERVAL seconds.
+"""
+import threading
+import time
+from typing import Dict, Optional
+
+from django.db import close_old_connections, connection
+
+from .ai_agents.cancellation import CancellationToken
+from .models import AnalysisRun
+
+
+WATCH_INTERVAL = 1.0
+
+
+class RunCancellationRegistry:
+    """Tokens of the runs executing in this process, fired when their run is cancelled"""
+
+    def __init__(self, interval: float = WATCH_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._tokens: Dict[int, CancellationToken] = {}
+        self._watcher: Optional[threading.Thread] = None
+
+    def register(self, run_id: int) -> CancellationToken:
+        """Token for a run about to execute; unregister() it when the run ends"""
+        token = CancellationToken()
+        with self._lock:
+            self._tokens[run_id] = token
+            if self._watcher is None:
+                self._watcher = threading.Thread(
+                    target=self._watch, name='analysis-cancel-watcher', daemon=True,
+                )
+                self._watcher.start()
+        return token
+
+    def unregister(self, run_id: int):
+        with self._lock:
+            self._tokens.pop(run_id, None)
+
+    def cancel(self, run_id: int) -> bool:
+        """Fire the token of a run executing here; False if it does not execute here"""
+        with self._lock:
+            token = self._tokens.get(run_id)
+        if token is None:
+            return False
+        token.cancel()
+        return True
+
+    def _watch(self):
+        try:
+            while True:
+                time.sleep(self.interval)
+                with self._lock:
+                    run_ids = [run_id for run_id, token in self._tokens.items() if not token.cancelled]
+                    if not self._tokens:
+                        # The next register() starts a new watcher
+                        self._watcher = None
+                        return
+                if not run_ids:
+                    continue
+                try:
+                    cancelled = list(
+                        AnalysisRun.objects.filter(pk__in=run_ids, status='cancelled').values_list('id', flat=True)
+                    )
+                except Exception:
+                    # Try again on the next tick (e.g. the database restarted)
+                    close_old_connections()
+                    continue
+                for run_id in cancelled:
+                    self.cancel(run_id)
+        finally:
+            connection.close()
+
+
+_registry: Optional[RunCancellationRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_cancellation_registry() -> RunCancellationRegistry:
+    """Process-wide cancellation registry"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = RunCancellationRegistry()
+    return _registry
@@ -0,0 +1,317 @@
+"""
+Live progress events of analysis runs
+
+While an AnalysisRun executes it publishes a stream of events:
+
+    run_started      departments and totals (or the completed nodes, on resume)
+    node_started     a workflow node began
+    node_text        text delta of an analyzer section as its model streams it
+    node_finished    elapsed time, model, token usage, cost and the section text
+    recommendation   one validated recommendation as synthesis streams it
+    run_completed    final status (terminal)
+    run_failed       error, failed node and whether the run can be resumed (terminal)
+    run_cancelled    the run was cancelled (terminal)
+
+Every event is written to the analysis_events table, the durable log that
+serves replays (SSE Last-Event-ID) and clients connected to other workers,
+and pushed to subscribers in this process through an in-memory broker, so
+a client streaming from the worker that executes the run sees it at once.
+Other workers pick events up by polling the table.
+
+Text deltas are batched per node and dropped once the run ends;
+node_finished carries the final text.
+"""
+import json
+import queue
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+from django.db import transaction
+
+from .models import AnalysisEvent, AnalysisRun
+
+
+TERMINAL_EVENTS = frozenset({'run_completed', 'run_failed', 'run_cancelled'})
+LIVE_STATUSES = frozenset({'pending', 'running'})
+
+# A node's text deltas are published at most this often, or once this many characters are pending
+TEXT_FLUSH_INTERVAL = 0.5
+TEXT_FLUSH_CHARS = 400
+
+HEARTBEAT_INTERVAL = 15.0
+POLL_INTERVAL = 2.0
+# A stream is closed after this long, well inside gunicorn's worker timeout (120s);
+# EventSource clients reconnect with Last-Event-ID and lose nothing
+MAX_STREAM_SECONDS = 45
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+
+def event_payload(event: AnalysisEvent) -> Dict[str, Any]:
+    """JSON-serializable form of an event, as sent to clients"""
+    return {
+        'id': event.id,
+        'analysis_run_id': event.analysis_run_id,
+        'event': event.event,
+        'node': event.node or None,
+        'data': event.data,
+        'created_at': event.created_at.isoformat(),
+    }
+
+
+class _Subscription:
+    """Queue of one stream client; `lagged` is set when events had to be dropped"""
+
+    def __init__(self):
+        self.queue: queue.Queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.lagged = False
+
+
+class EventBroker:
+    """In-process fan-out of published events to the subscribers of each run"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Dict[int, Set[_Subscription]] = defaultdict(set)
+
+    def subscribe(self, run_id: int) -> _Subscription:
+        subscription = _Subscription()
+        with self._lock:
+            self._subscribers[run_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, run_id: int, subscription: _Subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(run_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[run_id]
+
+    def publish(self, run_id: int, payload: Dict[str, Any]):
+        with self._lock:
+            subscribers = list(self._subscribers.get(run_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(payload)
+            except queue.Full:
+                # A slow client catches up from the table
+                subscription.lagged = True
+
+
+_broker: Optional[EventBroker] = None
+_broker_lock = threading.Lock()
+
+
+def get_event_broker() -> EventBroker:
+    """Process-wide event broker"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = EventBroker()
+    return _broker
+
+
+def publish_event(run_id: int, event: str, node: str = '', data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Record an event of a run and notify local subscribers
+
+    Inside a transaction, subscribers are only notified once it commits.
+
+    Returns:
+        Event payload
+    """
+    record = AnalysisEvent.objects.create(analysis_run_id=run_id, event=event, node=node or '', data=data or {})
+    payload = event_payload(record)
+    transaction.on_commit(lambda: get_event_broker().publish(run_id, payload))
+    return payload
+
+
+class RunProgress:
+    """
+    Publishes the progress events of one analysis run
+
+    Its node_started/node_text/node_finished/recommendation methods are the
+    workflow callbacks of execute_analysis_run().
+
+    Args:
+        run_id: AnalysisRun id
+        text_nodes: Nodes whose streamed model text is published as node_text
+    """
+
+    def __init__(self, run_id: int, text_nodes: Iterable[str] = ()):
+        self.run_id = run_id
+        self.text_nodes = set(text_nodes)
+        self._started: Dict[str, float] = {}
+        self._text: Dict[str, List[str]] = defaultdict(list)
+        self._flushed: Dict[str, float] = {}
+
+    def publish(self, event: str, node: str = '', **data) -> Dict[str, Any]:
+        return publish_event(self.run_id, event, node, data)
+
+    def run_started(self, **data):
+        self.publish('run_started', **data)
+
+    def node_started(self, node: str):
+        self._started[node] = self._flushed[node] = time.perf_counter()
+        self.publish('node_started', node)
+
+    def node_text(self, node: str, delta: str):
+        if node not in self.text_nodes:
+            return
+        pending = self._text[node]
+        pending.append(delta)
+        if (time.perf_counter() - self._flushed.get(node, 0.0) >= TEXT_FLUSH_INTERVAL
+                or sum(map(len, pending)) >= TEXT_FLUSH_CHARS):
+            self._flush_text(node)
+
+    def _flush_text(self, node: str):
+        pending = self._text.pop(node, None)
+        self._flushed[node] = time.perf_counter()
+        if pending:
+            self.publish('node_text', node, delta=''.join(pending))
+
+    def node_finished(self, node: str, output: Dict[str, Any], text: Optional[str] = None):
+        self._flush_text(node)
+        metrics = (output.get('node_metrics') or {}).get(node) or {}
+        started = self._started.pop(node, None)
+        data = {
+            'elapsed_seconds': round(time.perf_counter() - started, 3) if started is not None
+            else metrics.get('latency_seconds'),
+            'model': metrics.get('model'),
+            'input_tokens': metrics.get('input_tokens'),
+            'output_tokens': metrics.get('output_tokens'),
+            'cost_usd': metrics.get('cost_usd'),
+        }
+        if text is not None:
+            data['text'] = text
+        if output.get('recommendations') is not None:
+            data['recommendations'] = len(output['recommendations'])
+        self.publish('node_finished', node, **data)
+
+    def recommendation(self, recommendation: Dict[str, Any]):
+        self.publish('recommendation', 'synthesize', recommendation=recommendation)
+
+    def run_completed(self, **data):
+        self._finish('run_completed', data)
+
+    def run_failed(self, **data):
+        self._finish('run_failed', data)
+
+    def run_cancelled(self, **data):
+        self._finish('run_cancelled', data)
+
+    def _finish(self, event: str, data: Dict[str, Any]):
+        self._text.clear()
+        self.publish(event, **data)
+        # node_finished events already carry the full section texts
+        AnalysisEvent.objects.filter(analysis_run_id=self.run_id, event='node_text').delete()
+
+
+def _events_after(run_id: int, after_id: int) -> List[Dict[str, Any]]:
+    return [
+        event_payload(event)
+        for event in AnalysisEvent.objects.filter(analysis_run_id=run_id, id__gt=after_id).order_by('id')
+    ]
+
+
+def _run_ended(run_id: int, last_id: int) -> bool:
+    """After a terminal event: False if the run was resumed since (it is live or has later events)"""
+    status = AnalysisRun.objects.filter(pk=run_id).values_list('status', flat=True).first()
+    return status not in LIVE_STATUSES and not AnalysisEvent.objects.filter(
+        analysis_run_id=run_id, id__gt=last_id
+    ).exists()
+
+
+def _final_event(run_id: int, status: Optional[str]) -> Dict[str, Any]:
+    """Terminal event for a run that ended without recording one (e.g. before events existed)"""
+    events = {'completed': 'run_completed', 'cancelled': 'run_cancelled'}
+    return {
+        'id': None,
+        'analysis_run_id': run_id,
+        'event': events.get(status, 'run_failed'),
+        'node': None,
+        'data': {'status': status},
+        'created_at': None,
+    }
+
+
+def stream_events(run_id: int, after_id: int = 0, heartbeat: float = HEARTBEAT_INTERVAL,
+                  poll_interval: float = POLL_INTERVAL,
+                  max_seconds: float = MAX_STREAM_SECONDS) -> Iterator[Optional[Dict[str, Any]]]:
+    """
+    Events of a run after a cursor, followed live until the run ends
+
+    Recorded events are replayed first; then events published in this
+    process arrive immediately and the table is polled every
+    `poll_interval` seconds for events of runs executing elsewhere.
+
+    Args:
+        run_id: AnalysisRun id
+        after_id: Id of the last event the client has (0 replays everything)
+        heartbeat: Seconds without events after which None is yielded (keep-alive)
+        poll_interval: Seconds between table polls while no local event arrives
+        max_seconds: The stream ends after this long even if the run has not
+
+    Yields:
+        Event payloads in order, ending with a run_completed, run_failed or
+        run_cancelled event (a failed run that was resumed continues with the resumed
+        attempt's events); None as keep-alive
+    """
+    subscription = get_event_broker().subscribe(run_id)
+    last_id = after_id
+    started = last_sent = time.monotonic()
+    try:
+        pending = _events_after(run_id, last_id)
+        while True:
+            for payload in pending:
+                if payload['id'] <= last_id:
+                    continue
+                last_id = payload['id']
+                last_sent = time.monotonic()
+                yield payload
+                if payload['event'] in TERMINAL_EVENTS and _run_ended(run_id, last_id):
+                    return
+            if time.monotonic() - started >= max_seconds:
+                return
+
+            try:
+                pending = [subscription.queue.get(timeout=poll_interval)]
+            except queue.Empty:
+                pending = _events_after(run_id, last_id)
+                if pending:
+                    continue
+                status = AnalysisRun.objects.filter(pk=run_id).values_list('status', flat=True).first()
+                if status not in LIVE_STATUSES:
+                    # The terminal event is saved with the final status, so it is visible by now
+                    pending = _events_after(run_id, last_id)
+                    if not pending:
+                        yield _final_event(run_id, status)
+                        return
+                elif time.monotonic() - last_sent >= heartbeat:
+                    last_sent = time.monotonic()
+                    yield None
+                continue
+
+            if subscription.lagged:
+                # Events were dropped for this client; resynchronize from the table
+                subscription.lagged = False
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                pending = _events_after(run_id, last_id)
+    finally:
+        get_event_broker().unsubscribe(run_id, subscription)
+
+
+def format_sse(payload: Optional[Dict[str, Any]]) -> str:
+    """Server-sent events frame of an event payload (None: keep-alive comment)"""
+    if payload is None:
+        return ': keep-alive\n\n'
+    lines = []
+    if payload['id'] is not None:
+        lines.append(f"id: {payload['id']}")
+    lines.append(f"event: {payload['event']}")
+    lines.append(f"data: {json.dumps(payload, default=str, separators=(',', ':'))}")
+    return '\n'.join(lines) + '\n\n'
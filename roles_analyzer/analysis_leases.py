@@ -0,0 +1,133 @@
+"""
+Leases of the analysis runs owned by a worker process
+
+A run is owned by the process that executes it, or holds it in its job
+queue, and lives only as long as that process: a worker recycled, killed
+on timeout or replaced by a deploy takes its runs with it. Each process
+renews the heartbeat_at of the runs it owns every HEARTBEAT_INTERVAL
+seconds from one keeper thread. A live run whose heartbeat is older than
+AI_CONFIG['ANALYSIS_LEASE_SECONDS'] has lost its owner;
+recover_stale_runs() marks it failed (resumable from its checkpoint when
+one exists), releases its lock and ends its event stream.
+"""
+import threading
+import time
+from datetime import timedelta
+from typing import List, Optional, Set
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .ai_agents import can_resume_analysis
+from .analysis_events import LIVE_STATUSES, RunProgress
+from .models import AnalysisLock, AnalysisRun
+from .utils import safe_print
+
+
+HEARTBEAT_INTERVAL = 30.0
+DEFAULT_LEASE_SECONDS = 120
+ABANDONED_ERROR = 'The worker running this analysis stopped'
+
+
+def lease_seconds() -> float:
+    return settings.AI_CONFIG.get('ANALYSIS_LEASE_SECONDS', DEFAULT_LEASE_SECONDS)
+
+
+class RunLeaseKeeper:
+    """Renews the heartbeat of the runs this process owns"""
+
+    def __init__(self, interval: float = HEARTBEAT_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._run_ids: Set[int] = set()
+        self._keeper: Optional[threading.Thread] = None
+
+    def hold(self, run_id: int):
+        """Own a run from now on (idempotent); release() it when the run ends here"""
+        AnalysisRun.objects.filter(pk=run_id).update(heartbeat_at=timezone.now())
+        with self._lock:
+            self._run_ids.add(run_id)
+            if self._keeper is None:
+                self._keeper = threading.Thread(target=self._keep, name='analysis-lease-keeper', daemon=True)
+                self._keeper.start()
+
+    def release(self, run_id: int):
+        with self._lock:
+            self._run_ids.discard(run_id)
+
+    def _keep(self):
+        try:
+            while True:
+                time.sleep(self.interval)
+                with self._lock:
+                    run_ids = list(self._run_ids)
+                    if not run_ids:
+                        # The next hold() starts a new keeper
+                        self._keeper = None
+                        return
+                try:
+                    live = set(
+                        AnalysisRun.objects.filter(pk__in=run_ids, status__in=LIVE_STATUSES)
+                        .values_list('id', flat=True)
+                    )
+                    AnalysisRun.objects.filter(pk__in=live).update(heartbeat_at=timezone.now())
+                except Exception:
+                    # Try again on the next tick (e.g. the database restarted)
+                    close_old_connections()
+                    continue
+                with self._lock:
+                    # Runs cancelled while waiting in the queue never release themselves
+                    self._run_ids.difference_update(set(run_ids) - live)
+        finally:
+            connection.close()
+
+
+_keeper: Optional[RunLeaseKeeper] = None
+_keeper_lock = threading.Lock()
+
+
+def get_lease_keeper() -> RunLeaseKeeper:
+    """Process-wide lease keeper"""
+    global _keeper
+    if _keeper is None:
+        with _keeper_lock:
+            if _keeper is None:
+                _keeper = RunLeaseKeeper()
+    return _keeper
+
+
+def recover_stale_runs(run_id: Optional[int] = None) -> List[int]:
+    """
+    Fail the live runs whose owner stopped renewing their lease
+
+    Args:
+        run_id: Only check this run
+
+    Returns:
+        Ids of the recovered runs
+    """
+    cutoff = timezone.now() - timedelta(seconds=lease_seconds())
+    stale = AnalysisRun.objects.filter(status__in=LIVE_STATUSES).filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, run_date__lt=cutoff)
+    )
+    if run_id is not None:
+        stale = stale.filter(pk=run_id)
+
+    recovered = []
+    for analysis_run in stale.only('id', 'heartbeat_at'):
+        resumable = can_resume_analysis(analysis_run.id)
+        with transaction.atomic():
+            # Conditional on the heartbeat read above, so a run renewed meanwhile is left alone
+            if not AnalysisRun.objects.filter(
+                pk=analysis_run.pk, status__in=LIVE_STATUSES, heartbeat_at=analysis_run.heartbeat_at,
+            ).update(status='failed', error_message=ABANDONED_ERROR):
+                continue
+            AnalysisLock.objects.filter(analysis_run_id=analysis_run.pk).delete()
+            RunProgress(analysis_run.pk).run_failed(
+                status='failed', error=ABANDONED_ERROR, failed_node=None, resumable=resumable,
+            )
+        safe_print(f"[*] Recovered analysis run {analysis_run.pk} (owner stopped; resumable: {resumable})")
+        recovered.append(analysis_run.pk)
+    return recovered
@@ -0,0 +1,154 @@
+"""
+Background job queue for analysis runs
+
+A bounded pool of worker threads in this process executes the analysis
+runs submitted by the API, so a trigger can return the run id at once and
+the client follows the run on its event stream instead of holding the
+request open. At most AI_CONFIG['ANALYSIS_WORKERS'] runs execute at the
+same time and at most AI_CONFIG['ANALYSIS_QUEUE_SIZE'] more wait for a
+worker; further submissions are refused.
+
+A cancelled job gives up its slot immediately: a waiting job is dropped,
+and an executing one stops counting against the limit while it winds down,
+so the next waiting run starts right away.
+"""
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+from django.db import connections
+
+from .utils import safe_print
+
+
+DEFAULT_WORKERS = 2
+DEFAULT_QUEUE_SIZE = 10
+
+
+class AnalysisQueueFull(RuntimeError):
+    """Every worker is busy and the waiting list is full"""
+
+
+class _Job:
+    """Queue bookkeeping of one submitted run"""
+
+    def __init__(self, run_id: int):
+        self.run_id = run_id
+        self.future: Optional[Future] = None
+        self.started = False
+        self.cancelled = False
+        self.holds_slot = False
+
+
+class AnalysisJobQueue:
+    """
+    Bounded job queue keyed by analysis run id
+
+    Args:
+        workers: Runs executing at the same time
+        max_waiting: Runs allowed to wait for a free slot
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, max_waiting: int = DEFAULT_QUEUE_SIZE):
+        self.workers = workers
+        self.max_waiting = max_waiting
+        # Every admitted job gets a thread; slots limit how many of them execute
+        self._executor = ThreadPoolExecutor(max_workers=workers + max_waiting, thread_name_prefix='analysis-worker')
+        self._lock = threading.Lock()
+        self._slot_freed = threading.Condition(self._lock)
+        self._running = 0
+        self._jobs: Dict[int, _Job] = {}
+
+    def _waiting(self) -> int:
+        return sum(1 for job in self._jobs.values() if not job.started and not job.cancelled)
+
+    def submit(self, run_id: int, fn: Callable, *args, **kwargs) -> Future:
+        """
+        Queue fn(*args, **kwargs) as the job of an analysis run
+
+        Raises:
+            AnalysisQueueFull: If max_waiting jobs are already waiting
+        """
+        with self._lock:
+            waiting = self._waiting()
+            if waiting >= self.max_waiting:
+                raise AnalysisQueueFull(
+                    f"Analysis queue is full ({self._running} running, {waiting} waiting); try again later"
+                )
+            job = _Job(run_id)
+            job.future = self._executor.submit(self._run, job, fn, args, kwargs)
+            self._jobs[run_id] = job
+        job.future.add_done_callback(lambda done: self._forget(job))
+        return job.future
+
+    def _run(self, job: _Job, fn: Callable, args, kwargs) -> Any:
+        with self._slot_freed:
+            while self._running >= self.workers and not job.cancelled:
+                self._slot_freed.wait()
+            if job.cancelled:
+                return None
+            self._running += 1
+            job.started = job.holds_slot = True
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            # The run itself records the failure; nobody waits on the future
+            safe_print(f"[ERROR] Background analysis run {job.run_id} failed: {e}")
+            raise
+        finally:
+            self._release_slot(job)
+            # Worker threads outlive requests, so their connections are not closed for them
+            connections.close_all()
+
+    def _release_slot(self, job: _Job):
+        with self._slot_freed:
+            if job.holds_slot:
+                job.holds_slot = False
+                self._running -= 1
+                self._slot_freed.notify_all()
+
+    def cancel(self, run_id: int) -> bool:
+        """
+        Give up a run's slot
+
+        Returns:
+            True if the run was still waiting (it will never execute); an
+            executing run keeps its thread until it notices the cancellation
+        """
+        with self._slot_freed:
+            job = self._jobs.get(run_id)
+            if job is None:
+                return False
+            job.cancelled = True
+            waiting = not job.started
+            # Wakes the job itself if it waits, or the next one if a slot is freed below
+            self._slot_freed.notify_all()
+        self._release_slot(job)
+        return waiting
+
+    def _forget(self, job: _Job):
+        with self._lock:
+            if self._jobs.get(job.run_id) is job:
+                del self._jobs[job.run_id]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'workers': self.workers, 'running': self._running, 'waiting': self._waiting()}
+
+
+_queue: Optional[AnalysisJobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_analysis_queue() -> AnalysisJobQueue:
+    """Process-wide analysis job queue sized from AI_CONFIG"""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = AnalysisJobQueue(
+                    settings.AI_CONFIG.get('ANALYSIS_WORKERS', DEFAULT_WORKERS),
+                    settings.AI_CONFIG.get('ANALYSIS_QUEUE_SIZE', DEFAULT_QUEUE_SIZE),
+                )
+    return _queue
@@ -0,0 +1,274 @@
+"""
+Change-driven background analysis
+
+Keeps the latest completed analysis in step with the org data, so
+AnalysisRunViewSet.latest, the dashboard and the chatbot serve a
+precomputed analysis of the current data instead of someone triggering a
+run and waiting for it.
+
+Every run records the data watermark it read (row counts and latest
+updated_at of the job roles and employees). The scheduler compares the
+current watermark with the one of the latest completed organization-wide
+run and starts a new run when they differ, but only:
+
+    - once edits have stopped for DEBOUNCE_MINUTES, so a burst of edits
+      gives one run, or when the oldest unanalyzed edit is
+      MAX_DELAY_MINUTES old (edits that never stop)
+    - MIN_INTERVAL_MINUTES after the previous scheduled run
+    - inside one of WINDOWS and outside QUIET_HOURS
+    - while today's spend of all analysis runs plus the cost of the last
+      organization-wide run stays within DAILY_BUDGET_USD
+
+Settings live in AI_CONFIG['ANALYSIS_SCHEDULER']. Scheduled runs execute
+only in the run_analysis_scheduler management command process, never in
+the web workers' job queue, so recycling a web worker cannot lose one. Each
+check first recovers runs whose worker stopped (see analysis_leases), so a
+dead organization-wide run neither blocks scheduling nor is mistaken for
+one in flight.
+"""
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Min
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .analysis_leases import recover_stale_runs
+from .analysis_service import data_watermark, run_or_join_analysis
+from .dashboard import refresh_snapshot
+from .models import AnalysisLock, AnalysisRun, Employee, JobRole
+
+
+WATERMARK_MODELS = {'job_roles': JobRole, 'employees': Employee}
+
+
+def parse_time_ranges(spec: str) -> List[Tuple[time, time]]:
+    """
+    Parse comma-separated "HH:MM-HH:MM" ranges (a range may wrap midnight)
+
+    Raises:
+        ValueError: On a malformed range
+    """
+    ranges = []
+    for part in filter(None, (p.strip() for p in (spec or '').split(','))):
+        try:
+            start, end = (datetime.strptime(t.strip(), '%H:%M').time() for t in part.split('-'))
+        except ValueError:
+            raise ValueError(f"Invalid time range '{part}' (expected HH:MM-HH:MM)")
+        ranges.append((start, end))
+    return ranges
+
+
+def in_time_ranges(moment: time, ranges: List[Tuple[time, time]]) -> bool:
+    for start, end in ranges:
+        if start < end:
+            if start <= moment < end:
+                return True
+        elif moment >= start or moment < end:
+            return True
+    return False
+
+
+@dataclass(frozen=True)
+class SchedulerConfig:
+    debounce: timedelta
+    max_delay: timedelta
+    min_interval: timedelta
+    windows: List[Tuple[time, time]]
+    quiet_hours: List[Tuple[time, time]]
+    daily_budget_usd: float
+
+    @classmethod
+    def from_settings(cls) -> 'SchedulerConfig':
+        config = settings.AI_CONFIG.get('ANALYSIS_SCHEDULER', {})
+        return cls(
+            debounce=timedelta(minutes=config.get('DEBOUNCE_MINUTES', 15)),
+            max_delay=timedelta(minutes=config.get('MAX_DELAY_MINUTES', 720)),
+            min_interval=timedelta(minutes=config.get('MIN_INTERVAL_MINUTES', 60)),
+            windows=parse_time_ranges(config.get('WINDOWS', '')),
+            quiet_hours=parse_time_ranges(config.get('QUIET_HOURS', '')),
+            daily_budget_usd=config.get('DAILY_BUDGET_USD', 0.0),
+        )
+
+
+@dataclass
+class Decision:
+    """
+    Outcome of one scheduler check
+
+    Attributes:
+        run: Whether a run is (or, with dry_run, would be) started
+        reason: Why, for the log
+        analysis_run: The scheduled run, once executed
+        result: Its run_analysis() result dictionary
+    """
+    run: bool
+    reason: str
+    analysis_run: Optional[AnalysisRun] = None
+    result: Optional[Dict[str, Any]] = None
+
+
+def run_cost(node_metrics: Dict[str, Any]) -> float:
+    """LLM cost of a run in USD, from its node metrics"""
+    return sum((metrics or {}).get('cost_usd') or 0.0 for metrics in (node_metrics or {}).values())
+
+
+def spend_since(start: datetime) -> float:
+    """LLM cost of the analysis runs started since a time"""
+    return sum(
+        run_cost(node_metrics)
+        for node_metrics in AnalysisRun.objects.filter(run_date__gte=start).values_list('node_metrics', flat=True)
+    )
+
+
+def latest_org_analysis() -> Optional[AnalysisRun]:
+    """Latest completed organization-wide run that recorded its data watermark"""
+    runs = AnalysisRun.objects.filter(status='completed').order_by('-run_date').only(
+        'id', 'run_date', 'data_watermark', 'node_metrics',
+    )
+    for analysis_run in runs.iterator():
+        if analysis_run.data_watermark and not analysis_run.data_watermark.get('departments'):
+            return analysis_run
+    return None
+
+
+def org_analysis_in_flight() -> bool:
+    """Whether an organization-wide run (manual or scheduled) is executing"""
+    locks = AnalysisLock.objects.filter(expires_at__gt=timezone.now(), analysis_run__status='running')
+    return any(not departments for departments in locks.values_list('departments', flat=True))
+
+
+def first_change_after(watermark: Optional[Dict[str, Any]]) -> Optional[datetime]:
+    """Earliest edit after a watermark (None if no row was edited or added since)"""
+    firsts = []
+    for name, model in WATERMARK_MODELS.items():
+        since = parse_datetime(((watermark or {}).get(name) or {}).get('updated') or '')
+        qs = model.objects.order_by()
+        if since is not None:
+            qs = qs.filter(updated_at__gt=since)
+        first = qs.aggregate(first=Min('updated_at'))['first']
+        if first is not None:
+            firsts.append(first)
+    return min(firsts, default=None)
+
+
+def describe_change(analyzed: Optional[Dict[str, Any]], current: Dict[str, Any]) -> str:
+    if analyzed is None:
+        return 'no organization-wide analysis yet'
+    changes = []
+    for name in WATERMARK_MODELS:
+        before, after = analyzed.get(name) or {}, current[name]
+        label = name.replace('_', ' ')
+        if before.get('n') != after['n']:
+            changes.append(f"{label} {before.get('n')} -> {after['n']}")
+        elif before.get('updated') != after['updated']:
+            changes.append(f"{label} edited")
+    return 'data changed: ' + ', '.join(changes)
+
+
+def _minutes(delta: timedelta) -> str:
+    return f"{delta.total_seconds() / 60:.0f} min"
+
+
+class AnalysisScheduler:
+    """
+    Starts an organization-wide analysis when the org data has changed
+
+    Keep one instance for the life of a loop: deletes do not move updated_at,
+    so the scheduler dates them by when it first saw the new row counts.
+
+    Args:
+        config: Scheduling settings (default: AI_CONFIG['ANALYSIS_SCHEDULER'])
+        clock: Returns the current (aware) time
+    """
+
+    def __init__(self, config: Optional[SchedulerConfig] = None, clock: Callable[[], datetime] = timezone.now):
+        self.config = config or SchedulerConfig.from_settings()
+        self.clock = clock
+        self._seen: Optional[Dict[str, Any]] = None
+        self._seen_at: Optional[datetime] = None
+        self._stale_since: Optional[datetime] = None
+
+    def check(self) -> Decision:
+        """Decide whether to start a run now"""
+        recover_stale_runs()
+        now = self.clock()
+        current = data_watermark()
+        latest = latest_org_analysis()
+        analyzed = latest.data_watermark if latest else None
+
+        if analyzed is not None and all(analyzed.get(name) == current[name] for name in WATERMARK_MODELS):
+            self._stale_since = None
+            return Decision(False, 'analysis is up to date')
+        if current != self._seen:
+            # Nothing is known about changes that happened before the first check
+            self._seen_at = now if self._seen is not None else None
+            self._seen = current
+        if self._stale_since is None:
+            self._stale_since = now
+        if org_analysis_in_flight():
+            return Decision(False, 'an organization-wide analysis is running')
+
+        config = self.config
+        edited = analyzed is None or any(
+            (analyzed.get(name) or {}).get('updated') != current[name]['updated'] for name in WATERMARK_MODELS
+        )
+        if edited:
+            last_change = max(
+                (parse_datetime(current[name]['updated']) for name in WATERMARK_MODELS if current[name]['updated']),
+                default=None,
+            )
+        else:
+            # Only row counts changed (deletes)
+            last_change = self._seen_at
+        pending_since = min(filter(None, [first_change_after(analyzed), self._stale_since]))
+        settled = last_change is None or now - last_change >= config.debounce
+        overdue = analyzed is None or now - pending_since >= config.max_delay
+        if not (settled or overdue):
+            return Decision(False, f"waiting for edits to settle (last change {_minutes(now - last_change)} ago)")
+
+        local_time = timezone.localtime(now).time()
+        if in_time_ranges(local_time, config.quiet_hours):
+            return Decision(False, 'quiet hours')
+        if config.windows and not in_time_ranges(local_time, config.windows):
+            return Decision(False, 'outside the analysis windows')
+
+        last_scheduled = AnalysisRun.objects.filter(trigger='scheduled').order_by('-run_date').values_list(
+            'run_date', flat=True,
+        ).first()
+        if last_scheduled is not None and now - last_scheduled < config.min_interval:
+            return Decision(False, f"previous scheduled run started {_minutes(now - last_scheduled)} ago")
+
+        if config.daily_budget_usd:
+            day_start = timezone.localtime(now).replace(hour=0, minute=0, second=0, microsecond=0)
+            spent = spend_since(day_start)
+            expected = run_cost(latest.node_metrics) if latest else 0.0
+            if spent + expected > config.daily_budget_usd:
+                return Decision(
+                    False,
+                    f"daily budget reached (${spent:.2f} spent today, a run costs about ${expected:.2f}, "
+                    f"limit ${config.daily_budget_usd:.2f})",
+                )
+
+        return Decision(True, describe_change(analyzed, current))
+
+    def run_once(self, dry_run: bool = False) -> Decision:
+        """
+        Check, and run an organization-wide analysis if it is due
+
+        A completed run also refreshes the dashboard snapshot, so the first
+        reader after it does not pay for the recomputation.
+
+        Args:
+            dry_run: Only report the decision
+        """
+        decision = self.check()
+        if not decision.run or dry_run:
+            return decision
+        decision.analysis_run, decision.result, _ = run_or_join_analysis([], trigger='scheduled')
+        self._stale_since = None
+        if decision.result['success']:
+            refresh_snapshot()
+        return decision
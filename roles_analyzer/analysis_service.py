@@ -0,0 +1,505 @@
+"""
+Running multi-agent analyses against an AnalysisRun
+
+Shared by the REST API and the chatbot. Each agent's output is written to
+the run as soon as its node finishes and each recommendation as soon as
+synthesis streams it, so a failed run keeps everything computed so far and
+can be resumed from the failed node.
+
+Concurrent requests for the same analysis (same departments, same input
+data) are coalesced through a row in the analysis_locks table: the first
+caller runs the workflow, later callers from any worker wait for that run
+and receive its result.
+
+Each run publishes its progress as events (see analysis_events), and runs
+can be handed to the background job queue (see analysis_queue) instead of
+executing in the request. A pending or running run can be cancelled from
+any worker (see analysis_cancellation). Runs left pending or running by a
+worker that stopped are failed by recover_stale_runs() (see analysis_leases).
+"""
+import hashlib
+import json
+import time
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import JobRole, Employee, AnalysisRun, AnalysisLock, MissingRole
+from .ai_agents import run_analysis, resume_analysis
+from .ai_agents.cancellation import AnalysisCancelled, CancellationToken
+from .ai_agents.org_snapshot import build_org_snapshot
+from .analysis_cancellation import get_cancellation_registry
+from .analysis_events import LIVE_STATUSES, RunProgress
+from .analysis_leases import get_lease_keeper, recover_stale_runs
+from .analysis_queue import AnalysisQueueFull, get_analysis_queue
+
+
+# An abandoned lock (worker killed mid-run) is taken over after this many seconds
+DEFAULT_LOCK_TTL = 1800
+LOCK_POLL_INTERVAL = 1.0
+LOCK_CLAIM_ATTEMPTS = 3
+
+# Workflow node -> (state key, AnalysisRun field) of the text it produces
+NODE_SECTIONS = {
+    'org_structure': ('org_structure_analysis', 'org_structure_gaps'),
+    'responsibilities': ('responsibility_analysis', 'responsibility_gaps'),
+    'workload': ('workload_analysis', 'workload_gaps'),
+    'skills': ('skills_analysis', 'skills_gaps'),
+}
+
+
+def load_analysis_inputs(departments: Optional[List[str]] = None,
+                         exclude_run_id: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Load job roles, employees and recent recommendations for an analysis
+
+    Args:
+        departments: Optional list of departments to restrict the analysis to
+        exclude_run_id: Run whose recommendations must not count as previous ones
+
+    Returns:
+        Dictionary with job_roles, employees, departments and previous_recommendations;
+        employees is a single-pass iterator fetching rows in chunks (see build_org_snapshot)
+    """
+    if departments:
+        job_roles_qs = JobRole.objects.filter(department__in=departments)
+        employees_qs = Employee.objects.filter(department__in=departments)
+    else:
+        job_roles_qs = JobRole.objects.all()
+        employees_qs = Employee.objects.all()
+
+    job_roles = list(job_roles_qs.values(
+        'role_id', 'role_title', 'department', 'level', 'responsibilities',
+        'required_skills', 'reports_to', 'current_headcount', 'team_size',
+    ))
+    employees = employees_qs.order_by().values(
+        'role_id', 'department', 'workload_status', 'skills',
+    ).iterator(chunk_size=5000)
+    dept_list = list(job_roles_qs.order_by().values_list('department', flat=True).distinct())
+
+    # Recommendations from the last 5 completed runs, to avoid duplicates
+    previous_runs = AnalysisRun.objects.filter(status='completed')
+    if exclude_run_id is not None:
+        previous_runs = previous_runs.exclude(id=exclude_run_id)
+    previous_run_ids = list(previous_runs.order_by('-run_date').values_list('id', flat=True)[:5])
+    previous_recommendations = [
+        {
+            'role_title': mr.recommended_role_title,
+            'department': mr.department,
+            'level': mr.level,
+            'gap_type': mr.gap_type,
+            'justification': mr.justification,
+            'expected_impact': mr.expected_impact,
+            'priority': mr.priority,
+            'recommended_headcount': mr.recommended_headcount,
+            'estimated_timeline': mr.estimated_timeline,
+            'required_skills': mr.required_skills,
+            'responsibilities': mr.responsibilities,
+        }
+        for mr in MissingRole.objects.filter(analysis_run_id__in=previous_run_ids).order_by(
+            '-analysis_run__run_date', 'id'
+        )
+    ]
+
+    return {
+        'job_roles': job_roles,
+        'employees': employees,
+        'departments': dept_list,
+        'previous_recommendations': previous_recommendations,
+    }
+
+
+def create_missing_role(analysis_run: AnalysisRun, rec: Dict[str, Any]) -> MissingRole:
+    """Save one synthesized recommendation as a MissingRole of the given run"""
+    return MissingRole.objects.create(
+        analysis_run=analysis_run,
+        recommended_role_title=rec.get('role_title', 'Unknown'),
+        department=rec.get('department', 'Unknown'),
+        level=rec.get('level', 'mid'),
+        gap_type=rec.get('gap_type', 'unknown'),
+        justification=rec.get('justification', ''),
+        expected_impact=rec.get('expected_impact', ''),
+        priority=rec.get('priority', 'medium'),
+        recommended_headcount=rec.get('recommended_headcount', 1),
+        estimated_timeline=rec.get('estimated_timeline', ''),
+        required_skills=rec.get('required_skills', []),
+        responsibilities=rec.get('responsibilities', []),
+    )
+
+
+def execute_analysis_run(analysis_run: AnalysisRun, departments: Optional[List[str]] = None,
+                         resume: bool = False) -> Dict[str, Any]:
+    """
+    Run (or resume) the multi-agent analysis for an AnalysisRun and store the results
+
+    Progress events are published as nodes start, stream and finish. A
+    cancelled run stops at its next cancellation point and ends with status
+    'cancelled'. An exception raised here leaves the run to the caller; see
+    mark_run_failed().
+
+    Args:
+        analysis_run: Run to execute; its id is the workflow checkpoint key
+        departments: Optional list of departments to restrict the analysis to
+        resume: Continue a failed run from its last completed node
+
+    Returns:
+        run_analysis() result dictionary
+    """
+    registry = get_cancellation_registry()
+    cancel_token = registry.register(analysis_run.id)
+    leases = get_lease_keeper()
+    leases.hold(analysis_run.id)
+    try:
+        return _execute_analysis_run(analysis_run, departments, resume, cancel_token)
+    finally:
+        leases.release(analysis_run.id)
+        registry.unregister(analysis_run.id)
+
+
+def _execute_analysis_run(analysis_run: AnalysisRun, departments: Optional[List[str]], resume: bool,
+                          cancel_token: CancellationToken) -> Dict[str, Any]:
+    start_time = time.time()
+    persisted = []
+    progress = RunProgress(analysis_run.id, text_nodes=NODE_SECTIONS)
+
+    def on_node_complete(node, output):
+        fields = ['completed_nodes']
+        text = None
+        if node in NODE_SECTIONS:
+            state_key, field = NODE_SECTIONS[node]
+            text = output.get(state_key)
+            setattr(analysis_run, field, text)
+            fields.append(field)
+        if output.get('node_metrics'):
+            analysis_run.node_metrics = {**analysis_run.node_metrics, **output['node_metrics']}
+            fields.append('node_metrics')
+        if node not in analysis_run.completed_nodes:
+            analysis_run.completed_nodes = analysis_run.completed_nodes + [node]
+        analysis_run.save(update_fields=fields)
+        progress.node_finished(node, output, text)
+
+    def on_recommendation(rec):
+        persisted.append(create_missing_role(analysis_run, rec))
+        progress.recommendation(rec)
+
+    if resume:
+        # Recommendations saved by the failed synthesis attempt are replaced
+        analysis_run.missing_roles.all().delete()
+        analysis_run.status = 'running'
+        analysis_run.error_message = None
+        analysis_run.save(update_fields=['status', 'error_message'])
+        progress.run_started(resume=True, completed_nodes=analysis_run.completed_nodes)
+        result = resume_analysis(
+            analysis_run.id,
+            on_recommendation=on_recommendation,
+            on_node_complete=on_node_complete,
+            on_node_start=progress.node_started,
+            on_node_text=progress.node_text,
+            cancel_token=cancel_token,
+        )
+    else:
+        # Taken before reading, so edits made while the run reads count as unanalyzed
+        analysis_run.data_watermark = data_watermark(departments)
+        inputs = load_analysis_inputs(departments, exclude_run_id=analysis_run.id)
+        snapshot = build_org_snapshot(inputs['job_roles'], inputs['employees'], inputs['departments'])
+        del inputs['job_roles'], inputs['employees']
+        analysis_run.total_roles_analyzed = snapshot.total_roles
+        analysis_run.total_employees_analyzed = snapshot.total_employees
+        analysis_run.departments_analyzed = list(snapshot.departments)
+        analysis_run.completed_nodes = []
+        analysis_run.node_metrics = {}
+        # Not the status: the run may have been cancelled meanwhile
+        analysis_run.save(update_fields=[
+            'total_roles_analyzed', 'total_employees_analyzed', 'departments_analyzed',
+            'completed_nodes', 'node_metrics', 'data_watermark',
+        ])
+        progress.run_started(
+            resume=False,
+            departments=analysis_run.departments_analyzed,
+            total_roles=snapshot.total_roles,
+            total_employees=snapshot.total_employees,
+        )
+        result = run_analysis(
+            snapshot=snapshot,
+            previous_recommendations=inputs['previous_recommendations'],
+            on_recommendation=on_recommendation,
+            thread_id=analysis_run.id,
+            on_node_complete=on_node_complete,
+            on_node_start=progress.node_started,
+            on_node_text=progress.node_text,
+            cancel_token=cancel_token,
+        )
+
+    # A run that finished before noticing its cancellation stays completed
+    cancelled = not result['success'] and (result.get('cancelled') or cancel_token.cancelled)
+    analysis_run.status = 'completed' if result['success'] else 'cancelled' if cancelled else 'failed'
+    analysis_run.execution_time_seconds = round(
+        ((analysis_run.execution_time_seconds or 0) if resume else 0) + time.time() - start_time, 2
+    )
+
+    if result['success']:
+        analysis_run.recommendations = result.get('recommendations', [])
+        # Recommendations streamed during synthesis are already saved
+        for rec in analysis_run.recommendations[len(persisted):]:
+            create_missing_role(analysis_run, rec)
+    else:
+        analysis_run.error_message = result.get('error', 'Unknown error')
+
+    # Stream clients see the terminal event together with the final status
+    with transaction.atomic():
+        analysis_run.save()
+        if result['success']:
+            progress.run_completed(
+                status=analysis_run.status,
+                recommendations=len(analysis_run.recommendations),
+                execution_time_seconds=analysis_run.execution_time_seconds,
+            )
+        elif cancelled:
+            progress.run_cancelled(
+                status=analysis_run.status,
+                completed_nodes=analysis_run.completed_nodes,
+                execution_time_seconds=analysis_run.execution_time_seconds,
+            )
+        else:
+            progress.run_failed(
+                status=analysis_run.status,
+                error=analysis_run.error_message,
+                failed_node=result.get('failed_node'),
+                resumable=bool(result.get('resumable')),
+            )
+    return result
+
+
+def mark_run_failed(analysis_run: AnalysisRun, error: str):
+    """Record a run that raised (or could not start) as failed and end its event stream"""
+    analysis_run.status = 'failed'
+    analysis_run.error_message = error
+    with transaction.atomic():
+        analysis_run.save()
+        RunProgress(analysis_run.id).run_failed(status='failed', error=error, failed_node=None, resumable=False)
+
+
+def data_watermark(departments: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Row counts and latest update times of the job roles and employees in scope
+
+    Any edit, insert or delete changes it. Computed in the database so every
+    worker agrees on it, and JSON-serializable (times in ISO format) so runs
+    can store the watermark of the data they read.
+    """
+    departments = sorted(set(departments or []))
+    job_roles_qs = JobRole.objects.order_by()
+    employees_qs = Employee.objects.order_by()
+    if departments:
+        job_roles_qs = job_roles_qs.filter(department__in=departments)
+        employees_qs = employees_qs.filter(department__in=departments)
+    watermark = {'departments': departments}
+    for name, qs, pk in (('job_roles', job_roles_qs, 'role_id'), ('employees', employees_qs, 'employee_id')):
+        stats = qs.aggregate(n=Count(pk), updated=Max('updated_at'))
+        watermark[name] = {
+            'n': stats['n'],
+            'updated': stats['updated'].isoformat() if stats['updated'] else None,
+        }
+    return watermark
+
+
+def claim_failed_run(analysis_run: AnalysisRun) -> bool:
+    """
+    Move a failed run back to running, so exactly one of concurrent resume requests executes it
+
+    Returns:
+        False if the run is no longer failed (another request claimed it first)
+    """
+    claimed = AnalysisRun.objects.filter(pk=analysis_run.pk, status='failed').update(
+        status='running', error_message=None, heartbeat_at=timezone.now(),
+    )
+    if claimed:
+        analysis_run.status, analysis_run.error_message = 'running', None
+    else:
+        analysis_run.refresh_from_db(fields=['status'])
+    return bool(claimed)
+
+
+def analysis_fingerprint(departments: Optional[List[str]] = None) -> str:
+    """
+    Fingerprint of everything an analysis over the given departments reads
+
+    The data watermark of the departments in scope, plus the latest
+    completed run (the source of previous_recommendations).
+    """
+    payload = {
+        **data_watermark(departments),
+        'previous_run': AnalysisRun.objects.filter(status='completed').order_by('-run_date')
+        .values_list('id', flat=True).first(),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def claim_analysis_run(departments: Optional[List[str]] = None,
+                       trigger: str = 'manual') -> Tuple[AnalysisRun, bool]:
+    """
+    Start a new analysis run, or attach to an identical one already in flight
+
+    Args:
+        departments: Optional list of departments to restrict the analysis to
+        trigger: What started the run (AnalysisRun.TRIGGER_CHOICES); a joined run keeps its own
+
+    Returns:
+        (analysis_run, is_leader); only the leader executes the run and must
+        call release_analysis_lock() when done
+    """
+    departments = sorted(set(departments or []))
+    # A run whose worker died must not be joined
+    recover_stale_runs()
+    key = analysis_fingerprint(departments)
+    ttl = timedelta(seconds=settings.AI_CONFIG.get('ANALYSIS_LOCK_TTL', DEFAULT_LOCK_TTL))
+
+    for _ in range(LOCK_CLAIM_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                now = timezone.now()
+                lock = AnalysisLock.objects.select_for_update().select_related('analysis_run').filter(key=key).first()
+                if lock is not None:
+                    if lock.expires_at > now and lock.analysis_run.status == 'running':
+                        return lock.analysis_run, False
+                    # Abandoned by a crashed worker, or left behind by a finished run
+                    lock.delete()
+                analysis_run = AnalysisRun.objects.create(status='running', trigger=trigger, heartbeat_at=now)
+                AnalysisLock.objects.create(
+                    key=key, analysis_run=analysis_run, departments=departments, expires_at=now + ttl,
+                )
+            get_lease_keeper().hold(analysis_run.id)
+            return analysis_run, True
+        except IntegrityError:
+            # Another worker took the lock between our read and insert; read it again
+            continue
+    raise RuntimeError('Could not acquire the analysis lock')
+
+
+def release_analysis_lock(analysis_run: AnalysisRun):
+    """Let the next identical request start a new run"""
+    AnalysisLock.objects.filter(analysis_run=analysis_run).delete()
+
+
+def wait_for_analysis_run(analysis_run: AnalysisRun, poll_interval: float = LOCK_POLL_INTERVAL) -> Dict[str, Any]:
+    """
+    Block until another caller's run finishes and return its result
+
+    Returns:
+        Dictionary shaped like run_analysis()'s (success, recommendations, error)
+    """
+    fields = ['status', 'recommendations', 'error_message']
+    while True:
+        analysis_run.refresh_from_db(fields=fields)
+        if analysis_run.status != 'running':
+            break
+        lock = AnalysisLock.objects.filter(analysis_run=analysis_run).values('expires_at').first()
+        if lock is None or lock['expires_at'] <= timezone.now() or recover_stale_runs(analysis_run.id):
+            # Released (or expired) since the status read: finished, or the leader went away
+            analysis_run.refresh_from_db(fields=fields)
+            if analysis_run.status != 'running':
+                break
+            return {'success': False, 'recommendations': [], 'error': 'The analysis run was abandoned'}
+        time.sleep(poll_interval)
+    analysis_run.refresh_from_db()
+    return {
+        'success': analysis_run.status == 'completed',
+        'recommendations': analysis_run.recommendations,
+        'error': analysis_run.error_message,
+    }
+
+
+def run_or_join_analysis(departments: Optional[List[str]] = None,
+                         trigger: str = 'manual') -> Tuple[AnalysisRun, Dict[str, Any], bool]:
+    """
+    Run an analysis, coalescing with an identical one already in flight
+
+    Args:
+        departments: Optional list of departments to restrict the analysis to
+        trigger: What started the run (AnalysisRun.TRIGGER_CHOICES)
+
+    Returns:
+        (analysis_run, result, joined); joined is True when the result comes
+        from a run started by another request
+    """
+    analysis_run, is_leader = claim_analysis_run(departments, trigger)
+    if not is_leader:
+        return analysis_run, wait_for_analysis_run(analysis_run), True
+    return analysis_run, lead_analysis_run(analysis_run, departments), False
+
+
+def lead_analysis_run(analysis_run: AnalysisRun, departments: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Execute a run claimed with claim_analysis_run(), then release its lock
+
+    Returns:
+        run_analysis() result dictionary
+    """
+    try:
+        return execute_analysis_run(analysis_run, departments)
+    except Exception as e:
+        # Mark as failed before releasing, so waiting callers see the outcome
+        mark_run_failed(analysis_run, str(e))
+        raise
+    finally:
+        get_lease_keeper().release(analysis_run.id)
+        release_analysis_lock(analysis_run)
+
+
+def cancel_analysis_run(analysis_run: AnalysisRun) -> bool:
+    """
+    Cancel a pending or running analysis run
+
+    The status becomes 'cancelled' at once, and the run's lock and job queue
+    slot are released, so identical requests start a new run and waiting
+    runs can start. The worker executing the run (this one or another)
+    stops it at the next node or streamed model chunk, closing the provider
+    request, and publishes run_cancelled; outputs saved so far are kept.
+
+    Returns:
+        False if the run had already finished
+    """
+    with transaction.atomic():
+        locked = AnalysisRun.objects.select_for_update().filter(pk=analysis_run.pk).first()
+        if locked is None or locked.status not in LIVE_STATUSES:
+            return False
+        analysis_run.status = 'cancelled'
+        analysis_run.error_message = str(AnalysisCancelled())
+        analysis_run.save(update_fields=['status', 'error_message'])
+
+    release_analysis_lock(analysis_run)
+    get_cancellation_registry().cancel(analysis_run.id)
+    if get_analysis_queue().cancel(analysis_run.id):
+        # Never started, so nothing else will end its event stream
+        RunProgress(analysis_run.id).run_cancelled(status='cancelled', completed_nodes=[], execution_time_seconds=None)
+    return True
+
+
+def submit_analysis(departments: Optional[List[str]] = None) -> Tuple[AnalysisRun, bool]:
+    """
+    Start an analysis on the background job queue, or join an identical one in flight
+
+    Args:
+        departments: Optional list of departments to restrict the analysis to
+
+    Returns:
+        (analysis_run, joined); the run is still executing, follow it on its event stream
+
+    Raises:
+        AnalysisQueueFull: If the queue cannot take another run (the claimed run is failed)
+    """
+    analysis_run, is_leader = claim_analysis_run(departments)
+    if not is_leader:
+        return analysis_run, True
+    try:
+        get_analysis_queue().submit(analysis_run.id, lead_analysis_run, analysis_run, departments)
+    except AnalysisQueueFull as e:
+        mark_run_failed(analysis_run, str(e))
+        get_lease_keeper().release(analysis_run.id)
+        release_analysis_lock(analysis_run)
+        raise
+    return analysis_run, False
@@ -5,4 +5,6 @@ class RolesAnalyzerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'roles_analyzer'
     verbose_name = 'Job Roles Analyzer'
-
+    
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,62 @@
+"""
+Versioned caching helpers
+
+Cached values are keyed by a per-scope data version that is bumped by model
+signals on every write, so stale entries are never served and no explicit
+key deletion is needed. Scopes:
+    org       JobRole / Employee data
+    analysis  AnalysisRun / MissingRole data
+    titles    CanonicalTitle data
+"""
+from typing import Callable, Iterable, Union
+from django.core.cache import cache
+
+
+DATA_SCOPES = ('org', 'analysis', 'titles')
+
+
+def _version_key(scope: str) -> str:
+    return f"roles_analyzer:data_version:{scope}"
+
+
+def get_data_version(scope: str) -> int:
+    """Get the current data version for a scope"""
+    version = cache.get(_version_key(scope))
+    if version is None:
+        cache.add(_version_key(scope), 1, timeout=None)
+        version = cache.get(_version_key(scope), 1)
+    return version
+
+
+def bump_data_version(*scopes: str):
+    """Invalidate everything cached for the given scopes"""
+    for scope in scopes:
+        try:
+            cache.incr(_version_key(scope))
+        except ValueError:
+            cache.set(_version_key(scope), 2, timeout=None)
+
+
+def cached_for_data(scopes: Union[str, Iterable[str]], key: str, compute: Callable, timeout: int = None):
+    """
+    Return a cached value for the current data version, computing it on a miss
+    
+    Args:
+        scopes: Data scope(s) the value depends on
+        key: Cache key (unique per value)
+        compute: Zero-argument callable producing the value
+        timeout: Optional cache timeout override (seconds)
+    """
+    if isinstance(scopes, str):
+        scopes = (scopes,)
+    versions = '.'.join(str(get_data_version(scope)) for scope in scopes)
+    versioned_key = f"roles_analyzer:{key}:v{versions}"
+    
+    value = cache.get(versioned_key)
+    if value is None:
+        value = compute()
+        if timeout is None:
+            cache.set(versioned_key, value)
+        else:
+            cache.set(versioned_key, value, timeout)
+    return value
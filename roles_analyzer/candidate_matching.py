@@ -0,0 +1,206 @@
+"""
+Internal candidate matching for recommended missing roles
+
+An inverted index from skill to employees lets a recommendation's
+required_skills be scored against only the employees who hold at least one
+of them. Scores are IDF-weighted skill overlap minus a workload penalty, so
+employees with spare capacity (underutilized) rank ahead of busy ones.
+"""
+import heapq
+import math
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from operator import itemgetter
+from typing import Any, Dict, List, Optional
+
+from .cache_utils import get_data_version
+from .skills_engine import normalize_skill
+
+
+# Subtracted from the overlap score; prefers employees with spare capacity
+WORKLOAD_PENALTIES = {
+    'underutilized': 0.0,
+    'normal': 0.1,
+    'overloaded': 0.3,
+}
+
+DEFAULT_TOP_K = 10
+
+
+class CandidateIndex:
+    """Incrementally maintained skill -> employees inverted index"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings: Dict[str, set] = defaultdict(set)
+        self._employees: Dict[str, Dict[str, Any]] = {}
+        self._penalties: Dict[str, float] = {}
+
+    def __len__(self):
+        return len(self._employees)
+
+    def upsert(self, employee_id: str, name: str, department: str,
+               workload_status: str, skills: List[str], role_id: str = None):
+        """Add an employee or update their skills/workload"""
+        skill_keys = {normalize_skill(skill): skill for skill in skills or ()}
+        with self._lock:
+            self.remove(employee_id)
+            self._employees[employee_id] = {
+                'employee_id': employee_id,
+                'name': name,
+                'department': department,
+                'role_id': role_id,
+                'workload_status': workload_status,
+                'skills': skill_keys,
+            }
+            self._penalties[employee_id] = WORKLOAD_PENALTIES.get(workload_status, 0.1)
+            for key in skill_keys:
+                self._postings[key].add(employee_id)
+
+    def remove(self, employee_id: str):
+        """Remove an employee from the index (no-op if absent)"""
+        with self._lock:
+            employee = self._employees.pop(employee_id, None)
+            if employee is None:
+                return
+            del self._penalties[employee_id]
+            for key in employee['skills']:
+                posting = self._postings.get(key)
+                if posting is not None:
+                    posting.discard(employee_id)
+                    if not posting:
+                        del self._postings[key]
+
+    def skill_weight(self, skill_key: str) -> float:
+        """IDF weight: rare skills count more than ones everybody has"""
+        holders = len(self._postings.get(skill_key, ()))
+        return math.log((len(self._employees) + 1) / (holders + 1)) + 1.0
+
+    def top_candidates(self, required_skills: List[str], k: int = DEFAULT_TOP_K,
+                       exclude_ids: Optional[set] = None) -> List[Dict[str, Any]]:
+        """
+        Score employees against a list of required skills
+
+        Args:
+            required_skills: Skills the recommended role needs
+            k: Number of candidates to return
+            exclude_ids: Employee ids to skip
+
+        Returns:
+            Up to k candidates, best first
+        """
+        required = {normalize_skill(skill): skill for skill in required_skills or ()}
+        if not required:
+            return []
+
+        with self._lock:
+            weights = {key: self.skill_weight(key) for key in required}
+            total_weight = sum(weights.values())
+
+            overlap: Dict[str, float] = defaultdict(float)
+            for key, weight in weights.items():
+                for employee_id in self._postings.get(key, ()):
+                    overlap[employee_id] += weight
+
+            penalties = self._penalties
+            scores = {
+                employee_id: value / total_weight - penalties[employee_id]
+                for employee_id, value in overlap.items()
+            }
+            for employee_id in exclude_ids or ():
+                scores.pop(employee_id, None)
+            best = heapq.nlargest(k, scores.items(), key=itemgetter(1))
+
+            results = []
+            for employee_id, score in best:
+                employee = self._employees[employee_id]
+                matched = [required[key] for key in required if key in employee['skills']]
+                results.append({
+                    'employee_id': employee_id,
+                    'name': employee['name'],
+                    'department': employee['department'],
+                    'role_id': employee['role_id'],
+                    'workload_status': employee['workload_status'],
+                    'score': round(score, 4),
+                    'skill_match': round(overlap[employee_id] / total_weight, 4),
+                    'matched_skills': matched,
+                    'missing_skills': [required[key] for key in required if key not in employee['skills']],
+                })
+            return results
+
+
+_index: Optional[CandidateIndex] = None
+_index_version: Optional[int] = None
+_loaded_through: Optional[datetime] = None
+_index_lock = threading.Lock()
+
+# A refresh re-reads this much before the latest updated_at it has seen, so rows
+# committed out of updated_at order are not missed
+REFRESH_OVERLAP = timedelta(minutes=5)
+
+
+def _load_employees(index: CandidateIndex, queryset) -> Optional[datetime]:
+    """Upsert employees into the index; returns their latest updated_at"""
+    latest = None
+    rows = queryset.order_by().values_list(
+        'employee_id', 'name', 'department', 'workload_status', 'skills', 'role_id', 'updated_at'
+    )
+    for employee_id, name, department, workload, skills, role_id, updated_at in rows.iterator(chunk_size=5000):
+        index.upsert(employee_id, name, department, workload, skills, role_id)
+        if updated_at is not None and (latest is None or updated_at > latest):
+            latest = updated_at
+    return latest
+
+
+def get_candidate_index() -> CandidateIndex:
+    """
+    Return the process-wide candidate index, current as of the org data version
+
+    Loaded from the database on first use and stamped with the org data
+    version. Employee writes in this process are applied by signals; once the
+    version moves (a write in any worker sharing the cache), the employees
+    updated since the last load are upserted (every Employee save, including
+    update_workload_status(), moves updated_at), and the index is reloaded in
+    full only if employees were deleted elsewhere.
+    """
+    global _index, _index_version, _loaded_through
+    version = get_data_version('org')
+    if _index is not None and _index_version == version:
+        return _index
+    with _index_lock:
+        if _index is None or _index_version != version:
+            from .models import Employee
+            reload = True
+            if _index is not None and _loaded_through is not None:
+                latest = _load_employees(_index, Employee.objects.filter(
+                    updated_at__gte=_loaded_through - REFRESH_OVERLAP,
+                ))
+                _loaded_through = max(latest or _loaded_through, _loaded_through)
+                # Every current employee is in the index now, so extra entries were deleted
+                reload = len(_index) != Employee.objects.count()
+            if reload:
+                index = CandidateIndex()
+                _loaded_through = _load_employees(index, Employee.objects.all())
+                _index = index
+            _index_version = version
+    return _index
+
+
+def update_candidate_index(employee=None, removed_id: str = None):
+    """
+    Apply a single employee change to the index, if it has been loaded
+
+    Args:
+        employee: Saved Employee instance to upsert
+        removed_id: employee_id of a deleted employee
+    """
+    if _index is None:
+        return
+    if removed_id is not None:
+        _index.remove(removed_id)
+    if employee is not None:
+        _index.upsert(
+            employee.employee_id, employee.name, employee.department,
+            employee.workload_status, employee.skills, employee.role_id,
+        )
@@ -4,10 +4,17 @@ Conversational chatbot for HR that uses the multi-agent system
 import sys
 import uuid
 from typing import Dict, List, Optional
+from langchain_core.messages import convert_to_messages
 from langchain_core.prompts import ChatPromptTemplate
-from .ai_agents.llm_factory import get_llm
-from .models import JobRole, Employee, AnalysisRun, MissingRole, Conversation, ConversationMessage
-from .ai_agents import run_analysis
+from .ai_agents.llm_factory import bind_chat_tools, get_llm
+from .ai_agents.llm_scheduler import PRIORITY_INTERACTIVE
+from .models import JobRole, Employee, AnalysisRun, Conversation, ConversationMessage
+from .analysis_service import run_or_join_analysis
+from .chatbot_tools import CHAT_TOOLS, run_tool_calls
+from .semantic_cache import context_fingerprint, get_semantic_cache, is_follow_up, key_terms
+from .intent_router import (
+    INTENT_RUN_ANALYSIS, INTENT_SHOW_LATEST, INTENT_SMALL_TALK, IntentResult, get_intent_router,
+)
 import json
 
 # Set UTF-8 encoding for stdout on Windows
@@ -40,7 +47,7 @@ class HRChatbot:
     """
     
     def __init__(self):
-        self.llm = get_llm(temperature=0.3)
+        self.llm = get_llm(temperature=0.3, priority=PRIORITY_INTERACTIVE)
     
     def _get_or_create_conversation(self, conversation_id: Optional[str] = None) -> Conversation:
         """
@@ -121,44 +128,28 @@ class HRChatbot:
             'total_roles': total_roles,
             'total_employees': total_employees,
             'departments': departments,
+            'latest_analysis_id': latest_analysis.id if latest_analysis else None,
             'latest_analysis_date': latest_analysis.run_date.isoformat() if latest_analysis else None,
             'missing_roles_count': missing_roles_count,
         }
     
-    def _should_trigger_analysis(self, user_message: str):
+    def _classify_intent(self, user_message: str) -> IntentResult:
         """
-        Determine if user message requires running a new analysis
-        Returns: (should_trigger, departments_to_analyze)
+        Classify the message locally (no LLM call) and extract department/role mentions
+        Returns: IntentResult with intent, confidence, departments and roles
         """
-        trigger_keywords = [
-            'analyze', 'analysis', 'run analysis', 'check', 'find missing',
-            'what roles', 'what are we missing', 'identify gaps', 'recommendations'
-        ]
-        
-        user_lower = user_message.lower()
-        
-        # Check if user wants to trigger analysis
-        should_trigger = any(keyword in user_lower for keyword in trigger_keywords)
-        
-        # Extract department mentions
-        departments = []
-        context = self._get_context_data()
-        for dept in context['departments']:
-            if dept.lower() in user_lower:
-                departments.append(dept)
-        
-        return should_trigger, departments if departments else None
+        return get_intent_router().classify(user_message)
     
-    def _get_latest_recommendations(self, department: Optional[str] = None) -> List[Dict]:
-        """Get latest missing role recommendations"""
+    def _get_latest_recommendations(self, departments: Optional[List[str]] = None) -> List[Dict]:
+        """Get latest missing role recommendations, optionally for some departments"""
         latest_analysis = AnalysisRun.objects.filter(status='completed').order_by('-run_date').first()
         
         if not latest_analysis:
             return []
         
         missing_roles = latest_analysis.missing_roles.all()
-        if department:
-            missing_roles = missing_roles.filter(department=department)
+        if departments:
+            missing_roles = missing_roles.filter(department__in=departments)
         
         return [
             {
@@ -208,11 +199,11 @@ class HRChatbot:
         # Save user message
         self._save_message(conversation, 'user', user_message)
         
-        context = self._get_context_data()
-        should_trigger, departments = self._should_trigger_analysis(user_message)
+        intent = self._classify_intent(user_message)
+        departments = intent.departments or None
         
-        # If user wants to trigger analysis, do it
-        if should_trigger:
+        # Only an explicit request for a new analysis starts the multi-agent run
+        if intent.intent == INTENT_RUN_ANALYSIS:
             result = self._handle_analysis_request(user_message, departments, conversation)
             # Save assistant response
             self._save_message(
@@ -222,13 +213,39 @@ class HRChatbot:
                 triggered_analysis=True,
                 analysis_id=result.get('analysis_id')
             )
-            result['conversation_id'] = conversation.conversation_id
-            return result
+        elif intent.intent == INTENT_SHOW_LATEST:
+            # Served straight from the latest completed run, no LLM call
+            recommendations = self._get_latest_recommendations(departments)
+            result = {
+                'response': self._format_recommendations_for_chat(recommendations),
+                'triggered_analysis': False,
+            }
+            self._save_message(conversation, 'assistant', result['response'])
+        else:
+            # Questions about the data and small talk get a conversational response,
+            # reused for near-identical standalone questions on unchanged data
+            context = self._get_context_data()
+            cache = get_semantic_cache()
+            partition = cached = None
+            if cache is not None and not is_follow_up(intent.text, conversation.messages.count() > 1):
+                partition = (
+                    intent.intent, tuple(sorted(intent.departments)), tuple(sorted(intent.roles)),
+                    key_terms(intent.text), context_fingerprint(context),
+                )
+                cached = cache.get(intent.text, partition)
+            if cached is not None:
+                result = {**cached.answer, 'cached': True}
+            else:
+                result = self._handle_conversational_query(
+                    user_message, context, conversation, use_tools=intent.intent != INTENT_SMALL_TALK
+                )
+                if partition is not None and result['response']:
+                    cache.put(intent.text, partition, result)
+                result = {**result, 'cached': False}
+            # Save assistant response
+            self._save_message(conversation, 'assistant', result['response'])
         
-        # Otherwise, provide conversational response
-        result = self._handle_conversational_query(user_message, context, conversation)
-        # Save assistant response
-        self._save_message(conversation, 'assistant', result['response'])
+        result['intent'] = intent.intent
         result['conversation_id'] = conversation.conversation_id
         return result
     
@@ -236,103 +253,18 @@ class HRChatbot:
                                 conversation: Conversation) -> Dict:
         """Handle requests to run analysis"""
         try:
-            # Get data for analysis
-            if departments:
-                job_roles_qs = JobRole.objects.filter(department__in=departments)
-                employees_qs = Employee.objects.filter(department__in=departments)
-            else:
-                job_roles_qs = JobRole.objects.all()
-                employees_qs = Employee.objects.all()
-            
-            job_roles = [
-                {
-                    'role_id': role.role_id,
-                    'role_title': role.role_title,
-                    'department': role.department,
-                    'level': role.level,
-                    'responsibilities': role.responsibilities,
-                    'required_skills': role.required_skills,
-                    'reports_to': role.reports_to,
-                    'current_headcount': role.current_headcount,
-                    'team_size': role.team_size,
-                }
-                for role in job_roles_qs
-            ]
-            
-            employees = [
-                {
-                    'employee_id': emp.employee_id,
-                    'name': emp.name,
-                    'role_id': emp.role.role_id,
-                    'department': emp.department,
-                    'workload_status': emp.workload_status,
-                    'skills': emp.skills,
-                }
-                for emp in employees_qs
-            ]
-            
-            dept_list = list(job_roles_qs.values_list('department', flat=True).distinct())
-            
-            # Retrieve previous recommendations to avoid duplicates
-            previous_recommendations = []
-            previous_runs = AnalysisRun.objects.filter(
-                status='completed'
-            ).order_by('-run_date')[:5]  # Get last 5 completed runs
-            
-            for prev_run in previous_runs:
-                prev_missing_roles = prev_run.missing_roles.all()
-                for mr in prev_missing_roles:
-                    previous_recommendations.append({
-                        'role_title': mr.recommended_role_title,
-                        'department': mr.department,
-                        'level': mr.level,
-                        'gap_type': mr.gap_type,
-                        'justification': mr.justification,
-                        'expected_impact': mr.expected_impact,
-                        'priority': mr.priority,
-                        'recommended_headcount': mr.recommended_headcount,
-                        'estimated_timeline': mr.estimated_timeline,
-                        'required_skills': mr.required_skills,
-                        'responsibilities': mr.responsibilities,
-                    })
-            
-            # Run analysis
-            result = run_analysis(
-                job_roles=job_roles,
-                employees=employees,
-                departments=dept_list,
-                previous_recommendations=previous_recommendations
-            )
+            # Attaches to an identical analysis already running, if any
+            analysis_run, result, joined = run_or_join_analysis(departments)
             
             if result['success']:
                 recommendations = result.get('recommendations', [])
+                job_roles_count = analysis_run.total_roles_analyzed
+                employees_count = analysis_run.total_employees_analyzed
                 
-                # Save to database
-                analysis_run = AnalysisRun.objects.create(
-                    status='completed',
-                    total_roles_analyzed=len(job_roles),
-                    total_employees_analyzed=len(employees),
-                    departments_analyzed=dept_list,
-                    recommendations=recommendations,
-                )
-                
-                for rec in recommendations:
-                    MissingRole.objects.create(
-                        analysis_run=analysis_run,
-                        recommended_role_title=rec.get('role_title', 'Unknown'),
-                        department=rec.get('department', 'Unknown'),
-                        level=rec.get('level', 'mid'),
-                        gap_type=rec.get('gap_type', 'unknown'),
-                        justification=rec.get('justification', ''),
-                        expected_impact=rec.get('expected_impact', ''),
-                        priority=rec.get('priority', 'medium'),
-                        recommended_headcount=rec.get('recommended_headcount', 1),
-                        estimated_timeline=rec.get('estimated_timeline', ''),
-                        required_skills=rec.get('required_skills', []),
-                        responsibilities=rec.get('responsibilities', []),
-                    )
-                
-                response_text = f"[OK] Analysis complete! I analyzed {len(job_roles)} roles and {len(employees)} employees.\n\n"
+                response_text = ""
+                if joined:
+                    response_text = "The same analysis was already running, so I waited for its results.\n"
+                response_text += f"[OK] Analysis complete! I analyzed {job_roles_count} roles and {employees_count} employees.\n\n"
                 
                 if recommendations:
                     response_text += f"I found **{len(recommendations)} missing roles** that you should consider:\n\n"
@@ -351,12 +283,14 @@ class HRChatbot:
                     'triggered_analysis': True,
                     'recommendations_count': len(recommendations),
                     'analysis_id': analysis_run.id,
+                    'joined_existing_run': joined,
                 }
             else:
                 return {
                     'response': "[ERROR] I encountered an error while running the analysis. Please try again or check the system logs.",
                     'triggered_analysis': False,
                     'error': result.get('error'),
+                    'analysis_id': analysis_run.id,
                 }
         
         except Exception as e:
@@ -370,60 +304,79 @@ class HRChatbot:
             }
     
     def _handle_conversational_query(self, user_message: str, context: Dict, 
-                                     conversation: Conversation) -> Dict:
-        """Handle general conversational queries with conversation history"""
+                                     conversation: Conversation, use_tools: bool = True) -> Dict:
+        """
+        Handle general conversational queries with conversation history
+        
+        With use_tools, the LLM may call read-only data tools once (any number
+        of calls in parallel) before answering; the tool results are then
+        sent back, to the same provider, for the final answer.
+        """
         # Get latest recommendations for context
         latest_recommendations = self._get_latest_recommendations()
         
         # Get conversation history (last 10 messages for context)
         history = self._get_conversation_history(conversation, limit=10)
         
-        # Build messages list with system prompt, history, and current message
-        messages = [
+        # Only the system prompt is a template; history and the user message
+        # are passed as-is so braces in them aren't read as variables
+        prompt = ChatPromptTemplate.from_messages([
             ("system", """You are a helpful HR assistant chatbot for an organization. You help HR professionals understand their organizational structure, identify missing roles, and get insights about their workforce.
 
 You have access to:
 - Organizational data: {total_roles} job roles, {total_employees} employees across {departments_count} departments
 - Latest analysis results: {missing_roles_count} missing roles identified
 - Departments: {departments}
+- Tools that query the current HR data: employee counts by department, role, workload or skill; workload breakdowns; skill holders; reporting trees; analysis run history; and the latest recommendations
 
+For any specific number, name or structure, call the tools instead of estimating; request everything you need at once. Only state figures that come from the tools or the context above.
 When users ask about missing roles or recommendations, reference the latest analysis results if available.
 Be conversational, friendly, and professional. Provide specific, actionable insights.
 If asked about specific departments or roles, be detailed and helpful.
 
-If the user wants to run a new analysis, tell them to use phrases like "run analysis" or "analyze organization".
+If the user wants to run a new analysis, tell them to ask for it explicitly, e.g. "run a new analysis of Engineering".
 
 You have access to the conversation history, so you can reference previous messages and maintain context throughout the conversation.""")
-        ]
+        ])
+        messages = prompt.format_messages(
+            total_roles=context['total_roles'],
+            total_employees=context['total_employees'],
+            departments_count=len(context['departments']),
+            departments=", ".join(context['departments']),
+            missing_roles_count=context['missing_roles_count'],
+        )
         
         # Add conversation history (skip system messages)
-        for msg in history:
-            if msg['role'] != 'system':  # Skip system messages from history
-                messages.append((msg['role'], msg['content']))
+        messages += convert_to_messages([
+            (msg['role'], msg['content']) for msg in history if msg['role'] != 'system'
+        ])
         
         # Add current user message
-        departments_str = ", ".join(context['departments'])
         recommendations_context = ""
         if latest_recommendations:
             recommendations_context = "\n\nLatest Recommendations:\n"
             for rec in latest_recommendations[:3]:
                 recommendations_context += f"- {rec['role_title']} ({rec['department']}) - {rec['priority']} priority\n"
         
-        messages.append(("user", user_message + recommendations_context))
-        
-        prompt = ChatPromptTemplate.from_messages(messages)
-        
-        chain = prompt | self.llm
-        response = chain.invoke({
-            "total_roles": context['total_roles'],
-            "total_employees": context['total_employees'],
-            "departments_count": len(context['departments']),
-            "departments": departments_str,
-            "missing_roles_count": context['missing_roles_count'],
-        })
+        messages += convert_to_messages([("user", user_message + recommendations_context)])
+        
+        tools_used = []
+        if use_tools:
+            response = bind_chat_tools(self.llm, CHAT_TOOLS).invoke(messages)
+            if response.tool_calls:
+                tools_used = [call['name'] for call in response.tool_calls]
+                # One tool round: the answer comes from the provider that made the calls,
+                # with the tools still defined but no further calls allowed
+                messages += [response] + run_tool_calls(response.tool_calls)
+                response = bind_chat_tools(
+                    self.llm, CHAT_TOOLS, call_tools=False,
+                    route=(response.response_metadata or {}).get('llm_route'),
+                ).invoke(messages)
+        else:
+            response = self.llm.invoke(messages)
         
         return {
             'response': response.content,
             'triggered_analysis': False,
+            'tools_used': tools_used,
         }
-
@@ -0,0 +1,226 @@
+"""
+Read-only data tools for the HR chatbot
+
+Each tool is a small indexed query over the ORM (or the skill link tables)
+that the chatbot's LLM can call to answer a specific question precisely
+instead of guessing from totals. Results are cached per tool and argument
+set with cached_for_data(), so they are invalidated by the next write to
+the data they depend on ('org' for job roles/employees, 'analysis' for
+runs and recommendations).
+"""
+import hashlib
+import json
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+from django.db.models import Count, Q, Sum
+from langchain_core.messages import ToolMessage
+from langchain_core.tools import StructuredTool
+
+from .cache_utils import cached_for_data
+from .models import AnalysisRun, Employee, JobRole, MissingRole
+
+
+# Cap on rows listed by any tool; counts always cover everything
+MAX_LISTED = 25
+MAX_SUBTREE_DEPTH = 4
+
+
+def _cached_tool(scope: str, name: str, arguments: Dict[str, Any], compute: Callable):
+    """Cache a tool result per tool and normalized arguments"""
+    normalized = json.dumps(
+        {k: v.strip().lower() if isinstance(v, str) else v for k, v in sorted(arguments.items())},
+        sort_keys=True,
+    )
+    digest = hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+    return cached_for_data(scope, f'chat_tool:{name}:{digest}', compute)
+
+
+def _employee_filter(department: Optional[str] = None, role_title: Optional[str] = None,
+                     workload_status: Optional[str] = None) -> Q:
+    condition = Q()
+    if department:
+        condition &= Q(department__iexact=department)
+    if role_title:
+        condition &= Q(role__role_title__icontains=role_title)
+    if workload_status:
+        condition &= Q(workload_status=workload_status.lower())
+    return condition
+
+
+def count_employees(department: Optional[str] = None, role_title: Optional[str] = None,
+                    workload_status: Optional[str] = None, skill: Optional[str] = None) -> Dict[str, Any]:
+    """Count employees matching all given filters, with a per-department breakdown.
+    role_title matches partially (e.g. "engineer"); workload_status is underutilized, normal or overloaded."""
+    def compute():
+        queryset = Employee.objects.order_by().filter(
+            _employee_filter(department, role_title, workload_status)
+        )
+        if skill:
+            queryset = queryset.with_skill(skill)
+        by_department = dict(
+            queryset.values_list('department').annotate(n=Count('employee_id', distinct=True)).order_by('department')
+        )
+        return {'count': sum(by_department.values()), 'by_department': by_department}
+
+    arguments = {'department': department, 'role_title': role_title,
+                 'workload_status': workload_status, 'skill': skill}
+    return _cached_tool('org', 'count_employees', arguments, compute)
+
+
+def workload_breakdown(department: Optional[str] = None, role_title: Optional[str] = None) -> Dict[str, Any]:
+    """Employees per workload status (underutilized, normal, overloaded) for each department,
+    optionally for one department and/or roles whose title contains role_title."""
+    def compute():
+        rows = (
+            Employee.objects.order_by().filter(_employee_filter(department, role_title))
+            .values_list('department', 'workload_status').annotate(n=Count('employee_id'))
+        )
+        by_department = defaultdict(lambda: {'underutilized': 0, 'normal': 0, 'overloaded': 0})
+        for dept, status, n in rows:
+            by_department[dept][status] = n
+        totals = {status: sum(counts[status] for counts in by_department.values())
+                  for status in ('underutilized', 'normal', 'overloaded')}
+        return {'totals': totals, 'by_department': dict(sorted(by_department.items()))}
+
+    return _cached_tool('org', 'workload_breakdown', {'department': department, 'role_title': role_title}, compute)
+
+
+def skill_holders(skill: str, department: Optional[str] = None) -> Dict[str, Any]:
+    """Employees who have a skill (spelling variants are matched), optionally in one department."""
+    def compute():
+        queryset = Employee.objects.order_by().with_skill(skill).filter(_employee_filter(department))
+        holders = list(
+            queryset.order_by('department', 'name')
+            .values('name', 'department', 'role__role_title', 'workload_status')[:MAX_LISTED]
+        )
+        return {
+            'skill': skill,
+            'count': queryset.count(),
+            'holders': [
+                {'name': h['name'], 'department': h['department'],
+                 'role': h['role__role_title'], 'workload': h['workload_status']}
+                for h in holders
+            ],
+        }
+
+    return _cached_tool('org', 'skill_holders', {'skill': skill, 'department': department}, compute)
+
+
+def org_subtree(role: str, depth: int = 2) -> Dict[str, Any]:
+    """Reporting tree below a job role (role_id or title, e.g. "CTO"): the roles that report to it,
+    down to `depth` levels, with headcount and team size."""
+    depth = max(1, min(int(depth), MAX_SUBTREE_DEPTH))
+
+    def compute():
+        roles = {
+            r['role_id']: r for r in JobRole.objects.order_by().values(
+                'role_id', 'role_title', 'department', 'level', 'reports_to', 'current_headcount', 'team_size',
+            )
+        }
+        root = roles.get(role) or next(
+            (r for r in roles.values() if r['role_title'].lower() == role.strip().lower()), None
+        ) or next((r for r in roles.values() if role.strip().lower() in r['role_title'].lower()), None)
+        if root is None:
+            return {'error': f"No job role matching '{role}'"}
+
+        children = defaultdict(list)
+        for r in roles.values():
+            if r['reports_to']:
+                children[r['reports_to']].append(r)
+
+        listed = 0
+
+        def node(r, level):
+            nonlocal listed
+            listed += 1
+            entry = {
+                'role_id': r['role_id'], 'title': r['role_title'], 'department': r['department'],
+                'level': r['level'], 'headcount': r['current_headcount'], 'team_size': r['team_size'],
+            }
+            direct = sorted(children[r['role_id']], key=lambda c: c['role_title'])
+            if direct:
+                entry['direct_reports'] = len(direct)
+                if level < depth and listed < MAX_LISTED:
+                    entry['reports'] = [node(c, level + 1) for c in direct if listed < MAX_LISTED]
+            return entry
+
+        return {'root': node(root, 0)}
+
+    return _cached_tool('org', 'org_subtree', {'role': role, 'depth': depth}, compute)
+
+
+def analysis_run_history(limit: int = 5) -> Dict[str, Any]:
+    """Most recent analysis runs with status, date, scope, duration and number of recommendations."""
+    limit = max(1, min(int(limit), MAX_LISTED))
+
+    def compute():
+        runs = (
+            AnalysisRun.objects.order_by('-run_date')
+            .annotate(missing_role_count=Count('missing_roles'))
+            .values('id', 'run_date', 'status', 'departments_analyzed', 'total_roles_analyzed',
+                    'total_employees_analyzed', 'execution_time_seconds', 'missing_role_count')[:limit]
+        )
+        return {'runs': [{**run, 'run_date': run['run_date'].isoformat()} for run in runs]}
+
+    return _cached_tool('analysis', 'analysis_run_history', {'limit': limit}, compute)
+
+
+def latest_recommendations(department: Optional[str] = None, priority: Optional[str] = None) -> Dict[str, Any]:
+    """Missing roles recommended by the latest completed analysis, optionally for one department
+    or priority (critical, high, medium, low)."""
+    def compute():
+        latest = AnalysisRun.objects.filter(status='completed').order_by('-run_date').values('id', 'run_date').first()
+        if latest is None:
+            return {'analysis_id': None, 'recommendations': []}
+        queryset = MissingRole.objects.filter(analysis_run_id=latest['id'])
+        if department:
+            queryset = queryset.filter(department__iexact=department)
+        if priority:
+            queryset = queryset.filter(priority=priority.lower())
+        totals = queryset.aggregate(count=Count('id'), headcount=Sum('recommended_headcount'))
+        return {
+            'analysis_id': latest['id'],
+            'run_date': latest['run_date'].isoformat(),
+            'count': totals['count'],
+            'total_headcount': totals['headcount'] or 0,
+            'recommendations': list(queryset.values(
+                'recommended_role_title', 'department', 'level', 'priority',
+                'recommended_headcount', 'justification',
+            )[:MAX_LISTED]),
+        }
+
+    return _cached_tool('analysis', 'latest_recommendations', {'department': department, 'priority': priority}, compute)
+
+
+CHAT_TOOLS = [
+    StructuredTool.from_function(fn)
+    for fn in (count_employees, workload_breakdown, skill_holders, org_subtree,
+               analysis_run_history, latest_recommendations)
+]
+TOOLS_BY_NAME = {chat_tool.name: chat_tool for chat_tool in CHAT_TOOLS}
+
+
+def run_tool_calls(tool_calls: List[Dict[str, Any]]) -> List[ToolMessage]:
+    """
+    Execute the tool calls of one model response
+
+    Args:
+        tool_calls: AIMessage.tool_calls (name, args, id)
+
+    Returns:
+        One ToolMessage per call; unknown tools and invalid arguments are
+        reported back to the model as errors instead of raised
+    """
+    messages = []
+    for call in tool_calls:
+        chat_tool = TOOLS_BY_NAME.get(call['name'])
+        try:
+            if chat_tool is None:
+                raise ValueError(f"Unknown tool: {call['name']}")
+            result = chat_tool.invoke(call.get('args') or {})
+            content = json.dumps(result, default=str, separators=(',', ':'))
+        except Exception as e:
+            content = json.dumps({'error': str(e)})
+        messages.append(ToolMessage(content=content, tool_call_id=call['id'], name=call['name']))
+    return messages
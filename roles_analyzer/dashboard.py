@@ -0,0 +1,125 @@
+"""
+Materialized dashboard snapshot
+
+All numbers the Dashboard needs on load are kept in a single
+DashboardSnapshot row. Model signals flag the affected sections stale;
+refresh_snapshot() recomputes only those sections and bumps the version
+used for conditional GETs.
+"""
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import Employee, AnalysisRun, MissingRole, DashboardSnapshot
+from .aggregates import job_role_statistics
+
+
+def compute_org_sections() -> dict:
+    """Job role and workload numbers (depend on JobRole / Employee)"""
+    by_status = {'overloaded': 0, 'normal': 0, 'underutilized': 0}
+    by_department = {}
+    total = 0
+    
+    rows = Employee.objects.values('department', 'workload_status').annotate(
+        count=Count('employee_id')
+    ).order_by('department')
+    for row in rows:
+        dept = by_department.setdefault(row['department'], {'total': 0, 'overloaded': 0})
+        dept['total'] += row['count']
+        if row['workload_status'] == 'overloaded':
+            dept['overloaded'] += row['count']
+        by_status[row['workload_status']] = by_status.get(row['workload_status'], 0) + row['count']
+        total += row['count']
+    
+    return {
+        'job_roles': job_role_statistics(),
+        'workload': {
+            'total_employees': total,
+            'by_status': by_status,
+            'by_department': by_department,
+        },
+    }
+
+
+def compute_analysis_sections() -> dict:
+    """Analysis run and recommendation numbers (depend on AnalysisRun / MissingRole)"""
+    latest_run = AnalysisRun.objects.filter(status='completed').order_by('-run_date').annotate(
+        missing_roles_count=Count('missing_roles')
+    ).values('id', 'run_date', 'execution_time_seconds', 'missing_roles_count').first()
+    
+    by_priority = {'critical': 0, 'high': 0, 'medium': 0, 'low': 0}
+    if latest_run:
+        rows = MissingRole.objects.filter(analysis_run_id=latest_run['id']).values('priority').annotate(
+            count=Count('id')
+        )
+        for row in rows:
+            by_priority[row['priority']] = row['count']
+        latest_run['run_date'] = latest_run['run_date'].isoformat()
+    
+    runs_by_status = dict(
+        AnalysisRun.objects.values_list('status').annotate(count=Count('id')).order_by()
+    )
+    
+    return {
+        'analysis': {
+            'latest_run': latest_run,
+            'latest_by_priority': by_priority,
+            'runs_by_status': runs_by_status,
+            'total_runs': sum(runs_by_status.values()),
+        },
+    }
+
+
+SECTION_BUILDERS = {
+    'org_stale': compute_org_sections,
+    'analysis_stale': compute_analysis_sections,
+}
+
+
+def mark_stale(*flags: str):
+    """Flag snapshot sections for recompute (called from model signals)"""
+    DashboardSnapshot.objects.filter(pk=DashboardSnapshot.SINGLETON_ID).update(
+        **{flag: True for flag in flags}
+    )
+
+
+def refresh_snapshot(force: bool = False) -> DashboardSnapshot:
+    """
+    Recompute stale sections of the dashboard snapshot
+    
+    The stale flags are claimed and the sections merged into the current
+    data under the snapshot's row lock, so concurrent refreshes (requests
+    and the refresh_dashboard loop) run one after the other and none saves
+    sections older than another's. A write landing mid-refresh flags its
+    section stale again once the refresh commits.
+    
+    Args:
+        force: Recompute every section regardless of stale flags
+    
+    Returns:
+        The up-to-date DashboardSnapshot
+    """
+    DashboardSnapshot.objects.get_or_create(pk=DashboardSnapshot.SINGLETON_ID)
+    
+    with transaction.atomic():
+        snapshot = DashboardSnapshot.objects.select_for_update().get(pk=DashboardSnapshot.SINGLETON_ID)
+        stale = [flag for flag in SECTION_BUILDERS if force or getattr(snapshot, flag)]
+        if stale:
+            data = dict(snapshot.data or {})
+            for flag in stale:
+                data.update(SECTION_BUILDERS[flag]())
+                setattr(snapshot, flag, False)
+            snapshot.data = data
+            snapshot.version += 1
+            snapshot.refreshed_at = timezone.now()
+            snapshot.save()
+    
+    return snapshot
+
+
+def get_snapshot() -> DashboardSnapshot:
+    """Return the current snapshot, refreshing stale sections first if needed"""
+    snapshot = DashboardSnapshot.objects.filter(pk=DashboardSnapshot.SINGLETON_ID).first()
+    if snapshot is None or snapshot.org_stale or snapshot.analysis_stale:
+        snapshot = refresh_snapshot()
+    return snapshot
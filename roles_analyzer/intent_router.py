@@ -0,0 +1,392 @@
+"""
+Local intent classification for chatbot messages
+
+Before any LLM call, each message is routed to one of four intents:
+
+    answer_from_data             a question about the current org data
+    show_latest_recommendations  asks for the missing roles already found
+    run_scoped_analysis          explicitly asks for a new analysis run
+    small_talk                   greetings, thanks, questions about the bot
+
+Department and role mentions are found in one pass with an Aho-Corasick
+automaton built from the org data (rebuilt only when the 'org' data version
+changes) and replaced by placeholders, so the classifier generalizes across
+names. The classifier is a softmax regression over hashed word uni- and
+bigrams, trained at first use from the labeled examples below. A new
+analysis is only started when the classifier is confident; otherwise the
+message is answered from data.
+"""
+import re
+import threading
+import zlib
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .cache_utils import get_data_version
+
+
+INTENT_ANSWER_FROM_DATA = 'answer_from_data'
+INTENT_SHOW_LATEST = 'show_latest_recommendations'
+INTENT_RUN_ANALYSIS = 'run_scoped_analysis'
+INTENT_SMALL_TALK = 'small_talk'
+INTENTS = (INTENT_ANSWER_FROM_DATA, INTENT_SHOW_LATEST, INTENT_RUN_ANALYSIS, INTENT_SMALL_TALK)
+
+# A multi-minute analysis is only started above this probability
+DEFAULT_ANALYSIS_THRESHOLD = 0.6
+
+HASH_DIMENSIONS = 2 ** 12
+
+DEPARTMENT_TOKEN = 'deptname'
+ROLE_TOKEN = 'rolename'
+
+TRAINING_EXAMPLES: Sequence[Tuple[str, str]] = (
+    # answer_from_data
+    ("can you check who reports to the cto?", INTENT_ANSWER_FROM_DATA),
+    ("check who reports to the rolename", INTENT_ANSWER_FROM_DATA),
+    ("how many employees are in deptname", INTENT_ANSWER_FROM_DATA),
+    ("how many people do we have in deptname", INTENT_ANSWER_FROM_DATA),
+    ("how many overloaded engineers are there", INTENT_ANSWER_FROM_DATA),
+    ("who is overloaded in deptname", INTENT_ANSWER_FROM_DATA),
+    ("which employees know python", INTENT_ANSWER_FROM_DATA),
+    ("who has kubernetes skills", INTENT_ANSWER_FROM_DATA),
+    ("list the rolename employees", INTENT_ANSWER_FROM_DATA),
+    ("what is the headcount of deptname", INTENT_ANSWER_FROM_DATA),
+    ("show me the workload breakdown for deptname", INTENT_ANSWER_FROM_DATA),
+    ("what does the rolename do", INTENT_ANSWER_FROM_DATA),
+    ("what are the responsibilities of a rolename", INTENT_ANSWER_FROM_DATA),
+    ("who manages the deptname team", INTENT_ANSWER_FROM_DATA),
+    ("how big is the deptname department", INTENT_ANSWER_FROM_DATA),
+    ("check how many rolename we have", INTENT_ANSWER_FROM_DATA),
+    ("can you check the team size of deptname", INTENT_ANSWER_FROM_DATA),
+    ("which departments have the most underutilized people", INTENT_ANSWER_FROM_DATA),
+    ("what skills does deptname lack", INTENT_ANSWER_FROM_DATA),
+    ("compare deptname and deptname headcount", INTENT_ANSWER_FROM_DATA),
+    ("when was the last analysis run", INTENT_ANSWER_FROM_DATA),
+    ("how many analyses have we run", INTENT_ANSWER_FROM_DATA),
+    ("tell me about the org structure of deptname", INTENT_ANSWER_FROM_DATA),
+    ("is anyone in deptname working on security", INTENT_ANSWER_FROM_DATA),
+    ("why was the rolename recommended", INTENT_ANSWER_FROM_DATA),
+    ("explain the justification for the rolename recommendation", INTENT_ANSWER_FROM_DATA),
+    ("what is the span of control of the rolename", INTENT_ANSWER_FROM_DATA),
+    ("do we have a single point of failure in deptname", INTENT_ANSWER_FROM_DATA),
+    # show_latest_recommendations
+    ("show me the recommendations", INTENT_SHOW_LATEST),
+    ("show the latest recommendations", INTENT_SHOW_LATEST),
+    ("what are the latest recommendations", INTENT_SHOW_LATEST),
+    ("what roles are we missing", INTENT_SHOW_LATEST),
+    ("what roles are we missing in deptname", INTENT_SHOW_LATEST),
+    ("what are we missing", INTENT_SHOW_LATEST),
+    ("list the missing roles", INTENT_SHOW_LATEST),
+    ("which roles should we hire for deptname", INTENT_SHOW_LATEST),
+    ("what should we hire next", INTENT_SHOW_LATEST),
+    ("show missing roles for deptname", INTENT_SHOW_LATEST),
+    ("what did the last analysis find", INTENT_SHOW_LATEST),
+    ("what were the results of the analysis", INTENT_SHOW_LATEST),
+    ("give me the gaps you found", INTENT_SHOW_LATEST),
+    ("check the recommendations", INTENT_SHOW_LATEST),
+    ("any critical missing roles", INTENT_SHOW_LATEST),
+    ("what are the high priority hires", INTENT_SHOW_LATEST),
+    ("recommendations for deptname", INTENT_SHOW_LATEST),
+    ("summarize the current recommendations", INTENT_SHOW_LATEST),
+    ("which gaps did you identify in deptname", INTENT_SHOW_LATEST),
+    ("recommendations", INTENT_SHOW_LATEST),
+    ("missing roles", INTENT_SHOW_LATEST),
+    ("show me the analysis results", INTENT_SHOW_LATEST),
+    # run_scoped_analysis
+    ("run analysis", INTENT_RUN_ANALYSIS),
+    ("run a new analysis", INTENT_RUN_ANALYSIS),
+    ("run the analysis again", INTENT_RUN_ANALYSIS),
+    ("please run an analysis on deptname", INTENT_RUN_ANALYSIS),
+    ("analyze the organization", INTENT_RUN_ANALYSIS),
+    ("analyze deptname", INTENT_RUN_ANALYSIS),
+    ("analyze the deptname department for missing roles", INTENT_RUN_ANALYSIS),
+    ("analyse deptname and deptname", INTENT_RUN_ANALYSIS),
+    ("start an analysis of deptname", INTENT_RUN_ANALYSIS),
+    ("start a fresh gap analysis", INTENT_RUN_ANALYSIS),
+    ("kick off a new analysis", INTENT_RUN_ANALYSIS),
+    ("rerun the gap analysis for deptname", INTENT_RUN_ANALYSIS),
+    ("re-run the analysis with the latest data", INTENT_RUN_ANALYSIS),
+    ("refresh the recommendations", INTENT_RUN_ANALYSIS),
+    ("refresh recommendations for deptname", INTENT_RUN_ANALYSIS),
+    ("refresh the analysis", INTENT_RUN_ANALYSIS),
+    ("generate new recommendations for deptname", INTENT_RUN_ANALYSIS),
+    ("find missing roles in deptname again", INTENT_RUN_ANALYSIS),
+    ("do a new analysis of the whole company", INTENT_RUN_ANALYSIS),
+    ("identify gaps in deptname now", INTENT_RUN_ANALYSIS),
+    ("can you analyze our structure again", INTENT_RUN_ANALYSIS),
+    ("update the analysis", INTENT_RUN_ANALYSIS),
+    ("trigger an analysis", INTENT_RUN_ANALYSIS),
+    ("run the agents on deptname", INTENT_RUN_ANALYSIS),
+    # small_talk
+    ("hi", INTENT_SMALL_TALK),
+    ("hello", INTENT_SMALL_TALK),
+    ("hey there", INTENT_SMALL_TALK),
+    ("good morning", INTENT_SMALL_TALK),
+    ("thanks", INTENT_SMALL_TALK),
+    ("thank you so much", INTENT_SMALL_TALK),
+    ("great, thanks for the help", INTENT_SMALL_TALK),
+    ("ok", INTENT_SMALL_TALK),
+    ("cool", INTENT_SMALL_TALK),
+    ("bye", INTENT_SMALL_TALK),
+    ("who are you", INTENT_SMALL_TALK),
+    ("what can you do", INTENT_SMALL_TALK),
+    ("how can you help me", INTENT_SMALL_TALK),
+    ("how are you", INTENT_SMALL_TALK),
+    ("nice", INTENT_SMALL_TALK),
+    ("that is helpful", INTENT_SMALL_TALK),
+)
+
+_WORD_RE = re.compile(r"[a-z0-9&+#]+")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase words separated by single spaces"""
+    return ' '.join(_WORD_RE.findall(str(text).lower()))
+
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher over normalized text
+
+    All patterns are found in a single pass over the message, however many
+    departments and roles the org has. Matches must start and end on word
+    boundaries; overlapping matches resolve to the longest, leftmost one.
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[int, object]]] = [[]]
+        self._built = False
+
+    def add(self, pattern: str, value: object):
+        pattern = normalize_text(pattern)
+        if not pattern:
+            return
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append((len(pattern), value))
+        self._built = False
+
+    def build(self):
+        """Compute failure links (breadth-first)"""
+        queue = list(self._goto[0].values())
+        for state in queue:
+            self._fail[state] = 0
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                candidate = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = candidate if candidate != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+        self._built = True
+
+    def find(self, text: str) -> List[Tuple[int, int, object]]:
+        """
+        Whole-word matches in normalized text
+
+        Returns:
+            Non-overlapping (start, end, value) tuples in text order
+        """
+        if not self._built:
+            self.build()
+        matches = []
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for length, value in self._output[state]:
+                start, end = index - length + 1, index + 1
+                if (start == 0 or text[start - 1] == ' ') and (end == len(text) or text[end] == ' '):
+                    matches.append((start, end, value))
+
+        # Longest leftmost, non-overlapping
+        matches.sort(key=lambda m: (m[0], -(m[1] - m[0])))
+        selected, last_end = [], -1
+        for start, end, value in matches:
+            if start >= last_end:
+                selected.append((start, end, value))
+                last_end = end
+        return selected
+
+
+def _role_variants(title: str) -> List[str]:
+    title = normalize_text(title)
+    variants = [title]
+    if title and not title.endswith('s'):
+        variants.append(title + 's')
+    return variants
+
+
+class EntityMatcher:
+    """Finds department and role mentions in a message"""
+
+    def __init__(self, departments: Iterable[str], role_titles: Iterable[str]):
+        self._automaton = AhoCorasick()
+        for department in departments:
+            if department:
+                self._automaton.add(department, ('department', department))
+        for title in role_titles:
+            if title:
+                for variant in _role_variants(title):
+                    self._automaton.add(variant, ('role', title))
+        self._automaton.build()
+
+    def match(self, text: str) -> Tuple[str, List[str], List[str]]:
+        """
+        Returns:
+            (normalized text with mentions replaced by placeholders, departments, role titles)
+        """
+        text = normalize_text(text)
+        departments, roles, parts, position = [], [], [], 0
+        for start, end, (kind, name) in self._automaton.find(text):
+            parts.append(text[position:start])
+            if kind == 'department':
+                parts.append(DEPARTMENT_TOKEN)
+                if name not in departments:
+                    departments.append(name)
+            else:
+                parts.append(ROLE_TOKEN)
+                if name not in roles:
+                    roles.append(name)
+            position = end
+        parts.append(text[position:])
+        return ''.join(parts), departments, roles
+
+
+def _features(text: str) -> Dict[int, float]:
+    """Signed hashed unigrams and bigrams (crc32, stable across processes)"""
+    words = text.split()
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])] + ['<bias>']
+    features: Dict[int, float] = {}
+    for gram in grams:
+        digest = zlib.crc32(gram.encode('utf-8'))
+        index = digest % HASH_DIMENSIONS
+        features[index] = features.get(index, 0.0) + (1.0 if digest & 0x80000000 else -1.0)
+    return features
+
+
+def _vectorize(texts: Sequence[str]) -> np.ndarray:
+    matrix = np.zeros((len(texts), HASH_DIMENSIONS), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for index, value in _features(text).items():
+            matrix[row, index] = value
+    return matrix
+
+
+class LinearIntentClassifier:
+    """Softmax regression over hashed n-grams, trained with full-batch gradient descent"""
+
+    def __init__(self, labels: Sequence[str] = INTENTS):
+        self.labels = list(labels)
+        self.weights = np.zeros((HASH_DIMENSIONS, len(self.labels)), dtype=np.float32)
+
+    def fit(self, texts: Sequence[str], labels: Sequence[str], epochs: int = 300,
+            learning_rate: float = 1.0, l2: float = 1e-4) -> 'LinearIntentClassifier':
+        x = _vectorize([normalize_text(t) for t in texts])
+        y = np.zeros((len(texts), len(self.labels)), dtype=np.float32)
+        y[np.arange(len(texts)), [self.labels.index(label) for label in labels]] = 1.0
+        for _ in range(epochs):
+            probabilities = self._softmax(x @ self.weights)
+            gradient = x.T @ (probabilities - y) / len(texts) + l2 * self.weights
+            self.weights -= learning_rate * gradient
+        return self
+
+    @staticmethod
+    def _softmax(logits: np.ndarray) -> np.ndarray:
+        logits = logits - logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        """Probability of each intent for an (already placeholder-substituted) text"""
+        probabilities = self._softmax(_vectorize([text]) @ self.weights)[0]
+        return {label: float(p) for label, p in zip(self.labels, probabilities)}
+
+
+@dataclass
+class IntentResult:
+    """Routing decision for one message"""
+    intent: str
+    confidence: float
+    departments: List[str] = field(default_factory=list)
+    roles: List[str] = field(default_factory=list)
+    scores: Dict[str, float] = field(default_factory=dict)
+    # Normalized message with mentions replaced by placeholders
+    text: str = ''
+
+
+class IntentRouter:
+    """
+    Classifies chatbot messages and extracts department/role mentions
+
+    Args:
+        matcher: EntityMatcher for the current org data
+        classifier: Trained LinearIntentClassifier
+        analysis_threshold: Minimum probability to start a new analysis
+    """
+
+    def __init__(self, matcher: EntityMatcher, classifier: LinearIntentClassifier,
+                 analysis_threshold: float = DEFAULT_ANALYSIS_THRESHOLD):
+        self.matcher = matcher
+        self.classifier = classifier
+        self.analysis_threshold = analysis_threshold
+
+    def classify(self, message: str) -> IntentResult:
+        text, departments, roles = self.matcher.match(message)
+        scores = self.classifier.predict_proba(text)
+        intent = max(scores, key=scores.get)
+        if intent == INTENT_RUN_ANALYSIS and scores[intent] < self.analysis_threshold:
+            # Not sure enough to spend minutes of LLM time: answer instead
+            intent = INTENT_ANSWER_FROM_DATA
+        return IntentResult(intent, scores[intent], departments, roles, scores, text)
+
+
+_classifier: Optional[LinearIntentClassifier] = None
+_router: Optional[IntentRouter] = None
+_router_version = None
+_router_lock = threading.Lock()
+
+
+def get_intent_classifier() -> LinearIntentClassifier:
+    """Process-wide classifier, trained from TRAINING_EXAMPLES on first use"""
+    global _classifier
+    if _classifier is None:
+        with _router_lock:
+            if _classifier is None:
+                texts, labels = zip(*TRAINING_EXAMPLES)
+                _classifier = LinearIntentClassifier().fit(texts, labels)
+    return _classifier
+
+
+def get_intent_router() -> IntentRouter:
+    """Process-wide router; the entity matcher is rebuilt when org data changes"""
+    global _router, _router_version
+    version = get_data_version('org')
+    if _router is None or _router_version != version:
+        from .models import JobRole
+
+        classifier = get_intent_classifier()
+        rows = list(JobRole.objects.order_by().values_list('department', 'role_title').distinct())
+        matcher = EntityMatcher({dept for dept, _ in rows}, {title for _, title in rows})
+        with _router_lock:
+            _router = IntentRouter(matcher, classifier)
+            _router_version = version
+    return _router
@@ -0,0 +1,89 @@
+"""
+Django management command to measure peak memory of one analysis run
+Usage: python manage.py benchmark_analysis_memory [--employees 100000] [--stream]
+
+Runs the full LangGraph workflow (with checkpointing, as analysis runs do)
+over a synthetic organization, with a local fake chat model in place of the
+provider so only the data path is measured. Reports the memory held by the
+input lists, the peak traced by tracemalloc during the run and the wall time.
+"""
+import json
+import random
+import time
+import tracemalloc
+import uuid
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+
+from roles_analyzer.ai_agents import agents, run_analysis
+from roles_analyzer.ai_agents.fake_providers import FakeProviderChatModel
+from roles_analyzer.management.commands.benchmark_prompt_encoding import previous_recommendations, synthetic_org
+
+
+FAKE_RECOMMENDATION = {
+    'role_title': 'QA Engineer', 'department': 'Engineering', 'level': 'mid', 'gap_type': 'skills',
+    'justification': 'Benchmark', 'expected_impact': 'Benchmark', 'priority': 'high',
+    'recommended_headcount': 1, 'estimated_timeline': 'Immediate',
+    'required_skills': ['Testing'], 'responsibilities': ['Test releases'],
+}
+
+EXTRA_SKILLS = ['Communication', 'Excel', 'SQL', 'Python', 'Project Management', 'Presentation']
+
+
+def synthetic_employees(job_roles, employees, seed: int = 7):
+    """Full employee rows (name, skills) for synthetic_org()'s employees, generated lazily"""
+    rng = random.Random(seed)
+    required = {role['role_id']: role['required_skills'] for role in job_roles}
+    for employee in employees:
+        skills = rng.sample(required[employee['role_id']], k=min(3, len(required[employee['role_id']])))
+        skills += rng.sample(EXTRA_SKILLS, k=2)
+        yield {**employee, 'name': f"Employee {employee['employee_id']}", 'skills': skills}
+
+
+def _mb(size: int) -> str:
+    return f"{size / 1024 / 1024:8.1f} MB"
+
+
+class Command(BaseCommand):
+    help = 'Measure peak memory of one analysis run over a synthetic organization'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=100000, help='Synthetic employee count')
+        parser.add_argument('--stream', action='store_true',
+                            help='Pass employees as a single-pass iterator instead of a list')
+
+    def handle(self, *args, **options):
+        job_roles, employee_stubs, departments = synthetic_org(options['employees'])
+        previous = previous_recommendations(job_roles)
+        fake_llm = FakeProviderChatModel(response=json.dumps([FAKE_RECOMMENDATION]), latency=0.0)
+        self.stdout.write(
+            f"[*] {len(employee_stubs)} employees, {len(job_roles)} roles, {len(departments)} departments"
+            f"{' (streamed)' if options['stream'] else ''}"
+        )
+
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        employees = synthetic_employees(job_roles, employee_stubs)
+        if not options['stream']:
+            employees = list(employees)
+        inputs_size = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.reset_peak()
+
+        started = time.perf_counter()
+        with mock.patch.object(agents, 'get_llm', lambda *a, **k: fake_llm):
+            result = run_analysis(
+                job_roles, employees, departments, previous,
+                thread_id=f"benchmark-memory-{uuid.uuid4().hex}",
+            )
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+        tracemalloc.stop()
+
+        if not result['success']:
+            self.stderr.write(self.style.ERROR(f"[ERROR] Run failed: {result['error']}"))
+            return
+        self.stdout.write(f"  Input lists:          {_mb(inputs_size)}")
+        self.stdout.write(f"  Peak during the run:  {_mb(peak)}  (including the input lists)")
+        self.stdout.write(f"  Wall time:            {elapsed:8.2f} s")
+        self.stdout.write(self.style.SUCCESS("[OK] Benchmark complete"))
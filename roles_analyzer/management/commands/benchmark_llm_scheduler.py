@@ -0,0 +1,147 @@
+"""
+Django management command to measure LLM throughput under a simulated provider rate limit
+Usage: python manage.py benchmark_llm_scheduler [--calls 400] [--concurrency 20] [--server-rpm 300]
+
+Starts a local mock of the OpenAI chat completions endpoint that answers
+429 (with Retry-After) above --server-rpm, then runs the same workload with
+the plain client and with the shared scheduler.
+"""
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from langchain_openai import ChatOpenAI
+
+from roles_analyzer.ai_agents import llm_scheduler
+from roles_analyzer.ai_agents.llm_factory import ScheduledChatOpenAI
+from roles_analyzer.ai_agents.llm_scheduler import DatabaseRateLimiter, LLMScheduler
+from roles_analyzer.models import LLMRateLimitBucket
+
+
+class MockProvider:
+    """Rate-limited fake of /v1/chat/completions (token bucket refilled per second, like the real APIs)"""
+
+    def __init__(self, requests_per_minute, latency):
+        self.capacity = float(requests_per_minute)
+        self.rate = requests_per_minute / 60.0
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self.ok = 0
+        self.rejected = 0
+
+    def admit(self):
+        now = time.monotonic()
+        with self.lock:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.level < 1:
+                self.rejected += 1
+                return False, (1 - self.level) / self.rate
+            self.level -= 1
+            self.ok += 1
+            return True, 0.0
+
+    def handler(self):
+        provider = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                admitted, retry_after = provider.admit()
+                if not admitted:
+                    body = json.dumps({'error': {'message': 'Rate limit reached', 'type': 'requests'}}).encode()
+                    self.send_response(429)
+                    self.send_header('Retry-After', f'{retry_after:.2f}')
+                else:
+                    time.sleep(provider.latency)
+                    body = json.dumps({
+                        'id': 'mock', 'object': 'chat.completion', 'created': int(time.time()), 'model': 'mock',
+                        'choices': [{'index': 0, 'finish_reason': 'stop',
+                                     'message': {'role': 'assistant', 'content': 'ok'}}],
+                        'usage': {'prompt_tokens': 20, 'completion_tokens': 1, 'total_tokens': 21},
+                    }).encode()
+                    self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+class Command(BaseCommand):
+    help = 'Benchmark LLM call throughput against a local rate-limited mock provider'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--calls', type=int, default=400, help='Total LLM calls per scenario')
+        parser.add_argument('--concurrency', type=int, default=20, help='Concurrent callers')
+        parser.add_argument('--server-rpm', type=int, default=300, help='Mock provider requests/min limit')
+        parser.add_argument('--latency', type=float, default=0.05, help='Mock response latency in seconds')
+
+    def handle(self, *args, **options):
+        calls, concurrency, server_rpm = options['calls'], options['concurrency'], options['server_rpm']
+
+        scenarios = [
+            ('plain client, no retries', lambda url: ChatOpenAI(
+                model='mock', api_key='x', base_url=url, max_retries=0)),
+            ('plain client, SDK retries (2)', lambda url: ChatOpenAI(
+                model='mock', api_key='x', base_url=url, max_retries=2)),
+            ('shared scheduler', lambda url: ScheduledChatOpenAI(
+                model='mock', api_key='x', base_url=url, max_retries=0)),
+        ]
+
+        previous = llm_scheduler._scheduler
+        llm_scheduler._scheduler = LLMScheduler(
+            DatabaseRateLimiter(server_rpm, 0, background_reserve=0.0),
+            max_retries=8, base_delay=0.5, max_delay=10.0,
+        )
+        try:
+            self.stdout.write(
+                f"[*] {calls} calls, {concurrency} concurrent, provider limit {server_rpm} req/min\n"
+            )
+            for label, factory in scenarios:
+                LLMRateLimitBucket.objects.all().delete()
+                self._run(label, factory, calls, concurrency, server_rpm, options['latency'])
+        finally:
+            llm_scheduler._scheduler = previous
+            LLMRateLimitBucket.objects.all().delete()
+
+        self.stdout.write(self.style.SUCCESS("\n[OK] Benchmark complete"))
+
+    def _run(self, label, factory, calls, concurrency, server_rpm, latency):
+        provider = MockProvider(server_rpm, latency)
+        server = ThreadingHTTPServer(('127.0.0.1', 0), provider.handler())
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        llm = factory(f'http://127.0.0.1:{server.server_port}/v1')
+
+        def one(i):
+            close_old_connections()
+            try:
+                llm.invoke(f'request {i}')
+                return True
+            except Exception:
+                return False
+            finally:
+                close_old_connections()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(one, range(calls)))
+        elapsed = time.perf_counter() - start
+        server.shutdown()
+        server.server_close()
+
+        succeeded = sum(results)
+        self.stdout.write(
+            f"  {label:<32} ok={succeeded:>4}/{calls}  429s={provider.rejected:>4}  "
+            f"time={elapsed:6.2f}s  goodput={succeeded / elapsed * 60:7.1f} req/min"
+        )
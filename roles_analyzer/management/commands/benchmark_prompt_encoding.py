@@ -0,0 +1,115 @@
+"""
+Django management command to compare prompt encodings of the agents' input data
+Usage: python manage.py benchmark_prompt_encoding [--sizes 100,1000,10000] [--budget 12000]
+
+Builds synthetic organizations of each size (the sample data generator's
+roles replicated across business units), encodes every agent's data with
+each encoding and reports prompt tokens before and after the token budget.
+"""
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+
+from roles_analyzer.ai_agents.agents import (
+    responsibility_rows, responsibility_sections, synthesis_sections, workload_sections, workload_tables,
+)
+from roles_analyzer.ai_agents.prompt_encoding import ENCODINGS, fit_to_budget, token_counter_name
+from roles_analyzer.data_generator import HRDataGenerator
+
+
+def synthetic_org(employee_count: int, seed: int = 42):
+    """Job roles and employees with about employee_count employees"""
+    random.seed(seed)
+    generator = HRDataGenerator(company_size='large')
+    base_roles = generator.generate_job_roles()
+    job_roles, employees = [], []
+    unit = 0
+    while len(employees) < employee_count:
+        unit += 1
+        suffix = '' if unit == 1 else f' (Unit {unit})'
+        for base in base_roles:
+            role = {
+                **base,
+                'role_id': f"{base['role_id']}-{unit}",
+                'department': base['department'] + suffix,
+            }
+            job_roles.append(role)
+            for _ in range(role['current_headcount']):
+                employees.append({
+                    'employee_id': f"EMP{len(employees) + 1:06d}",
+                    'role_id': role['role_id'],
+                    'department': role['department'],
+                    'workload_status': random.choices(
+                        ['underutilized', 'normal', 'overloaded'], weights=[0.15, 0.60, 0.25]
+                    )[0],
+                })
+    employees = employees[:employee_count]
+    departments = sorted({role['department'] for role in job_roles})
+    return job_roles, employees, departments
+
+
+def previous_recommendations(job_roles, count: int = 50):
+    """Recommendations as five earlier runs would have left them (with repeats)"""
+    departments = sorted({role['department'] for role in job_roles})
+    titles = ['QA Engineer', 'Data Engineer', 'HR Business Partner', 'Sales Operations Analyst',
+              'Security Engineer', 'Product Analyst', 'Customer Success Manager', 'FP&A Analyst']
+    return [
+        {'role_title': random.choice(titles), 'department': random.choice(departments),
+         'level': random.choice(['mid', 'senior', 'manager'])}
+        for _ in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Report prompt tokens per agent and org size for each prompt encoding'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='100,1000,10000', help='Comma-separated employee counts')
+        parser.add_argument('--budget', type=int, default=12000, help='Token budget per agent (0 = unlimited)')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        except ValueError:
+            raise CommandError('--sizes must be comma-separated integers')
+        budget = options['budget']
+
+        self.stdout.write(f"[*] Token counter: {token_counter_name()}; budget {budget or 'unlimited'} per agent")
+        self.stdout.write("    Cells: raw tokens -> tokens within budget (summary level, * = truncated)\n")
+
+        for size in sizes:
+            job_roles, employees, departments = synthetic_org(size)
+            workload_stats, role_workload = workload_tables(job_roles, employees, departments)
+            state = {
+                'org_structure_analysis': None, 'responsibility_analysis': None,
+                'workload_analysis': None, 'skills_analysis': None,
+                'previous_recommendations': previous_recommendations(job_roles),
+            }
+            agents = {
+                'responsibilities': lambda encoding: responsibility_sections(responsibility_rows(job_roles), encoding),
+                'workload': lambda encoding: workload_sections(workload_stats, role_workload, encoding),
+                'synthesize (prev. recs)': lambda encoding: [
+                    s for s in synthesis_sections(state, encoding) if s.name == 'previous_recommendations'
+                ],
+            }
+
+            self.stdout.write(
+                f"Org: {len(employees)} employees, {len(job_roles)} roles, {len(departments)} departments"
+            )
+            self.stdout.write(f"  {'agent':<24}" + ''.join(f"{encoding:>26}" for encoding in ENCODINGS))
+            for agent, build in agents.items():
+                cells = []
+                baseline = None
+                for encoding in ENCODINGS:
+                    raw = sum(section.tokens for section in build(encoding))
+                    sections = build(encoding)
+                    fit_to_budget(sections, budget)
+                    fitted = sum(section.tokens for section in sections)
+                    level = max(section.level for section in sections)
+                    truncated = '*' if any(section.truncated for section in sections) else ''
+                    baseline = baseline or raw
+                    cells.append(f"{raw:>8} ({raw / baseline:4.0%}) -> {fitted:>6} L{level}{truncated:<1}")
+                self.stdout.write(f"  {agent:<24}" + ''.join(f"{cell:>26}" for cell in cells))
+            self.stdout.write('')
+
+        self.stdout.write(self.style.SUCCESS("[OK] Benchmark complete"))
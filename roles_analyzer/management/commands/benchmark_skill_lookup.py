@@ -0,0 +1,118 @@
+"""
+Django management command to compare JSON-scan and indexed skill lookups
+Usage: python manage.py benchmark_skill_lookup [--skill Python] [--repeat 5] [--synthetic 50000]
+"""
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from roles_analyzer.models import Employee, JobRole
+from roles_analyzer.skill_tables import rebuild_skill_links
+from roles_analyzer.skills_engine import normalize_skill
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmark "who has skill X" queries: JSON field scan vs. skill link table join'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skill', action='append', help='Skill to look up (repeatable)')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per lookup')
+        parser.add_argument(
+            '--synthetic',
+            type=int,
+            default=0,
+            help='Insert this many synthetic employees first (rolled back afterwards)',
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Rebuild all skill link tables from the JSON fields before timing',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                if options['synthetic']:
+                    self._insert_synthetic(options['synthetic'])
+                if options['rebuild'] or options['synthetic']:
+                    for model in (JobRole, Employee):
+                        created = rebuild_skill_links(model)
+                        self.stdout.write(f"[*] {model._meta.verbose_name_plural}: {created} skill links")
+                self._run(options['skill'] or self._default_skills(), options['repeat'])
+                if options['synthetic']:
+                    raise _Rollback()
+        except _Rollback:
+            self.stdout.write("[*] Synthetic rows rolled back")
+
+    def _default_skills(self):
+        skills = Employee.objects.order_by().values_list('skills', flat=True)[:200]
+        counts = {}
+        for row in skills:
+            for skill in row or ():
+                counts[skill] = counts.get(skill, 0) + 1
+        common = sorted(counts, key=counts.get, reverse=True)
+        return common[:1] + common[-1:] if common else ['Python']
+
+    def _insert_synthetic(self, count):
+        role = JobRole.objects.order_by().first()
+        if role is None:
+            raise CommandError("No job roles found - run generate_sample_data first")
+        pool = [f'Skill {i}' for i in range(2000)] + ['Python', 'Kubernetes', 'SQL', 'Excel']
+        batch = []
+        for i in range(count):
+            batch.append(Employee(
+                employee_id=f'BENCH{i:08d}',
+                name=f'Bench Employee {i}',
+                email=f'bench{i}@example.com',
+                role=role,
+                department=f'Dept {i % 20}',
+                hire_date='2020-01-01',
+                skills=random.sample(pool, 8),
+            ))
+        Employee.objects.bulk_create(batch, batch_size=2000)
+        self.stdout.write(f"[*] Inserted {count} synthetic employees")
+
+    def _time(self, fn, repeat):
+        timings = []
+        result = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = fn()
+            timings.append(time.perf_counter() - start)
+        return min(timings) * 1000, result
+
+    def _run(self, skills, repeat):
+        total = Employee.objects.count()
+        self.stdout.write(f"\nEmployees: {total}\n")
+        
+        for skill in skills:
+            key = normalize_skill(skill)
+            
+            def json_scan():
+                return sum(
+                    1 for row in Employee.objects.order_by().values_list('skills', flat=True).iterator(chunk_size=5000)
+                    if any(normalize_skill(s) == key for s in row or ())
+                )
+            
+            def indexed_join():
+                return Employee.objects.order_by().with_skill(skill).count()
+            
+            scan_ms, scan_count = self._time(json_scan, repeat)
+            join_ms, join_count = self._time(indexed_join, repeat)
+            speedup = scan_ms / join_ms if join_ms else float('inf')
+            self.stdout.write(
+                f"  {skill!r}: JSON scan {scan_ms:.1f} ms ({scan_count} matches), "
+                f"indexed join {join_ms:.1f} ms ({join_count} matches), {speedup:.1f}x"
+            )
+            if scan_count != join_count:
+                self.stdout.write(self.style.WARNING(
+                    "    [!] Counts differ - run with --rebuild to resync the link tables"
+                ))
+        
+        self.stdout.write(self.style.SUCCESS("\n[OK] Benchmark complete"))
@@ -0,0 +1,43 @@
+"""
+Django management command to assign canonical titles to existing rows
+Usage: python manage.py canonicalize_titles [--rebuild]
+"""
+from django.core.management.base import BaseCommand
+from roles_analyzer.models import JobRole, MissingRole, CanonicalTitle
+from roles_analyzer.title_index import resolve_canonical_title, reset_title_index
+
+
+class Command(BaseCommand):
+    help = 'Assign canonical_title_id to job roles and missing role recommendations'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Discard existing canonical titles and rebuild from scratch',
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            CanonicalTitle.objects.all().delete()
+            self.stdout.write("[*] Cleared existing canonical titles")
+        reset_title_index()
+        
+        updated = 0
+        for model, title_field in ((JobRole, 'role_title'), (MissingRole, 'recommended_role_title')):
+            queryset = model.objects.all()
+            if not options['rebuild']:
+                queryset = queryset.filter(canonical_title__isnull=True)
+            
+            pending = []
+            for obj in queryset.only('pk', title_field).iterator():
+                obj.canonical_title_id = resolve_canonical_title(getattr(obj, title_field))
+                pending.append(obj)
+            model.objects.bulk_update(pending, ['canonical_title'], batch_size=1000)
+            updated += len(pending)
+            self.stdout.write(f"  - {model._meta.verbose_name_plural}: {len(pending)} updated")
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"\n[OK] Assigned canonical titles to {updated} rows "
+            f"({CanonicalTitle.objects.count()} canonical titles)"
+        ))
@@ -0,0 +1,54 @@
+"""
+Django management command to check that list endpoints issue a constant number of queries
+Usage: python manage.py check_query_counts
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from roles_analyzer.models import JobRole
+from roles_analyzer.serializers import JobRoleSerializer
+from roles_analyzer.views import EmployeeViewSet, JobRoleViewSet
+
+
+SMALL, LARGE = 1, 200
+
+
+class Command(BaseCommand):
+    help = 'Fail if serializing more rows costs more queries (N+1 regressions)'
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        host = next((h for h in settings.ALLOWED_HOSTS if h not in ('*', '') and not h.startswith('.')), 'localhost')
+
+        def endpoint(viewset, path):
+            view = viewset.as_view({'get': 'list'})
+            return lambda rows: view(factory.get(path, {'page_size': rows}, HTTP_HOST=host)).render()
+
+        def org_roles(rows):
+            JobRoleSerializer(JobRole.objects.order_by('department', 'level', 'role_title')[:rows], many=True).data
+
+        checks = [
+            ('/api/employees/', endpoint(EmployeeViewSet, '/api/employees/')),
+            ('/api/job-roles/', endpoint(JobRoleViewSet, '/api/job-roles/')),
+            ('org summary roles by department', org_roles),
+        ]
+        failures = []
+        for label, fetch in checks:
+            counts = []
+            for rows in (SMALL, LARGE):
+                with CaptureQueriesContext(connection) as queries:
+                    fetch(rows)
+                counts.append(len(queries))
+            if counts[0] == counts[1]:
+                self.stdout.write(self.style.SUCCESS(f"[OK] {label}: {counts[0]} queries for {SMALL} or {LARGE} rows"))
+            else:
+                failures.append(label)
+                self.stdout.write(self.style.ERROR(
+                    f"[ERROR] {label}: {counts[0]} queries for {SMALL} rows, {counts[1]} for {LARGE}"
+                ))
+
+        if failures:
+            raise CommandError(f"Query count grows with rows: {', '.join(failures)}")
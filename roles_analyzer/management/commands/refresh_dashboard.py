@@ -0,0 +1,42 @@
+"""
+Django management command to refresh the materialized dashboard snapshot
+Usage: python manage.py refresh_dashboard [--loop] [--interval 5] [--force]
+"""
+import time
+from django.core.management.base import BaseCommand
+from roles_analyzer.dashboard import refresh_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Recompute stale sections of the dashboard snapshot (optionally as a background loop)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and refresh whenever sections are flagged stale',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help='Seconds between stale checks when looping (default: 5)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Recompute every section on the first pass, even if not stale',
+        )
+
+    def handle(self, *args, **options):
+        force = options['force']
+        while True:
+            before = time.perf_counter()
+            snapshot_version = refresh_snapshot(force=force).version
+            elapsed_ms = (time.perf_counter() - before) * 1000
+            self.stdout.write(f"[*] Dashboard snapshot v{snapshot_version} ({elapsed_ms:.1f} ms)")
+            force = False
+            
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,78 @@
+"""
+Django management command to summarize LLM usage per workflow node over recent analysis runs
+Usage: python manage.py report_llm_usage [--runs 20] [--per-run]
+
+Reads AnalysisRun.node_metrics and reports latency, input tokens, the share
+of input tokens served from the provider's prompt-prefix cache and the
+estimated cost of each node, so cache effectiveness and model choices can be
+compared across repeated runs.
+"""
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from roles_analyzer.models import AnalysisRun
+
+
+NODE_ORDER = ['org_structure', 'responsibilities', 'workload', 'skills', 'synthesize']
+
+
+def _percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))] if values else 0.0
+
+
+class Command(BaseCommand):
+    help = 'Summarize per-node LLM latency, tokens, prompt-cache hits and cost of recent analysis runs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=20, help='Most recent runs to include')
+        parser.add_argument('--per-run', action='store_true', help='Also list every run')
+
+    def handle(self, *args, **options):
+        runs = list(
+            AnalysisRun.objects.exclude(node_metrics={}).order_by('-run_date')
+            .values('id', 'run_date', 'status', 'node_metrics')[:options['runs']]
+        )
+        if not runs:
+            self.stdout.write("[*] No analysis runs with node metrics yet")
+            return
+
+        by_node = defaultdict(list)
+        for run in reversed(runs):
+            for node, metrics in run['node_metrics'].items():
+                by_node[node].append(metrics)
+
+        self.stdout.write(f"[*] {len(runs)} runs\n")
+        self.stdout.write(
+            f"  {'node':<18}{'calls':>6}{'p50 s':>8}{'p95 s':>8}{'avg in':>9}{'cached':>8}{'avg out':>9}"
+            f"{'cost $':>10}  models"
+        )
+        total_cost = 0.0
+        for node in sorted(by_node, key=lambda n: (NODE_ORDER.index(n) if n in NODE_ORDER else 99, n)):
+            calls = by_node[node]
+            latencies = [m.get('latency_seconds') or 0.0 for m in calls]
+            inputs = sum(m.get('input_tokens') or 0 for m in calls)
+            outputs = sum(m.get('output_tokens') or 0 for m in calls)
+            cached = sum(m.get('cache_read_tokens') or 0 for m in calls)
+            cost = sum(m.get('cost_usd') or 0.0 for m in calls)
+            total_cost += cost
+            models = sorted({m.get('model') or '?' for m in calls})
+            self.stdout.write(
+                f"  {node:<18}{len(calls):>6}{_percentile(latencies, 50):>8.2f}{_percentile(latencies, 95):>8.2f}"
+                f"{inputs // len(calls):>9}{(cached / inputs if inputs else 0):>8.0%}{outputs // len(calls):>9}"
+                f"{cost:>10.4f}  {', '.join(models)}"
+            )
+        self.stdout.write(f"\n  Total estimated cost: ${total_cost:.4f} (${total_cost / len(runs):.4f} per run)")
+
+        if options['per_run']:
+            self.stdout.write("\n  Per run (cached share of input tokens, latency):")
+            for run in runs:
+                metrics = run['node_metrics'].values()
+                inputs = sum(m.get('input_tokens') or 0 for m in metrics)
+                cached = sum(m.get('cache_read_tokens') or 0 for m in metrics)
+                latency = sum(m.get('latency_seconds') or 0.0 for m in metrics)
+                self.stdout.write(
+                    f"  #{run['id']:<6} {run['run_date']:%Y-%m-%d %H:%M}  {run['status']:<10}"
+                    f" cached={(cached / inputs if inputs else 0):>4.0%}  llm time={latency:6.1f}s"
+                )
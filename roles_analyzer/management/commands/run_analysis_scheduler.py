@@ -0,0 +1,67 @@
+"""
+Django management command to run organization-wide analyses when the org data changes
+Usage: python manage.py run_analysis_scheduler [--loop] [--interval 60] [--dry-run]
+"""
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from roles_analyzer.analysis_scheduler import AnalysisScheduler, SchedulerConfig
+
+
+class Command(BaseCommand):
+    help = 'Start a background analysis when job roles or employees changed (schedule in AI_CONFIG)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and check for changes every --interval seconds',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=60.0,
+            help='Seconds between checks when looping (default: 60)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report whether a run is due without starting it',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            scheduler = AnalysisScheduler(SchedulerConfig.from_settings())
+        except ValueError as e:
+            raise CommandError(f"ANALYSIS_SCHEDULER: {e}")
+
+        last_reason = None
+        while True:
+            try:
+                decision = scheduler.run_once(dry_run=options['dry_run'])
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f"[ERROR] Scheduled analysis failed: {e}"))
+                decision = None
+            else:
+                now = timezone.localtime().strftime('%Y-%m-%d %H:%M')
+                if decision.analysis_run is not None:
+                    run = decision.analysis_run
+                    if decision.result['success']:
+                        self.stdout.write(self.style.SUCCESS(
+                            f"[OK] {now} Analysis run #{run.id} completed ({decision.reason}): "
+                            f"{len(decision.result.get('recommendations') or [])} recommendations"
+                        ))
+                    else:
+                        self.stdout.write(self.style.ERROR(
+                            f"[ERROR] {now} Analysis run #{run.id} {run.status}: {decision.result.get('error')}"
+                        ))
+                elif decision.run:
+                    self.stdout.write(f"[*] {now} Analysis due ({decision.reason})")
+                elif decision.reason != last_reason or not options['loop']:
+                    # A waiting loop only logs when the reason changes
+                    self.stdout.write(f"[*] {now} No analysis: {decision.reason}")
+                last_reason = decision.reason
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
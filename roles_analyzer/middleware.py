@@ -0,0 +1,50 @@
+"""
+Response compression middleware
+
+Extends Django's GZipMiddleware with Brotli when the optional `brotli`
+package is installed and the client advertises `br` support.
+"""
+import re
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # Optional dependency
+    brotli = None
+
+
+_BR_RE = re.compile(r'\bbr\b')
+
+# Responses smaller than this are not worth compressing
+MIN_COMPRESS_LENGTH = 1024
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """Brotli-or-gzip compression for large, non-streaming API responses (never event streams)"""
+    
+    def process_response(self, request, response):
+        if response.get('Content-Type', '').startswith('text/event-stream'):
+            # Server-sent events go out uncompressed, frame by frame
+            return response
+        if (
+            brotli is None
+            or response.streaming
+            or response.has_header('Content-Encoding')
+            or len(response.content) < MIN_COMPRESS_LENGTH
+            or not _BR_RE.search(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        ):
+            return super().process_response(request, response)
+        
+        patch_vary_headers(response, ('Accept-Encoding',))
+        compressed = brotli.compress(response.content, quality=5)
+        if len(compressed) >= len(response.content):
+            return response
+        
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = 'br'
+        if response.has_header('ETag'):
+            # Compressed bytes differ from the original, so the ETag becomes weak
+            response['ETag'] = re.sub(r'^"', 'W/"', response['ETag'])
+        return response
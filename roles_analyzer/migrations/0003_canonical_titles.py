@@ -0,0 +1,39 @@
+# Generated by Django 5.0.1 on 2026-10-19 01:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roles_analyzer', '0002_conversation_conversationmessage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CanonicalTitle',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('title', models.CharField(help_text='Display title (first title seen)', max_length=200)),
+                ('normalized_key', models.CharField(help_text='Sorted normalized tokens used for exact lookups', max_length=255, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Canonical Title',
+                'verbose_name_plural': 'Canonical Titles',
+                'db_table': 'canonical_titles',
+                'ordering': ['title'],
+            },
+        ),
+        migrations.AddField(
+            model_name='jobrole',
+            name='canonical_title',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='job_roles', to='roles_analyzer.canonicaltitle'),
+        ),
+        migrations.AddField(
+            model_name='missingrole',
+            name='canonical_title',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='missing_roles', to='roles_analyzer.canonicaltitle'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.1 on 2026-10-19 01:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roles_analyzer', '0003_canonical_titles'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='missingrole',
+            index=models.Index(fields=['analysis_run', 'created_at'], name='missing_roles_run_created_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.1 on 2026-10-19 01:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roles_analyzer', '0004_missing_roles_run_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardSnapshot',
+            fields=[
+                ('id', models.IntegerField(default=1, primary_key=True, serialize=False)),
+                ('version', models.IntegerField(default=0, help_text='Incremented on every refresh')),
+                ('data', models.JSONField(default=dict)),
+                ('org_stale', models.BooleanField(default=True, help_text='Job role / employee sections need recompute')),
+                ('analysis_stale', models.BooleanField(default=True, help_text='Analysis sections need recompute')),
+                ('refreshed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Dashboard Snapshot',
+                'verbose_name_plural': 'Dashboard Snapshot',
+                'db_table': 'dashboard_snapshot',
+            },
+        ),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 5.0.1 on 2026-10-19 01:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roles_analyzer', '0005_dashboard_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Skill',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(help_text='Display name (first spelling seen)', max_length=200)),
+                ('normalized_name', models.CharField(max_length=200, unique=True)),
+            ],
+            options={
+                'verbose_name': 'Skill',
+                'verbose_name_plural': 'Skills',
+                'db_table': 'skills',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='MissingRoleSkill',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('missing_role', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='skill_links', to='roles_analyzer.missingrole')),
+                ('skill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='missing_role_links', to='roles_analyzer.skill')),
+            ],
+            options={
+                'db_table': 'missing_role_skills',
+            },
+        ),
+        migrations.CreateModel(
+            name='JobRoleSkill',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('job_role', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='skill_links', to='roles_analyzer.jobrole')),
+                ('skill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='job_role_links', to='roles_analyzer.skill')),
+            ],
+            options={
+                'db_table': 'job_role_skills',
+            },
+        ),
+        migrations.CreateModel(
+            name='EmployeeSkill',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='skill_links', to='roles_analyzer.employee')),
+                ('skill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='employee_links', to='roles_analyzer.skill')),
+            ],
+            options={
+                'db_table': 'employee_skills',
+            },
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='normalized_skills',
+            field=models.ManyToManyField(blank=True, related_name='employees', through='roles_analyzer.EmployeeSkill', to='roles_analyzer.skill'),
+        ),
+        migrations.AddField(
+            model_name='jobrole',
+            name='normalized_skills',
+            field=models.ManyToManyField(blank=True, related_name='job_roles', through='roles_analyzer.JobRoleSkill', to='roles_analyzer.skill'),
+        ),
+        migrations.AddField(
+            model_name='missingrole',
+            name='normalized_skills',
+            field=models.ManyToManyField(blank=True, related_name='missing_roles', through='roles_analyzer.MissingRoleSkill', to='roles_analyzer.skill'),
+        ),
+        migrations.AddIndex(
+            model_name='missingroleskill',
+            index=models.Index(fields=['skill', 'missing_role'], name='missing_role_skills_skill_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='missingroleskill',
+            constraint=models.UniqueConstraint(fields=('missing_role', 'skill'), name='missing_role_skills_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='jobroleskill',
+            index=models.Index(fields=['skill', 'job_role'], name='job_role_skills_skill_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='jobroleskill',
+            constraint=models.UniqueConstraint(fields=('job_role', 'skill'), name='job_role_skills_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='employeeskill',
+            index=models.Index(fields=['skill', 'employee'], name='employee_skills_skill_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='employeeskill',
+            constraint=models.UniqueConstraint(fields=('employee', 'skill'), name='employee_skills_unique'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+from django.db import migrations
+
+
+# (model, JSON field, link model, link FK field)
+SKILL_SOURCES = [
+    ('JobRole', 'required_skills', 'JobRoleSkill', 'job_role'),
+    ('Employee', 'skills', 'EmployeeSkill', 'employee'),
+    ('MissingRole', 'required_skills', 'MissingRoleSkill', 'missing_role'),
+]
+
+
+def normalize_skill(name):
+    # Same rule as roles_analyzer.skills_engine.normalize_skill (copied so the
+    # migration does not depend on application code)
+    return ' '.join(str(name).lower().split())
+
+
+def backfill_skill_tables(apps, schema_editor):
+    Skill = apps.get_model('roles_analyzer', 'Skill')
+    
+    rows_by_source = []
+    names = {}
+    for model_name, json_field, link_name, fk_name in SKILL_SOURCES:
+        model = apps.get_model('roles_analyzer', model_name)
+        rows = list(model.objects.order_by().values_list('pk', json_field))
+        rows_by_source.append((link_name, fk_name, rows))
+        for _, skills in rows:
+            for name in skills or ():
+                key = normalize_skill(name)
+                if key:
+                    names.setdefault(key, str(name).strip()[:200])
+    
+    Skill.objects.bulk_create(
+        [Skill(name=name, normalized_name=key) for key, name in names.items()],
+        batch_size=2000,
+        ignore_conflicts=True,
+    )
+    skill_ids = dict(Skill.objects.values_list('normalized_name', 'id'))
+    
+    for link_name, fk_name, rows in rows_by_source:
+        link_model = apps.get_model('roles_analyzer', link_name)
+        links = {
+            (pk, skill_ids[normalize_skill(name)])
+            for pk, skills in rows
+            for name in skills or ()
+            if normalize_skill(name) in skill_ids
+        }
+        link_model.objects.bulk_create(
+            [link_model(**{f'{fk_name}_id': pk, 'skill_id': skill_id}) for pk, skill_id in links],
+            batch_size=5000,
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roles_analyzer', '0006_skill_tables'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_skill_tables, migrations.RunPython.noop),
+    ]
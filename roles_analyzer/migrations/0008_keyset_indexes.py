@@ -0,0 +1,29 @@
+# Generated by Django 5.0.1 on 2026-10-19 01:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roles_analyzer', '0007_backfill_skill_tables'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['department', 'name', 'employee_id'], name='employees_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['workload_status', 'department'], name='employees_workload_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobrole',
+            index=models.Index(fields=['department', 'level', 'role_title', 'role_id'], name='job_roles_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobrole',
+            index=models.Index(fields=['level'], name='job_roles_level_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-19 02:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roles_analyzer', '0008_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisrun',
+            name='completed_nodes',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.1 on 2026-10-19 02:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roles_analyzer', '0009_analysis_run_completed_nodes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LLMRateLimitBucket',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('tokens', models.FloatField(help_text='Tokens left at updated_at')),
+                ('updated_at', models.FloatField(help_text='Unix time of the last refill')),
+            ],
+            options={
+                'verbose_name': 'LLM Rate Limit Bucket',
+                'verbose_name_plural': 'LLM Rate Limit Buckets',
+                'db_table': 'llm_rate_limit_buckets',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-19 02:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roles_analyzer', '0010_llm_rate_limit_buckets'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisrun',
+            name='node_metrics',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
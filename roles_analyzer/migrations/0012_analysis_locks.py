@@ -0,0 +1,29 @@
+# Generated by Django 5.0.1 on 2026-10-19 02:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roles_analyzer', '0011_analysis_run_node_metrics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalysisLock',
+            fields=[
+                ('key', models.CharField(help_text='Hash of scope and data fingerprint', max_length=64, primary_key=True, serialize=False)),
+                ('departments', models.JSONField(default=list, help_text='Department scope (empty = whole organization)')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(help_text='Lock is abandoned after this (crashed worker)')),
+                ('analysis_run', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='lock', to='roles_analyzer.analysisrun')),
+            ],
+            options={
+                'verbose_name': 'Analysis Lock',
+                'verbose_name_plural': 'Analysis Locks',
+                'db_table': 'analysis_locks',
+            },
+        ),
+    ]
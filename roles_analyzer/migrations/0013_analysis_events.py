@@ -0,0 +1,32 @@
+# Generated by Django 5.0.1 on 2026-10-19 02:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roles_analyzer', '0012_analysis_locks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalysisEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event', models.CharField(choices=[('run_started', 'Run started'), ('node_started', 'Node started'), ('node_text', 'Node text'), ('node_finished', 'Node finished'), ('recommendation', 'Recommendation'), ('run_completed', 'Run completed'), ('run_failed', 'Run failed')], max_length=30)),
+                ('node', models.CharField(blank=True, default='', help_text='Workflow node, if any', max_length=30)),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('analysis_run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='roles_analyzer.analysisrun')),
+            ],
+            options={
+                'verbose_name': 'Analysis Event',
+                'verbose_name_plural': 'Analysis Events',
+                'db_table': 'analysis_events',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['analysis_run', 'id'], name='analysis_event_run_cursor_idx')],
+            },
+        ),
+    ]
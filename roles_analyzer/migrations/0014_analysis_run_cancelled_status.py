@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-19 02:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roles_analyzer', '0013_analysis_events'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='analysisevent',
+            name='event',
+            field=models.CharField(choices=[('run_started', 'Run started'), ('node_started', 'Node started'), ('node_text', 'Node text'), ('node_finished', 'Node finished'), ('recommendation', 'Recommendation'), ('run_completed', 'Run completed'), ('run_failed', 'Run failed'), ('run_cancelled', 'Run cancelled')], max_length=30),
+        ),
+        migrations.AlterField(
+            model_name='analysisrun',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed'), ('cancelled', 'Cancelled')], default='pending', max_length=20),
+        ),
+    ]
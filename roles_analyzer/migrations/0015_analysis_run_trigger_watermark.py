@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-19 02:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roles_analyzer', '0014_analysis_run_cancelled_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisrun',
+            name='data_watermark',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='analysisrun',
+            name='trigger',
+            field=models.CharField(choices=[('manual', 'Manual'), ('scheduled', 'Scheduled')], default='manual', max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-19 02:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roles_analyzer', '0015_analysis_run_trigger_watermark'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisrun',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
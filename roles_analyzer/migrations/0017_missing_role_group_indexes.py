@@ -0,0 +1,25 @@
+# Generated by Django 5.0.1 on 2026-10-19 03:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('roles_analyzer', '0016_analysis_run_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='missingrole',
+            index=models.Index(fields=['created_at'], name='missing_roles_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='missingrole',
+            index=models.Index(fields=['priority', '-analysis_run', 'id'], name='missing_roles_priority_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='missingrole',
+            index=models.Index(fields=['department', '-analysis_run', 'id'], name='missing_roles_dept_idx'),
+        ),
+    ]
@@ -6,7 +6,105 @@ from django.db import models
 from django.db.models import JSONField
 
 
-class JobRole(models.Model):
+class CanonicalTitle(models.Model):
+    """
+    Canonical job title shared by equivalent free-text titles
+    (e.g. "QA Engineer", "Quality Assurance Engineer", "Software Tester")
+    """
+    id = models.AutoField(primary_key=True)
+    title = models.CharField(max_length=200, help_text="Display title (first title seen)")
+    normalized_key = models.CharField(
+        max_length=255,
+        unique=True,
+        help_text="Sorted normalized tokens used for exact lookups"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'canonical_titles'
+        ordering = ['title']
+        verbose_name = 'Canonical Title'
+        verbose_name_plural = 'Canonical Titles'
+    
+    def __str__(self):
+        return self.title
+
+
+class CanonicalTitleMixin:
+    """
+    Saves canonical_title along with the title it is resolved from
+
+    The pre_save signal resolves canonical_title from canonical_title_source;
+    a save(update_fields=[...]) that includes the title must write it too.
+    """
+    canonical_title_source = None
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and self.canonical_title_source in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'canonical_title'}
+        super().save(*args, **kwargs)
+
+
+class Skill(models.Model):
+    """
+    Normalized skill, linked to employees, job roles and recommendations
+    through indexed tables (mirrors the JSON skill lists)
+    """
+    id = models.AutoField(primary_key=True)
+    name = models.CharField(max_length=200, help_text="Display name (first spelling seen)")
+    normalized_name = models.CharField(max_length=200, unique=True)
+    
+    class Meta:
+        db_table = 'skills'
+        ordering = ['name']
+        verbose_name = 'Skill'
+        verbose_name_plural = 'Skills'
+    
+    def __str__(self):
+        return self.name
+
+
+class SkillQuerySet(models.QuerySet):
+    """Indexed skill lookups through the skill link tables"""
+    
+    skill_lookup = 'skill_links__skill__normalized_name'
+    
+    def _skill_keys(self, names):
+        from .skills_engine import normalize_skill
+        return [normalize_skill(name) for name in names if str(name).strip()]
+    
+    def with_any_skill(self, *names):
+        """Rows linked to at least one of the given skills"""
+        return self.filter(**{f'{self.skill_lookup}__in': self._skill_keys(names)}).distinct()
+    
+    def with_all_skills(self, *names):
+        """Rows linked to every one of the given skills"""
+        queryset = self
+        for key in self._skill_keys(names):
+            queryset = queryset.filter(**{self.skill_lookup: key})
+        return queryset
+
+
+class JobRoleQuerySet(SkillQuerySet):
+    def requiring_skill(self, *names):
+        """Job roles whose required_skills include all of the given skills"""
+        return self.with_all_skills(*names)
+
+
+class EmployeeQuerySet(SkillQuerySet):
+    def with_skill(self, *names):
+        """Employees who have all of the given skills"""
+        return self.with_all_skills(*names)
+
+
+class MissingRoleQuerySet(SkillQuerySet):
+    def requiring_skill(self, *names):
+        """Recommendations whose required_skills include all of the given skills"""
+        return self.with_all_skills(*names)
+
+
+class JobRole(CanonicalTitleMixin, models.Model):
     """
     Model representing a job role in the organization
     This reads from existing MySQL HR database
@@ -25,6 +123,13 @@ class JobRole(models.Model):
     
     role_id = models.CharField(max_length=50, primary_key=True)
     role_title = models.CharField(max_length=200)
+    canonical_title = models.ForeignKey(
+        CanonicalTitle,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='job_roles'
+    )
     department = models.CharField(max_length=100)
     level = models.CharField(max_length=20, choices=LEVEL_CHOICES)
     
@@ -36,14 +141,28 @@ class JobRole(models.Model):
     current_headcount = models.IntegerField(default=0)
     team_size = models.IntegerField(default=0, help_text="Number of direct reports")
     
+    normalized_skills = models.ManyToManyField(
+        Skill,
+        through='JobRoleSkill',
+        related_name='job_roles',
+        blank=True
+    )
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = JobRoleQuerySet.as_manager()
+    canonical_title_source = 'role_title'
+    
     class Meta:
         db_table = 'job_roles'
         ordering = ['department', 'level', 'role_title']
         verbose_name = 'Job Role'
         verbose_name_plural = 'Job Roles'
+        indexes = [
+            models.Index(fields=['department', 'level', 'role_title', 'role_id'], name='job_roles_keyset_idx'),
+            models.Index(fields=['level'], name='job_roles_level_idx'),
+        ]
     
     def __str__(self):
         return f"{self.role_title} ({self.department})"
@@ -73,15 +192,27 @@ class Employee(models.Model):
     )
     
     skills = JSONField(default=list, help_text="List of employee skills")
+    normalized_skills = models.ManyToManyField(
+        Skill,
+        through='EmployeeSkill',
+        related_name='employees',
+        blank=True
+    )
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = EmployeeQuerySet.as_manager()
+    
     class Meta:
         db_table = 'employees'
         ordering = ['department', 'name']
         verbose_name = 'Employee'
         verbose_name_plural = 'Employees'
+        indexes = [
+            models.Index(fields=['department', 'name', 'employee_id'], name='employees_keyset_idx'),
+            models.Index(fields=['workload_status', 'department'], name='employees_workload_idx'),
+        ]
     
     def calculate_workload_status(self) -> str:
         """
@@ -129,8 +260,11 @@ class Employee(models.Model):
     
     def update_workload_status(self):
         """Update workload_status based on calculated metrics"""
-        self.workload_status = self.calculate_workload_status()
-        self.save(update_fields=['workload_status'])
+        status = self.calculate_workload_status()
+        if status != self.workload_status:
+            self.workload_status = status
+            # auto_now only applies to listed fields; change detection relies on updated_at
+            self.save(update_fields=['workload_status', 'updated_at'])
     
     def __str__(self):
         return f"{self.name} - {self.role.role_title}"
@@ -145,17 +279,32 @@ class AnalysisRun(models.Model):
         ('running', 'Running'),
         ('completed', 'Completed'),
         ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ]
+    
+    TRIGGER_CHOICES = [
+        ('manual', 'Manual'),
+        ('scheduled', 'Scheduled'),
     ]
     
+    # Multi-kilobyte LLM section texts (deferred unless requested)
+    SECTION_FIELDS = ['org_structure_gaps', 'responsibility_gaps', 'workload_gaps', 'skills_gaps']
+    
     id = models.AutoField(primary_key=True)
     run_date = models.DateTimeField(auto_now_add=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    trigger = models.CharField(max_length=20, choices=TRIGGER_CHOICES, default='manual')
+    # Renewed by the worker process that owns a pending/running run (see analysis_leases)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
     
     # Analysis parameters
     total_roles_analyzed = models.IntegerField(default=0)
     total_employees_analyzed = models.IntegerField(default=0)
     departments_analyzed = JSONField(default=list)
     
+    # Scope, row counts and latest updated_at of the job roles and employees the run read
+    data_watermark = JSONField(default=dict, blank=True)
+    
     # Execution details
     execution_time_seconds = models.FloatField(null=True, blank=True)
     error_message = models.TextField(null=True, blank=True)
@@ -169,6 +318,12 @@ class AnalysisRun(models.Model):
     # Final recommendations (JSON format)
     recommendations = JSONField(default=list)
     
+    # Workflow nodes whose output is saved (a failed run resumes after these)
+    completed_nodes = JSONField(default=list, blank=True)
+    
+    # Per-node model, latency, token usage and estimated cost
+    node_metrics = JSONField(default=dict, blank=True)
+    
     class Meta:
         db_table = 'analysis_runs'
         ordering = ['-run_date']
@@ -179,7 +334,7 @@ class AnalysisRun(models.Model):
         return f"Analysis Run {self.id} - {self.run_date.strftime('%Y-%m-%d %H:%M')} ({self.status})"
 
 
-class MissingRole(models.Model):
+class MissingRole(CanonicalTitleMixin, models.Model):
     """
     Model representing a recommended missing role from AI analysis
     """
@@ -199,6 +354,13 @@ class MissingRole(models.Model):
     
     # Recommended role details
     recommended_role_title = models.CharField(max_length=200)
+    canonical_title = models.ForeignKey(
+        CanonicalTitle,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='missing_roles'
+    )
     department = models.CharField(max_length=100)
     level = models.CharField(max_length=20)
     
@@ -221,19 +383,190 @@ class MissingRole(models.Model):
     # Additional metadata
     required_skills = JSONField(default=list)
     responsibilities = JSONField(default=list)
+    normalized_skills = models.ManyToManyField(
+        Skill,
+        through='MissingRoleSkill',
+        related_name='missing_roles',
+        blank=True
+    )
     
     created_at = models.DateTimeField(auto_now_add=True)
     
+    objects = MissingRoleQuerySet.as_manager()
+    canonical_title_source = 'recommended_role_title'
+    
     class Meta:
         db_table = 'missing_roles'
         ordering = ['-analysis_run__run_date', 'priority', 'recommended_role_title']
         verbose_name = 'Missing Role Recommendation'
         verbose_name_plural = 'Missing Role Recommendations'
+        indexes = [
+            models.Index(fields=['analysis_run', 'created_at'], name='missing_roles_run_created_idx'),
+            models.Index(fields=['created_at'], name='missing_roles_created_idx'),
+            # Per-group windows of by_priority / by_department (newest run first)
+            models.Index(fields=['priority', '-analysis_run', 'id'], name='missing_roles_priority_idx'),
+            models.Index(fields=['department', '-analysis_run', 'id'], name='missing_roles_dept_idx'),
+        ]
     
     def __str__(self):
         return f"{self.recommended_role_title} - {self.priority.upper()} priority"
 
 
+class JobRoleSkill(models.Model):
+    """Link between a job role and one of its required skills"""
+    id = models.AutoField(primary_key=True)
+    job_role = models.ForeignKey(JobRole, on_delete=models.CASCADE, related_name='skill_links')
+    skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='job_role_links')
+    
+    class Meta:
+        db_table = 'job_role_skills'
+        constraints = [
+            models.UniqueConstraint(fields=['job_role', 'skill'], name='job_role_skills_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['skill', 'job_role'], name='job_role_skills_skill_idx'),
+        ]
+
+
+class EmployeeSkill(models.Model):
+    """Link between an employee and one of their skills"""
+    id = models.AutoField(primary_key=True)
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='skill_links')
+    skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='employee_links')
+    
+    class Meta:
+        db_table = 'employee_skills'
+        constraints = [
+            models.UniqueConstraint(fields=['employee', 'skill'], name='employee_skills_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['skill', 'employee'], name='employee_skills_skill_idx'),
+        ]
+
+
+class MissingRoleSkill(models.Model):
+    """Link between a recommended missing role and one of its required skills"""
+    id = models.AutoField(primary_key=True)
+    missing_role = models.ForeignKey(MissingRole, on_delete=models.CASCADE, related_name='skill_links')
+    skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='missing_role_links')
+    
+    class Meta:
+        db_table = 'missing_role_skills'
+        constraints = [
+            models.UniqueConstraint(fields=['missing_role', 'skill'], name='missing_role_skills_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['skill', 'missing_role'], name='missing_role_skills_skill_idx'),
+        ]
+
+
+class DashboardSnapshot(models.Model):
+    """
+    Materialized dashboard numbers (single row)
+    
+    Sections are flagged stale by model signals and recomputed only when
+    their underlying data has changed.
+    """
+    SINGLETON_ID = 1
+    
+    id = models.IntegerField(primary_key=True, default=SINGLETON_ID)
+    version = models.IntegerField(default=0, help_text="Incremented on every refresh")
+    data = JSONField(default=dict)
+    
+    org_stale = models.BooleanField(default=True, help_text="Job role / employee sections need recompute")
+    analysis_stale = models.BooleanField(default=True, help_text="Analysis sections need recompute")
+    
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'dashboard_snapshot'
+        verbose_name = 'Dashboard Snapshot'
+        verbose_name_plural = 'Dashboard Snapshot'
+    
+    def __str__(self):
+        return f"Dashboard Snapshot v{self.version}"
+
+
+class LLMRateLimitBucket(models.Model):
+    """
+    Token bucket shared by every worker process for LLM provider rate limits
+    
+    One row per limit (requests/min, tokens/min). Rows are locked with
+    SELECT ... FOR UPDATE while a call takes from them.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    tokens = models.FloatField(help_text="Tokens left at updated_at")
+    updated_at = models.FloatField(help_text="Unix time of the last refill")
+    
+    class Meta:
+        db_table = 'llm_rate_limit_buckets'
+        verbose_name = 'LLM Rate Limit Bucket'
+        verbose_name_plural = 'LLM Rate Limit Buckets'
+    
+    def __str__(self):
+        return f"{self.name}: {self.tokens:.0f}"
+
+
+class AnalysisLock(models.Model):
+    """
+    Single-flight lock of an in-flight analysis run
+
+    Keyed on the department scope plus a fingerprint of the input data, so
+    identical analyses requested concurrently (from any worker) attach to
+    the one run holding the lock instead of starting their own.
+    """
+    key = models.CharField(max_length=64, primary_key=True, help_text="Hash of scope and data fingerprint")
+    analysis_run = models.OneToOneField(AnalysisRun, on_delete=models.CASCADE, related_name='lock')
+    departments = JSONField(default=list, help_text="Department scope (empty = whole organization)")
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(help_text="Lock is abandoned after this (crashed worker)")
+
+    class Meta:
+        db_table = 'analysis_locks'
+        verbose_name = 'Analysis Lock'
+        verbose_name_plural = 'Analysis Locks'
+
+    def __str__(self):
+        return f"Analysis lock {self.key[:12]} -> run {self.analysis_run_id}"
+
+
+class AnalysisEvent(models.Model):
+    """
+    One progress event of an analysis run
+
+    Written as the run executes and replayed to event stream clients; the
+    auto-increment id is the stream cursor (SSE Last-Event-ID).
+    """
+    EVENT_CHOICES = [
+        ('run_started', 'Run started'),
+        ('node_started', 'Node started'),
+        ('node_text', 'Node text'),
+        ('node_finished', 'Node finished'),
+        ('recommendation', 'Recommendation'),
+        ('run_completed', 'Run completed'),
+        ('run_failed', 'Run failed'),
+        ('run_cancelled', 'Run cancelled'),
+    ]
+
+    analysis_run = models.ForeignKey(AnalysisRun, on_delete=models.CASCADE, related_name='events')
+    event = models.CharField(max_length=30, choices=EVENT_CHOICES)
+    node = models.CharField(max_length=30, blank=True, default='', help_text="Workflow node, if any")
+    data = JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'analysis_events'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['analysis_run', 'id'], name='analysis_event_run_cursor_idx'),
+        ]
+        verbose_name = 'Analysis Event'
+        verbose_name_plural = 'Analysis Events'
+
+    def __str__(self):
+        return f"Run {self.analysis_run_id} {self.event}{f' ({self.node})' if self.node else ''}"
+
+
 class Conversation(models.Model):
     """
     Model representing a chatbot conversation session
@@ -0,0 +1,162 @@
+"""
+Keyset (cursor) pagination
+
+Pages are addressed by the ordering values of the last row seen instead of
+an OFFSET, and no COUNT(*) is issued, so fetching a deep page costs the same
+as fetching the first one when a composite index covers the ordering.
+"""
+import base64
+import json
+
+from django.db.models import BooleanField, Expression, F
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class RowComparison(Expression):
+    """
+    SQL row-value comparison, e.g. (department, name, employee_id) > (%s, %s, %s)
+    
+    Supported by PostgreSQL, MySQL and SQLite, and planned as a single range
+    seek on a composite index covering the same columns (the equivalent
+    chain of ORed prefix conditions usually is not).
+    """
+    conditional = True
+    output_field = BooleanField()
+    
+    def __init__(self, fields, values, operator):
+        super().__init__()
+        self.columns = [F(field) for field in fields]
+        self.values = list(values)
+        self.operator = operator
+    
+    def get_source_expressions(self):
+        return self.columns
+    
+    def set_source_expressions(self, exprs):
+        self.columns = exprs
+    
+    def as_sql(self, compiler, connection):
+        column_sqls, params = [], []
+        for column in self.columns:
+            sql, column_params = compiler.compile(column)
+            column_sqls.append(sql)
+            params.extend(column_params)
+        placeholders = ', '.join(['%s'] * len(self.values))
+        return f"({', '.join(column_sqls)}) {self.operator} ({placeholders})", [*params, *self.values]
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a composite ordering
+    
+    Unlike DRF's CursorPagination (which positions on the first ordering
+    field plus an offset), the cursor holds the value of every ordering
+    field, so ties in the leading column never turn into deep offsets.
+    The ordering must end in a unique column.
+    """
+    ordering = ()
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+    
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        
+        values, reverse = self.decode_cursor(request)
+        if reverse:
+            queryset = queryset.order_by(*('-' + field for field in self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if values is not None:
+            queryset = queryset.filter(self._seek_filter(values, reverse))
+        
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+        
+        # Coming back from a later page means there is always a next page
+        has_next = has_more if not reverse else values is not None
+        has_previous = values is not None if not reverse else has_more
+        self.next_position = self._position(rows[-1]) if rows and has_next else None
+        self.previous_position = self._position(rows[0]) if rows and has_previous else None
+        return rows
+    
+    def _seek_filter(self, values, reverse):
+        return RowComparison(self.ordering, values, '<' if reverse else '>')
+    
+    def _position(self, row):
+        return [getattr(row, field) for field in self.ordering]
+    
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            values = data['v']
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError
+            return values, bool(data.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+    
+    def encode_cursor(self, values, reverse):
+        data = {'v': values}
+        if reverse:
+            data['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(data, default=str).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+    
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position, reverse=False)
+    
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+    
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+    
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class EmployeeKeysetPagination(KeysetPagination):
+    ordering = ('department', 'name', 'employee_id')
+
+
+class JobRoleKeysetPagination(KeysetPagination):
+    ordering = ('department', 'level', 'role_title', 'role_id')
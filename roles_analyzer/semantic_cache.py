@@ -0,0 +1,265 @@
+"""
+Semantic answer cache for chatbot questions
+
+Near-identical questions ("what roles are we missing in Engineering?",
+"which roles are missing in engineering") get the cached answer instead of
+a new LLM call. Questions are embedded locally as hashed word and character
+trigram vectors (after the intent router has replaced department and role
+mentions by placeholders), and looked up in an in-memory random-hyperplane
+LSH index with LRU eviction.
+
+An answer is only reused within the same partition: same intent, same
+mentioned departments/roles, same key terms and same context fingerprint
+(org data version, context totals and latest completed AnalysisRun id), so
+a changed org or a new analysis never serves an outdated answer. Key terms
+are the words left once filler and question words are dropped (skills,
+statuses, negations), so "...who are not overloaded" and "...who know
+java" never reuse the answer to "...who are overloaded" or "...who know
+python"; the embedding only decides between wordings of the same terms. The cache is also flushed
+when an analysis run completes.
+"""
+import hashlib
+import json
+import threading
+import time
+import zlib
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from .cache_utils import get_data_version
+
+
+DEFAULT_SIMILARITY = 0.9
+DEFAULT_MAX_ENTRIES = 2000
+
+EMBEDDING_DIMENSIONS = 512
+LSH_TABLES = 6
+LSH_BITS = 10
+
+# Words that carry no meaning for matching questions
+FILLER_WORDS = frozenset({
+    'a', 'an', 'the', 'please', 'can', 'could', 'would', 'you', 'me', 'us', 'tell', 'show',
+    'give', 'let', 'know', 'i', 'we', 'our', 'do', 'does', 'is', 'are', 'there', 'currently', 'right', 'now',
+    'don', 'doesn', 'isn', 'aren',
+})
+
+# Interchangeable wordings mapped to one form
+SYNONYMS = {
+    'which': 'what',
+    'people': 'employees',
+    'staff': 'employees',
+    'employee': 'employees',
+    'analyse': 'analyze',
+    # Negations (contractions are split by normalize_text: "don't" -> "don t")
+    'no': 'not',
+    't': 'not',
+    'never': 'not',
+    'without': 'not',
+    'excluding': 'not',
+    'except': 'not',
+}
+
+# Question wording that the embedding may match fuzzily; every other word is a key term
+QUESTION_WORDS = frozenset({
+    'what', 'who', 'whom', 'whose', 'how', 'many', 'much', 'list', 'all', 'any', 'anyone', 'find', 'get',
+    'check', 'have', 'has', 'having', 'in', 'of', 'for', 'with', 'to', 'on', 'at', 'by', 'from', 'about',
+    'and', 'or',
+})
+
+# A message with these words after earlier turns likely depends on the conversation
+FOLLOW_UP_WORDS = frozenset({
+    'it', 'its', 'they', 'them', 'their', 'that', 'those', 'this', 'these', 'he', 'she', 'him', 'her',
+    'also', 'else', 'more', 'same',
+})
+
+
+def embed(text: str) -> np.ndarray:
+    """
+    Unit-length hashed embedding of a normalized question
+
+    Words carry most of the weight; character trigrams make inflections and
+    typos ("engineer"/"engineers") land close together.
+    """
+    vector = np.zeros(EMBEDDING_DIMENSIONS, dtype=np.float32)
+    words = [SYNONYMS.get(word, word) for word in text.split()]
+    words = [word for word in words if word not in FILLER_WORDS] or words
+    features = [(word, 1.0) for word in words]
+    for word in words:
+        padded = f"<{word}>"
+        features.extend((padded[i:i + 3], 0.3) for i in range(len(padded) - 2))
+    for feature, weight in features:
+        digest = zlib.crc32(feature.encode('utf-8'))
+        vector[digest % EMBEDDING_DIMENSIONS] += weight if digest & 0x80000000 else -weight
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def key_terms(text: str) -> Tuple[str, ...]:
+    """
+    Words of a normalized question that must match exactly for a cache hit
+
+    Plural and singular forms ("skills"/"skill") count as the same term.
+    """
+    terms = set()
+    for word in text.split():
+        word = SYNONYMS.get(word, word)
+        if word in FILLER_WORDS or word in QUESTION_WORDS:
+            continue
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        terms.add(word)
+    return tuple(sorted(terms))
+
+
+def context_fingerprint(context: Dict[str, Any]) -> str:
+    """Hash of the chatbot context (including the latest analysis id) and the org data version"""
+    payload = json.dumps({'context': context, 'org_version': get_data_version('org')}, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def is_follow_up(text: str, has_history: bool) -> bool:
+    """Whether a message likely refers back to earlier turns (never cached)"""
+    return has_history and any(word in FOLLOW_UP_WORDS for word in text.split())
+
+
+@dataclass
+class CachedAnswer:
+    """One cached answer and the question it was given for"""
+    question: str
+    answer: Dict[str, Any]
+    partition: Hashable
+    vector: np.ndarray
+    created: float
+    similarity: float = 1.0
+
+
+class SemanticCache:
+    """
+    In-memory LSH index of answered questions with LRU eviction
+
+    Args:
+        similarity: Minimum cosine similarity for a hit
+        max_entries: Least recently used answers beyond this are evicted
+        seed: Seed of the random hyperplanes
+    """
+
+    def __init__(self, similarity: float = DEFAULT_SIMILARITY, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 seed: int = 0):
+        self.similarity = similarity
+        self.max_entries = max_entries
+        self._planes = np.random.default_rng(seed).standard_normal(
+            (LSH_TABLES * LSH_BITS, EMBEDDING_DIMENSIONS)
+        ).astype(np.float32)
+        self._bit_weights = 1 << np.arange(LSH_BITS)
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[int, CachedAnswer]' = OrderedDict()
+        self._buckets: Dict[Tuple[Hashable, int, int], set] = defaultdict(set)
+        self._next_id = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _bucket_keys(self, partition: Hashable, vector: np.ndarray):
+        bits = (self._planes @ vector > 0).reshape(LSH_TABLES, LSH_BITS)
+        codes = bits @ self._bit_weights
+        return [(partition, table, int(code)) for table, code in enumerate(codes)]
+
+    def get(self, question: str, partition: Hashable) -> Optional[CachedAnswer]:
+        """
+        Most similar cached answer in the partition, if above the threshold
+
+        Args:
+            question: Normalized question text
+            partition: Exact-match part of the key (intent, entities, key terms, context fingerprint)
+        """
+        vector = embed(question)
+        with self._lock:
+            candidates = set()
+            for key in self._bucket_keys(partition, vector):
+                candidates |= self._buckets.get(key, set())
+            best_id, best_score = None, self.similarity
+            for entry_id in candidates:
+                score = float(self._entries[entry_id].vector @ vector)
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+            if best_id is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(best_id)
+            entry = self._entries[best_id]
+            entry.similarity = best_score
+            return entry
+
+    def put(self, question: str, partition: Hashable, answer: Dict[str, Any]):
+        """Cache an answer, evicting the least recently used ones over max_entries"""
+        vector = embed(question)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = CachedAnswer(question, answer, partition, vector, time.time())
+            for key in self._bucket_keys(partition, vector):
+                self._buckets[key].add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._evict(*self._entries.popitem(last=False))
+
+    def _evict(self, entry_id: int, entry: CachedAnswer):
+        for key in self._bucket_keys(entry.partition, entry.vector):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+        }
+
+
+def cache_settings() -> Dict[str, Any]:
+    """AI_CONFIG['SEMANTIC_CACHE'] with defaults"""
+    config = settings.AI_CONFIG.get('SEMANTIC_CACHE', {})
+    return {
+        'enabled': config.get('ENABLED', True),
+        'similarity': config.get('SIMILARITY', DEFAULT_SIMILARITY),
+        'max_entries': config.get('MAX_ENTRIES', DEFAULT_MAX_ENTRIES),
+    }
+
+
+_cache: Optional[SemanticCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """Process-wide semantic cache, or None when disabled"""
+    global _cache
+    if _cache is None:
+        config = cache_settings()
+        if not config['enabled']:
+            return None
+        with _cache_lock:
+            if _cache is None:
+                _cache = SemanticCache(config['similarity'], config['max_entries'])
+    return _cache
+
+
+def flush_semantic_cache():
+    """Drop every cached answer (e.g. when a new analysis completes)"""
+    if _cache is not None:
+        _cache.clear()
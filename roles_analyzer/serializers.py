@@ -5,38 +5,80 @@ from rest_framework import serializers
 from .models import JobRole, Employee, AnalysisRun, MissingRole, Conversation, ConversationMessage
 
 
-class JobRoleSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """
+    Serializer mixin for sparse fieldsets
+    
+    Keyword args:
+        fields: Iterable of field names to keep (all fields if None)
+        expand: Iterable of keys from Meta.expandable_fields to include.
+                Expandable fields are omitted unless expanded or named in `fields`.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        expand = set(kwargs.pop('expand', None) or ())
+        super().__init__(*args, **kwargs)
+        
+        for key, names in getattr(self.Meta, 'expandable_fields', {}).items():
+            for name in names:
+                if key not in expand and (fields is None or name not in fields):
+                    self.fields.pop(name, None)
+        
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class JobRoleSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = JobRole
-        fields = '__all__'
+        # Skill links would cost a query per row; required_skills carries the same data
+        exclude = ['normalized_skills', 'canonical_title']
 
 
-class EmployeeSerializer(serializers.ModelSerializer):
+class EmployeeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     role_title = serializers.CharField(source='role.role_title', read_only=True)
     
     class Meta:
         model = Employee
-        fields = '__all__'
+        exclude = ['normalized_skills']
 
 
 class MissingRoleSerializer(serializers.ModelSerializer):
     analysis_run = serializers.IntegerField(source='analysis_run.id', read_only=True)
     analysis_run_date = serializers.DateTimeField(source='analysis_run.run_date', read_only=True)
     analysis_run_id = serializers.IntegerField(source='analysis_run.id', read_only=True)
+    canonical_title = serializers.CharField(source='canonical_title.title', read_only=True, default=None)
     
     class Meta:
         model = MissingRole
         fields = [
             'id', 'analysis_run', 'analysis_run_id', 'analysis_run_date', 
-            'recommended_role_title', 'department', 'level',
+            'recommended_role_title', 'canonical_title_id', 'canonical_title',
+            'department', 'level',
             'gap_type', 'justification', 'expected_impact',
             'priority', 'recommended_headcount', 'estimated_timeline',
             'required_skills', 'responsibilities'
         ]
 
 
-class AnalysisRunSerializer(serializers.ModelSerializer):
+def get_missing_roles_count(obj):
+    """Use the queryset's missing_roles_count annotation when present"""
+    count = getattr(obj, 'missing_roles_count', None)
+    return count if count is not None else obj.missing_roles.count()
+
+
+class AnalysisRunSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Analysis run detail serializer
+    
+    The LLM section texts, the raw recommendations JSON and the nested
+    missing roles are only included when expanded (?expand=sections,
+    recommendations,missing_roles) or requested via ?fields=.
+    """
     missing_roles = MissingRoleSerializer(many=True, read_only=True)
+    missing_roles_count = serializers.SerializerMethodField()
     
     class Meta:
         model = AnalysisRun
@@ -46,22 +88,30 @@ class AnalysisRunSerializer(serializers.ModelSerializer):
             'org_structure_gaps', 'responsibility_gaps', 
             'workload_gaps', 'skills_gaps'
         ]
+        expandable_fields = {
+            'sections': AnalysisRun.SECTION_FIELDS,
+            'recommendations': ['recommendations'],
+            'missing_roles': ['missing_roles'],
+        }
+    
+    def get_missing_roles_count(self, obj):
+        return get_missing_roles_count(obj)
 
 
-class AnalysisRunListSerializer(serializers.ModelSerializer):
+class AnalysisRunListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Lighter serializer for list views"""
     missing_roles_count = serializers.SerializerMethodField()
     
     class Meta:
         model = AnalysisRun
         fields = [
-            'id', 'run_date', 'status', 'total_roles_analyzed',
+            'id', 'run_date', 'status', 'trigger', 'total_roles_analyzed',
             'total_employees_analyzed', 'departments_analyzed',
             'execution_time_seconds', 'missing_roles_count'
         ]
     
     def get_missing_roles_count(self, obj):
-        return obj.missing_roles.count()
+        return get_missing_roles_count(obj)
 
 
 class TriggerAnalysisSerializer(serializers.Serializer):
@@ -75,6 +125,15 @@ class TriggerAnalysisSerializer(serializers.Serializer):
         default=False,
         help_text="Whether to include industry benchmark comparison"
     )
+    mode = serializers.ChoiceField(
+        choices=['full', 'fast'],
+        default='full',
+        help_text="'fast' returns rule-based structural findings immediately without running the LLM agents"
+    )
+    background = serializers.BooleanField(
+        default=False,
+        help_text="Return 202 immediately and run the analysis on the background job queue"
+    )
 
 
 class ConversationMessageSerializer(serializers.ModelSerializer):
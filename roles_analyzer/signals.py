@@ -0,0 +1,84 @@
+"""
+Model signal handlers for the Roles Analyzer app
+"""
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import CanonicalTitle, JobRole, Employee, AnalysisRun, MissingRole
+from .title_index import resolve_canonical_title
+from .cache_utils import bump_data_version
+from .dashboard import mark_stale
+from .candidate_matching import update_candidate_index
+from .skill_tables import sync_skill_links, SKILL_LINKS
+from .semantic_cache import flush_semantic_cache
+
+
+@receiver(pre_save, sender=JobRole)
+def assign_job_role_canonical_title(sender, instance, update_fields=None, **kwargs):
+    """Assign canonical_title_id from role_title at write time"""
+    if update_fields is None or 'role_title' in update_fields:
+        instance.canonical_title_id = resolve_canonical_title(instance.role_title)
+
+
+@receiver(pre_save, sender=MissingRole)
+def assign_missing_role_canonical_title(sender, instance, update_fields=None, **kwargs):
+    """Assign canonical_title_id from recommended_role_title at write time"""
+    if update_fields is None or 'recommended_role_title' in update_fields:
+        instance.canonical_title_id = resolve_canonical_title(instance.recommended_role_title)
+
+
+@receiver(post_save, sender=CanonicalTitle)
+@receiver(post_delete, sender=CanonicalTitle)
+def invalidate_title_index(sender, **kwargs):
+    """Other processes load new canonical titles into their index once committed"""
+    transaction.on_commit(lambda: bump_data_version('titles'))
+
+
+@receiver(post_save, sender=JobRole)
+@receiver(post_delete, sender=JobRole)
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def invalidate_org_caches(sender, **kwargs):
+    """Invalidate cached org aggregates on any job role or employee write"""
+    bump_data_version('org')
+    mark_stale('org_stale')
+
+
+@receiver(post_save, sender=AnalysisRun)
+@receiver(post_delete, sender=AnalysisRun)
+@receiver(post_save, sender=MissingRole)
+@receiver(post_delete, sender=MissingRole)
+def invalidate_analysis_caches(sender, **kwargs):
+    """Invalidate cached analysis aggregates on any analysis run or recommendation write"""
+    bump_data_version('analysis')
+    mark_stale('analysis_stale')
+
+
+@receiver(post_save, sender=AnalysisRun)
+def flush_chatbot_answers(sender, instance, **kwargs):
+    """Cached chatbot answers predate a newly completed analysis"""
+    if instance.status == 'completed':
+        flush_semantic_cache()
+
+
+@receiver(post_save, sender=Employee)
+def update_candidate_index_on_save(sender, instance, **kwargs):
+    """Keep the in-memory candidate matching index current"""
+    update_candidate_index(employee=instance)
+
+
+@receiver(post_delete, sender=Employee)
+def update_candidate_index_on_delete(sender, instance, **kwargs):
+    """Drop deleted employees from the candidate matching index"""
+    update_candidate_index(removed_id=instance.employee_id)
+
+
+@receiver(post_save, sender=JobRole)
+@receiver(post_save, sender=Employee)
+@receiver(post_save, sender=MissingRole)
+def sync_skill_tables(sender, instance, update_fields=None, **kwargs):
+    """Mirror JSON skill lists into the indexed skill link tables"""
+    json_field = SKILL_LINKS[sender][0]
+    if update_fields is None or json_field in update_fields:
+        sync_skill_links(instance)
@@ -0,0 +1,98 @@
+"""
+Keeps the relational skill tables in sync with the JSON skill lists
+
+During the transition the JSON fields (JobRole.required_skills,
+Employee.skills, MissingRole.required_skills) remain the source of truth;
+every save mirrors them into the indexed Skill link tables.
+"""
+from typing import Dict, Iterable
+
+from .models import Skill, JobRole, JobRoleSkill, Employee, EmployeeSkill, MissingRole, MissingRoleSkill
+from .skills_engine import normalize_skill
+
+
+# model -> (JSON field, link model, link FK field name)
+SKILL_LINKS = {
+    JobRole: ('required_skills', JobRoleSkill, 'job_role'),
+    Employee: ('skills', EmployeeSkill, 'employee'),
+    MissingRole: ('required_skills', MissingRoleSkill, 'missing_role'),
+}
+
+
+def resolve_skill_ids(names: Iterable[str]) -> Dict[str, int]:
+    """
+    Get or create Skill rows for the given names
+    
+    Returns:
+        Mapping of normalized name -> Skill id
+    """
+    display = {}
+    for name in names:
+        key = normalize_skill(name)
+        if key:
+            display.setdefault(key, str(name).strip()[:200])
+    if not display:
+        return {}
+    
+    existing = dict(Skill.objects.filter(normalized_name__in=display).values_list('normalized_name', 'id'))
+    missing = [Skill(name=display[key], normalized_name=key) for key in display if key not in existing]
+    if missing:
+        Skill.objects.bulk_create(missing, ignore_conflicts=True)
+        existing = dict(Skill.objects.filter(normalized_name__in=display).values_list('normalized_name', 'id'))
+    return existing
+
+
+def sync_skill_links(instance):
+    """Mirror an instance's JSON skill list into its link table"""
+    json_field, link_model, fk_name = SKILL_LINKS[type(instance)]
+    wanted = set(resolve_skill_ids(getattr(instance, json_field) or ()).values())
+    
+    links = link_model.objects.filter(**{fk_name: instance})
+    current = set(links.values_list('skill_id', flat=True))
+    
+    if current - wanted:
+        links.filter(skill_id__in=current - wanted).delete()
+    if wanted - current:
+        link_model.objects.bulk_create(
+            [link_model(**{fk_name: instance, 'skill_id': skill_id}) for skill_id in wanted - current],
+            ignore_conflicts=True,
+        )
+
+
+def rebuild_skill_links(model, batch_size: int = 2000) -> int:
+    """
+    Rebuild the link table for every row of a model (used for backfills)
+    
+    Returns:
+        Number of links created
+    """
+    json_field, link_model, fk_name = SKILL_LINKS[model]
+    link_model.objects.all().delete()
+    
+    created = 0
+    batch = []
+    rows = model.objects.order_by().values_list('pk', json_field)
+    for pk, skills in rows.iterator(chunk_size=batch_size):
+        batch.append((pk, skills or []))
+        if len(batch) >= batch_size:
+            created += _create_links(batch, link_model, fk_name)
+            batch = []
+    if batch:
+        created += _create_links(batch, link_model, fk_name)
+    return created
+
+
+def _create_links(batch, link_model, fk_name) -> int:
+    skill_ids = resolve_skill_ids(name for _, skills in batch for name in skills)
+    links = {
+        (pk, skill_ids[normalize_skill(name)])
+        for pk, skills in batch
+        for name in skills
+        if normalize_skill(name) in skill_ids
+    }
+    link_model.objects.bulk_create(
+        [link_model(**{f'{fk_name}_id': pk, 'skill_id': skill_id}) for pk, skill_id in links],
+        batch_size=5000,
+        ignore_conflicts=True,
+    )
+    return len(links)
@@ -0,0 +1,227 @@
+"""
+Vectorized skill coverage analytics
+
+Every skill string is interned to an integer id. Employees are rows of a
+sparse boolean employee x skill matrix (stored as parallel row/column index
+arrays, since a dense 1M x 5k matrix would not fit in memory), and all
+department-level numbers come from NumPy bincount passes over it.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+# Required skills held by this many people or fewer are a concentration risk
+DEFAULT_RISK_THRESHOLD = 1
+
+
+def normalize_skill(name: str) -> str:
+    """Case- and whitespace-insensitive key for a skill name"""
+    return ' '.join(str(name).lower().split())
+
+
+class SkillVocabulary:
+    """Interns skill strings to dense integer ids"""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self.names: List[str] = []
+
+    def __len__(self):
+        return len(self.names)
+
+    def intern(self, name: str) -> int:
+        """Return the id for a skill, assigning a new one if unseen"""
+        key = normalize_skill(name)
+        skill_id = self._ids.get(key)
+        if skill_id is None:
+            skill_id = self._ids[key] = len(self.names)
+            self.names.append(str(name).strip())
+        return skill_id
+
+    def get(self, name: str) -> Optional[int]:
+        """Return the id for a skill, or None if unknown"""
+        return self._ids.get(normalize_skill(name))
+
+
+class SkillMatrix:
+    """
+    Sparse boolean skill matrices for employees and department requirements
+
+    Attributes:
+        vocab: SkillVocabulary shared by both matrices
+        departments: Department names (index = department id)
+        employee_departments: Department id of each employee row
+        holder_rows / holder_cols: (employee, skill) pairs of the employee matrix
+        required: Dense bool matrix (department x skill) of required skills
+    """
+
+    def __init__(self, employees: Iterable[Tuple[str, List[str]]],
+                 role_requirements: Iterable[Tuple[str, List[str]]]):
+        """
+        Args:
+            employees: (department, skills) per employee
+            role_requirements: (department, required_skills) per job role
+        """
+        self.vocab = SkillVocabulary()
+        dept_ids: Dict[str, int] = {}
+        intern = self.vocab.intern
+
+        employee_departments = []
+        rows, cols = [], []
+        for row, (department, skills) in enumerate(employees):
+            employee_departments.append(dept_ids.setdefault(department, len(dept_ids)))
+            for skill in set(skills or ()):
+                rows.append(row)
+                cols.append(intern(skill))
+
+        required_pairs = []
+        for department, skills in role_requirements:
+            dept_id = dept_ids.setdefault(department, len(dept_ids))
+            for skill in skills or ():
+                required_pairs.append((dept_id, intern(skill)))
+
+        self.departments = [None] * len(dept_ids)
+        for name, dept_id in dept_ids.items():
+            self.departments[dept_id] = name
+
+        self.employee_departments = np.asarray(employee_departments, dtype=np.int32)
+        self.holder_rows = np.asarray(rows, dtype=np.int64)
+        self.holder_cols = np.asarray(cols, dtype=np.int32)
+
+        self.required = np.zeros((len(self.departments), len(self.vocab)), dtype=bool)
+        if required_pairs:
+            req = np.asarray(required_pairs, dtype=np.int64)
+            self.required[req[:, 0], req[:, 1]] = True
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self.employee_departments), len(self.vocab)
+
+    def employee_row(self, row: int) -> np.ndarray:
+        """Dense boolean skill row for one employee"""
+        mask = np.zeros(len(self.vocab), dtype=bool)
+        mask[self.holder_cols[self.holder_rows == row]] = True
+        return mask
+
+    def coverage(self) -> np.ndarray:
+        """Holder counts per (department, skill), computed in one bincount pass"""
+        n_depts, n_skills = len(self.departments), len(self.vocab)
+        if not len(self.holder_cols):
+            return np.zeros((n_depts, n_skills), dtype=np.int64)
+        flat = self.employee_departments[self.holder_rows].astype(np.int64) * n_skills + self.holder_cols
+        return np.bincount(flat, minlength=n_depts * n_skills).reshape(n_depts, n_skills)
+
+    def holder_counts(self) -> np.ndarray:
+        """Org-wide number of holders per skill"""
+        return np.bincount(self.holder_cols, minlength=len(self.vocab))
+
+    def headcounts(self) -> np.ndarray:
+        """Number of employees per department"""
+        return np.bincount(self.employee_departments, minlength=len(self.departments))
+
+
+def compute_skill_coverage(matrix: SkillMatrix,
+                           risk_threshold: int = DEFAULT_RISK_THRESHOLD,
+                           top_n: int = 20) -> Dict[str, Any]:
+    """
+    Coverage, bus factor and missing required skills for the whole org
+
+    Bus factor of a department is the smallest number of holders among its
+    required skills (0 when a required skill is missing entirely).
+
+    Args:
+        matrix: SkillMatrix to analyze
+        risk_threshold: Required skills with at most this many holders are at risk
+        top_n: Maximum skills listed per department/org-wide list
+
+    Returns:
+        Dictionary with summary, per-department results and org-wide risks
+    """
+    names = matrix.vocab.names
+    coverage = matrix.coverage()
+    holders = matrix.holder_counts()
+    headcounts = matrix.headcounts()
+    required = matrix.required
+
+    missing = required & (coverage == 0)
+    at_risk = required & (coverage > 0) & (coverage <= risk_threshold)
+    required_counts = required.sum(axis=1)
+    covered_counts = (required & (coverage > 0)).sum(axis=1)
+    # Unrequired cells are masked with a sentinel so min() only sees required skills
+    masked = np.where(required, coverage, np.iinfo(np.int64).max)
+    bus_factor = np.where(required_counts > 0, masked.min(axis=1, initial=np.iinfo(np.int64).max), 0)
+
+    departments = {}
+    for dept_id, dept in enumerate(matrix.departments):
+        risk_ids = np.flatnonzero(at_risk[dept_id])
+        risk_ids = risk_ids[np.argsort(coverage[dept_id, risk_ids], kind='stable')][:top_n]
+        departments[dept] = {
+            'headcount': int(headcounts[dept_id]),
+            'required_skills': int(required_counts[dept_id]),
+            'covered_skills': int(covered_counts[dept_id]),
+            'coverage_pct': round(100.0 * covered_counts[dept_id] / required_counts[dept_id], 1)
+            if required_counts[dept_id] else 100.0,
+            'bus_factor': int(bus_factor[dept_id]),
+            'missing_required': sorted(names[i] for i in np.flatnonzero(missing[dept_id]))[:top_n],
+            'at_risk_skills': [
+                {'skill': names[i], 'holders': int(coverage[dept_id, i])} for i in risk_ids
+            ],
+        }
+
+    # Org-wide concentration risk: required somewhere, held by too few people anywhere
+    required_anywhere = required.any(axis=0)
+    concentrated = np.flatnonzero(required_anywhere & (holders <= risk_threshold))
+    concentrated = concentrated[np.argsort(holders[concentrated], kind='stable')][:top_n]
+
+    return {
+        'summary': {
+            'employees': int(matrix.shape[0]),
+            'skills': int(matrix.shape[1]),
+            'departments': len(matrix.departments),
+            'required_skills': int(required_anywhere.sum()),
+            'missing_required': int(missing.sum()),
+            'at_risk_required': int(at_risk.sum()),
+            'risk_threshold': risk_threshold,
+        },
+        'departments': departments,
+        'concentration_risk': [
+            {'skill': names[i], 'holders': int(holders[i])} for i in concentrated
+        ],
+        'most_common_skills': [
+            {'skill': names[i], 'holders': int(holders[i])}
+            for i in np.argsort(-holders, kind='stable')[:top_n]
+        ],
+    }
+
+
+def format_skill_facts(coverage: Dict[str, Any]) -> str:
+    """
+    Render skill coverage results as compact fact lines for an LLM prompt
+
+    Args:
+        coverage: Output of compute_skill_coverage()
+    """
+    summary = coverage['summary']
+    lines = [
+        f"Employees: {summary['employees']}, distinct skills: {summary['skills']}, "
+        f"required skills: {summary['required_skills']}, missing required (dept x skill): "
+        f"{summary['missing_required']}",
+    ]
+    for dept, d in coverage['departments'].items():
+        line = (
+            f"{dept}: headcount={d['headcount']}, coverage={d['covered_skills']}/{d['required_skills']} "
+            f"({d['coverage_pct']}%), bus_factor={d['bus_factor']}"
+        )
+        if d['missing_required']:
+            line += f"; missing: {', '.join(d['missing_required'])}"
+        if d['at_risk_skills']:
+            line += f"; at risk (<= {summary['risk_threshold']} holders): " + ', '.join(
+                s['skill'] for s in d['at_risk_skills']
+            )
+        lines.append(line)
+    if coverage['concentration_risk']:
+        lines.append("Org-wide concentration risk: " + ', '.join(
+            f"{s['skill']} ({s['holders']})" for s in coverage['concentration_risk']
+        ))
+    return "\n".join(lines)
@@ -0,0 +1,244 @@
+"""
+Deterministic organizational structure analytics
+
+Computes structural gaps exactly from job role data (team_size,
+current_headcount, level, reports_to) so the LLM only has to interpret
+findings instead of discovering them from the raw hierarchy.
+"""
+from collections import defaultdict
+from typing import Any, Dict, List
+
+
+# Seniority rank of each JobRole.level
+LEVEL_RANKS = {
+    'entry': 0,
+    'junior': 1,
+    'mid': 2,
+    'senior': 3,
+    'lead': 4,
+    'manager': 5,
+    'director': 6,
+    'vp': 7,
+    'c_level': 8,
+}
+
+IC_MAX_RANK = LEVEL_RANKS['senior']
+LEAD_RANK = LEVEL_RANKS['lead']
+MANAGER_RANK = LEVEL_RANKS['manager']
+
+# Direct reports above this are a span-of-control problem
+DEFAULT_SPAN_THRESHOLD = 8
+
+# Departments with at least this many people and depth <= FLAT_MAX_DEPTH are flat
+FLAT_MIN_HEADCOUNT = 10
+FLAT_MAX_DEPTH = 2
+
+
+def _rank(role: Dict[str, Any]) -> int:
+    return LEVEL_RANKS.get(role.get('level'), LEVEL_RANKS['mid'])
+
+
+def analyze_structure(job_roles: List[Dict[str, Any]],
+                      span_threshold: int = DEFAULT_SPAN_THRESHOLD) -> Dict[str, Any]:
+    """
+    Compute structural findings for a set of job roles
+
+    Args:
+        job_roles: Job role dictionaries (role_id, role_title, department, level,
+                   current_headcount, team_size, reports_to)
+        span_threshold: Maximum healthy number of direct reports
+
+    Returns:
+        Dictionary of findings:
+            span_of_control_outliers, missing_layers, single_points_of_failure,
+            hierarchy_depth, flat_departments, summary
+    """
+    roles = {role['role_id']: role for role in job_roles}
+    children = defaultdict(list)
+    for role in job_roles:
+        parent_id = role.get('reports_to')
+        if parent_id in roles:
+            children[parent_id].append(role)
+
+    # Span of control: declared team_size vs. headcount actually reporting in,
+    # shared among the role's incumbents (each manager leads part of it)
+    span_outliers = []
+    for role in job_roles:
+        reporting_headcount = sum(child.get('current_headcount', 0) for child in children[role['role_id']])
+        managers = max(role.get('current_headcount', 0), 1)
+        reports_per_manager = round(reporting_headcount / managers, 1)
+        span = max(role.get('team_size', 0), reports_per_manager)
+        if span > span_threshold:
+            span_outliers.append({
+                'role_id': role['role_id'],
+                'role_title': role['role_title'],
+                'department': role['department'],
+                'team_size': role.get('team_size', 0),
+                'managers': managers,
+                'reporting_headcount': reporting_headcount,
+                'reports_per_manager': reports_per_manager,
+                'excess': round(span - span_threshold, 1),
+            })
+    span_outliers.sort(key=lambda f: -f['excess'])
+
+    # Missing layers: ICs reporting straight to managers/directors, and
+    # departments that have both ICs and managers but no lead level
+    missing_layers = []
+    for role in job_roles:
+        parent = roles.get(role.get('reports_to'))
+        if parent is None:
+            continue
+        child_rank, parent_rank = _rank(role), _rank(parent)
+        if child_rank <= IC_MAX_RANK and parent_rank > MANAGER_RANK:
+            missing_layers.append({
+                'type': 'ic_reports_to_executive',
+                'role_id': role['role_id'],
+                'role_title': role['role_title'],
+                'department': role['department'],
+                'reports_to': parent['role_title'],
+                'missing_levels': ['lead', 'manager'],
+            })
+
+    dept_ranks = defaultdict(set)
+    dept_headcount = defaultdict(int)
+    dept_ic_headcount = defaultdict(int)
+    for role in job_roles:
+        dept_ranks[role['department']].add(_rank(role))
+        dept_headcount[role['department']] += role.get('current_headcount', 0)
+        if _rank(role) <= IC_MAX_RANK:
+            dept_ic_headcount[role['department']] += role.get('current_headcount', 0)
+
+    for dept, ranks in sorted(dept_ranks.items()):
+        has_ics = any(r <= IC_MAX_RANK for r in ranks)
+        has_managers = any(r >= MANAGER_RANK for r in ranks)
+        if has_ics and has_managers and LEAD_RANK not in ranks:
+            missing_layers.append({
+                'type': 'no_team_lead_level',
+                'department': dept,
+                'ic_headcount': dept_ic_headcount[dept],
+                'missing_levels': ['lead'],
+            })
+        elif has_ics and not has_managers and dept_headcount[dept] >= FLAT_MIN_HEADCOUNT:
+            missing_layers.append({
+                'type': 'no_management_level',
+                'department': dept,
+                'ic_headcount': dept_headcount[dept],
+                'missing_levels': ['manager'],
+            })
+
+    # Single points of failure: one person holding a role others depend on
+    single_points = []
+    for role in job_roles:
+        if role.get('current_headcount', 0) != 1:
+            continue
+        dependents = len(children[role['role_id']])
+        if dependents or role.get('team_size', 0) > 0 or _rank(role) >= LEAD_RANK:
+            single_points.append({
+                'role_id': role['role_id'],
+                'role_title': role['role_title'],
+                'department': role['department'],
+                'level': role.get('level'),
+                'dependent_roles': dependents,
+                'team_size': role.get('team_size', 0),
+            })
+    single_points.sort(key=lambda f: (-f['dependent_roles'], -f['team_size']))
+
+    # Hierarchy depth: longest reports_to chain ending in each department
+    depth_cache: Dict[str, int] = {}
+
+    def depth(role_id: str) -> int:
+        chain = []
+        current = role_id
+        while current in roles and current not in depth_cache and current not in chain:
+            chain.append(current)
+            current = roles[current].get('reports_to')
+        base = depth_cache.get(current, 0)
+        for offset, node in enumerate(reversed(chain), start=1):
+            depth_cache[node] = base + offset
+        return depth_cache.get(role_id, 1)
+
+    hierarchy_depth = defaultdict(int)
+    for role_id, role in roles.items():
+        hierarchy_depth[role['department']] = max(hierarchy_depth[role['department']], depth(role_id))
+
+    flat_departments = [
+        {'department': dept, 'headcount': dept_headcount[dept], 'depth': hierarchy_depth[dept]}
+        for dept in sorted(hierarchy_depth)
+        if dept_headcount[dept] >= FLAT_MIN_HEADCOUNT and hierarchy_depth[dept] <= FLAT_MAX_DEPTH
+    ]
+
+    return {
+        'span_of_control_outliers': span_outliers,
+        'missing_layers': missing_layers,
+        'single_points_of_failure': single_points,
+        'hierarchy_depth': dict(sorted(hierarchy_depth.items())),
+        'flat_departments': flat_departments,
+        'summary': {
+            'total_roles': len(job_roles),
+            'total_headcount': sum(dept_headcount.values()),
+            'departments': len(dept_ranks),
+            'span_threshold': span_threshold,
+            'span_of_control_outliers': len(span_outliers),
+            'missing_layers': len(missing_layers),
+            'single_points_of_failure': len(single_points),
+            'flat_departments': len(flat_departments),
+        },
+    }
+
+
+def format_structure_facts(findings: Dict[str, Any]) -> str:
+    """
+    Render findings as compact fact lines for an LLM prompt
+
+    Args:
+        findings: Output of analyze_structure()
+
+    Returns:
+        Plain-text fact list
+    """
+    summary = findings['summary']
+    lines = [
+        f"Roles: {summary['total_roles']}, headcount: {summary['total_headcount']}, "
+        f"departments: {summary['departments']}",
+        "Hierarchy depth by department: " + ", ".join(
+            f"{dept}={d}" for dept, d in findings['hierarchy_depth'].items()
+        ),
+    ]
+
+    lines.append(f"Span of control > {summary['span_threshold']}:")
+    for f in findings['span_of_control_outliers']:
+        lines.append(
+            f"- {f['role_title']} ({f['department']}): team_size={f['team_size']}, "
+            f"reports_per_manager={f['reports_per_manager']} "
+            f"({f['reporting_headcount']} reporting / {f['managers']} managers)"
+        )
+    if not findings['span_of_control_outliers']:
+        lines.append("- none")
+
+    lines.append("Missing layers:")
+    for f in findings['missing_layers']:
+        if f['type'] == 'ic_reports_to_executive':
+            lines.append(f"- {f['role_title']} ({f['department']}) reports directly to {f['reports_to']}")
+        elif f['type'] == 'no_team_lead_level':
+            lines.append(f"- {f['department']}: no lead level between {f['ic_headcount']} ICs and management")
+        else:
+            lines.append(f"- {f['department']}: {f['ic_headcount']} people with no manager-level role")
+    if not findings['missing_layers']:
+        lines.append("- none")
+
+    lines.append("Single points of failure (headcount 1):")
+    for f in findings['single_points_of_failure']:
+        lines.append(
+            f"- {f['role_title']} ({f['department']}, {f['level']}): "
+            f"{f['dependent_roles']} dependent roles, team_size={f['team_size']}"
+        )
+    if not findings['single_points_of_failure']:
+        lines.append("- none")
+
+    if findings['flat_departments']:
+        lines.append("Flat departments: " + ", ".join(
+            f"{f['department']} ({f['headcount']} people, depth {f['depth']})"
+            for f in findings['flat_departments']
+        ))
+
+    return "\n".join(lines)
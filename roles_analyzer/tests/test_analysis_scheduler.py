@@ -0,0 +1,54 @@
+from datetime import date, timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from roles_analyzer.analysis_scheduler import AnalysisScheduler, SchedulerConfig
+from roles_analyzer.analysis_service import analysis_fingerprint, data_watermark
+from roles_analyzer.models import AnalysisRun, Employee, JobRole
+from roles_analyzer.title_index import reset_title_index
+
+
+class SchedulerChangeDetectionTests(TestCase):
+    def setUp(self):
+        reset_title_index()
+        # Ten responsibilities for one person: calculate_workload_status() says overloaded
+        role = JobRole.objects.create(
+            role_id='R1', role_title='Backend Engineer', department='Engineering', level='mid',
+            responsibilities=[f"Task {i}" for i in range(10)], current_headcount=1,
+        )
+        self.employee = Employee.objects.create(
+            employee_id='E1', name='Sam Lee', email='sam@example.com', role=role,
+            department='Engineering', hire_date=date(2020, 1, 1), workload_status='normal',
+        )
+        yesterday = timezone.now() - timedelta(days=1)
+        JobRole.objects.update(updated_at=yesterday)
+        Employee.objects.update(updated_at=yesterday)
+        AnalysisRun.objects.create(status='completed', data_watermark=data_watermark())
+
+        self.scheduler = AnalysisScheduler(SchedulerConfig(
+            debounce=timedelta(0), max_delay=timedelta(hours=12), min_interval=timedelta(0),
+            windows=[], quiet_hours=[], daily_budget_usd=0.0,
+        ))
+
+    def test_workload_recalculation_is_a_change(self):
+        self.assertEqual(self.scheduler.check().reason, 'analysis is up to date')
+        fingerprint = analysis_fingerprint()
+
+        # Saves with update_fields, like the recalculate_workload endpoint
+        self.employee.update_workload_status()
+
+        self.assertEqual(self.employee.workload_status, 'overloaded')
+        decision = self.scheduler.check()
+        self.assertTrue(decision.run)
+        self.assertEqual(decision.reason, 'data changed: employees edited')
+        self.assertNotEqual(analysis_fingerprint(), fingerprint)
+
+    def test_unchanged_workload_is_not_a_change(self):
+        self.employee.update_workload_status()
+        self.employee.update_workload_status()
+        AnalysisRun.objects.create(status='completed', data_watermark=data_watermark())
+
+        Employee.objects.get(pk='E1').update_workload_status()
+
+        self.assertEqual(self.scheduler.check().reason, 'analysis is up to date')
@@ -0,0 +1,79 @@
+from django.test import SimpleTestCase
+
+from roles_analyzer.intent_router import (
+    DEPARTMENT_TOKEN, INTENT_ANSWER_FROM_DATA, INTENT_RUN_ANALYSIS, INTENT_SHOW_LATEST, INTENT_SMALL_TALK,
+    ROLE_TOKEN, AhoCorasick, EntityMatcher, IntentRouter, get_intent_classifier,
+)
+
+
+DEPARTMENTS = ['Engineering', 'Sales', 'Data']
+ROLE_TITLES = ['CTO', 'Engineer', 'Data Engineer', 'Senior Data Engineer', 'Account Executive']
+
+
+class IntentRouterTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.router = IntentRouter(EntityMatcher(DEPARTMENTS, ROLE_TITLES), get_intent_classifier())
+
+    def test_questions_do_not_start_an_analysis(self):
+        for message in [
+            "can you check who reports to the CTO?",
+            "check how many engineers we have",
+            "who is overloaded in Sales?",
+            "what skills does Engineering lack",
+            "how many people are in Data",
+        ]:
+            with self.subTest(message=message):
+                result = self.router.classify(message)
+                self.assertNotEqual(result.intent, INTENT_RUN_ANALYSIS)
+                self.assertEqual(result.intent, INTENT_ANSWER_FROM_DATA)
+
+    def test_explicit_requests_start_an_analysis(self):
+        result = self.router.classify("run a new analysis of Engineering")
+        self.assertEqual(result.intent, INTENT_RUN_ANALYSIS)
+        self.assertEqual(result.departments, ['Engineering'])
+
+        for message in ["please run an analysis on Sales", "kick off a new analysis", "analyze Data and Sales"]:
+            with self.subTest(message=message):
+                self.assertEqual(self.router.classify(message).intent, INTENT_RUN_ANALYSIS)
+
+    def test_other_intents(self):
+        self.assertEqual(self.router.classify("what roles are we missing in Sales?").intent, INTENT_SHOW_LATEST)
+        self.assertEqual(self.router.classify("show me the recommendations").intent, INTENT_SHOW_LATEST)
+        self.assertEqual(self.router.classify("thanks!").intent, INTENT_SMALL_TALK)
+
+    def test_low_confidence_analysis_is_answered_instead(self):
+        router = IntentRouter(self.router.matcher, self.router.classifier, analysis_threshold=1.01)
+        self.assertEqual(router.classify("run a new analysis of Engineering").intent, INTENT_ANSWER_FROM_DATA)
+
+
+class EntityMatcherTests(SimpleTestCase):
+    def setUp(self):
+        self.matcher = EntityMatcher(DEPARTMENTS, ROLE_TITLES)
+
+    def test_longest_match_wins(self):
+        text, departments, roles = self.matcher.match("Who is the Senior Data Engineer in Data?")
+
+        self.assertEqual(roles, ['Senior Data Engineer'])
+        self.assertEqual(departments, ['Data'])
+        self.assertEqual(text, f"who is the {ROLE_TOKEN} in {DEPARTMENT_TOKEN}")
+
+    def test_plural_roles_and_whole_words(self):
+        text, departments, roles = self.matcher.match("how many data engineers are in reengineering or Engineering")
+
+        self.assertEqual(roles, ['Data Engineer'])
+        self.assertEqual(departments, ['Engineering'])
+        self.assertEqual(text, f"how many {ROLE_TOKEN} are in reengineering or {DEPARTMENT_TOKEN}")
+
+
+class AhoCorasickTests(SimpleTestCase):
+    def test_leftmost_longest_non_overlapping(self):
+        automaton = AhoCorasick()
+        for pattern in ['data', 'data engineer', 'engineer', 'engineer manager']:
+            automaton.add(pattern, pattern)
+
+        matches = automaton.find('data engineer manager and engineer manager')
+
+        self.assertEqual([value for _, _, value in matches], ['data engineer', 'engineer manager'])
+        self.assertEqual(matches[0][:2], (0, 13))
@@ -0,0 +1,49 @@
+from django.test import SimpleTestCase
+
+from roles_analyzer.ai_agents.json_stream import IncrementalJSONArrayParser, parse_json_array
+
+
+def feed_in_chunks(text, size=7):
+    parser = IncrementalJSONArrayParser()
+    items = []
+    for start in range(0, len(text), size):
+        items.extend(parser.feed(text[start:start + size]))
+    parser.close()
+    return items, parser
+
+
+class IncrementalJSONArrayParserTests(SimpleTestCase):
+    def test_brackets_in_prose_before_the_array(self):
+        text = (
+            'Here are the roles [see below]:\n'
+            '```json\n[{"role_title": "SRE", "required_skills": ["Go", "AWS"]}, {"role_title": "QA Lead"}]\n```'
+        )
+        items, parser = feed_in_chunks(text)
+
+        self.assertEqual([item['role_title'] for item in items], ['SRE', 'QA Lead'])
+        self.assertEqual(parser.errors, [])
+        self.assertTrue(parser.done)
+
+    def test_footnotes_and_lists_before_the_array(self):
+        items, errors = parse_json_array('Based on [1] and ["a", "b"] we suggest: [{"role_title": "SRE"}]')
+
+        self.assertEqual(items, [{'role_title': 'SRE'}])
+        self.assertEqual(errors, [])
+
+    def test_wrapping_object(self):
+        items, _ = feed_in_chunks('{"recommendations": [{"role_title": "SRE"}, {"role_title": "QA Lead"}]}', size=3)
+
+        self.assertEqual([item['role_title'] for item in items], ['SRE', 'QA Lead'])
+
+    def test_malformed_first_element_does_not_skip_the_array(self):
+        items, errors = parse_json_array('[{"role_title": "SRE",, }, {"role_title": "QA Lead",}]')
+
+        self.assertEqual(items, [{'role_title': 'QA Lead'}])
+        self.assertEqual(len(errors), 1)
+
+    def test_truncated_stream(self):
+        items, parser = feed_in_chunks('[{"role_title": "SRE"}, {"role_title": "QA')
+
+        self.assertEqual(items, [{'role_title': 'SRE'}])
+        self.assertFalse(parser.done)
+        self.assertEqual(parser.errors[0][1], 'truncated')
@@ -0,0 +1,50 @@
+from django.test import SimpleTestCase
+
+from roles_analyzer.semantic_cache import SemanticCache, key_terms
+
+
+# Placeholder-substituted questions (as produced by the intent router); the first
+# three pairs score above the default similarity on the embedding alone
+DIFFERENT_QUESTIONS = [
+    ("how many employees in deptname are not overloaded",
+     "how many employees in deptname are overloaded"),
+    ("list all employees in deptname who are not overloaded right now",
+     "list all employees in deptname who are overloaded right now"),
+    ("how many employees in the deptname department have python skills",
+     "how many employees in the deptname department have java skills"),
+    ("which employees don t know python",
+     "which employees know python"),
+]
+
+SAME_QUESTIONS = [
+    ("what roles are we missing in deptname",
+     "which roles are missing in deptname"),
+    ("how many overloaded engineers are there",
+     "how many engineers are overloaded"),
+    ("can you tell me who reports to the rolename",
+     "who reports to the rolename"),
+]
+
+
+class SemanticCacheTests(SimpleTestCase):
+    def cache_with(self, question):
+        cache = SemanticCache()
+        cache.put(question, key_terms(question), {'response': question})
+        return cache
+
+    def test_different_questions_are_not_reused(self):
+        for first, second in DIFFERENT_QUESTIONS:
+            with self.subTest(first=first, second=second):
+                self.assertNotEqual(key_terms(first), key_terms(second))
+                self.assertIsNone(self.cache_with(first).get(second, key_terms(second)))
+
+    def test_rewordings_are_reused(self):
+        for first, second in SAME_QUESTIONS:
+            with self.subTest(first=first, second=second):
+                hit = self.cache_with(first).get(second, key_terms(second))
+                self.assertIsNotNone(hit)
+                self.assertEqual(hit.answer['response'], first)
+
+    def test_key_terms_ignore_plurals_and_negation_wording(self):
+        self.assertEqual(key_terms("employees with python skills"), key_terms("employee with python skill"))
+        self.assertEqual(key_terms("employees without python"), key_terms("employees who don t have python"))
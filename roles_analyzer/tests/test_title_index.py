@@ -0,0 +1,30 @@
+from django.test import TestCase
+
+from roles_analyzer.cache_utils import bump_data_version
+from roles_analyzer.models import CanonicalTitle, JobRole
+from roles_analyzer.title_index import get_title_index, normalize_title, reset_title_index, resolve_canonical_title
+
+
+class CanonicalTitleTests(TestCase):
+    def setUp(self):
+        # The process-wide index outlives each test's rolled-back transaction
+        reset_title_index()
+
+    def test_update_fields_save_resolves_the_new_title(self):
+        role = JobRole.objects.create(role_id='R1', role_title='QA Engineer', department='Engineering', level='mid')
+        role.role_title = 'Product Manager'
+        role.save(update_fields=['role_title'])
+
+        role.refresh_from_db()
+        self.assertEqual(role.canonical_title.normalized_key, normalize_title('Product Manager'))
+
+    def test_titles_created_by_another_process_are_matched(self):
+        get_title_index()
+        # Written by another worker: this process's index never saw it
+        other = CanonicalTitle.objects.bulk_create([
+            CanonicalTitle(title='Quality Assurance Engineer', normalized_key=normalize_title('Quality Assurance Engineer')),
+        ])[0]
+        bump_data_version('titles')
+
+        self.assertEqual(resolve_canonical_title('QA Enginer'), other.id)
+        self.assertEqual(CanonicalTitle.objects.count(), 1)
@@ -0,0 +1,305 @@
+"""
+Canonical job-title index
+
+Free-text titles such as "QA Engineer", "Quality Assurance Engineer" and
+"Software Tester" are normalized into tokens (abbreviations expanded,
+seniority words dropped) and matched against known canonical titles using
+a token inverted index, with trigram similarity to correct misspelled tokens.
+Each process keeps its own index and reads the canonical titles other
+processes created when the 'titles' data version moves.
+"""
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from .cache_utils import get_data_version
+
+
+# Abbreviations and synonyms are expanded before matching so that
+# "QA Engineer" and "Quality Assurance Engineer" share the same tokens
+TOKEN_EXPANSIONS = {
+    'qa': 'quality assurance',
+    'qe': 'quality assurance engineer',
+    'tester': 'quality assurance engineer',
+    'testing': 'quality assurance',
+    'sdet': 'quality assurance engineer',
+    'swe': 'software engineer',
+    'sre': 'site reliability engineer',
+    'dev': 'developer',
+    'devs': 'developer',
+    'eng': 'engineer',
+    'engr': 'engineer',
+    'mgr': 'manager',
+    'hr': 'human resources',
+    'hrbp': 'human resources business partner',
+    'ux': 'user experience',
+    'ui': 'user interface',
+    'ml': 'machine learning',
+    'ai': 'artificial intelligence',
+    'bi': 'business intelligence',
+    'pm': 'product manager',
+    'fp&a': 'financial planning analysis',
+    'l&d': 'learning development',
+    'it': 'information technology',
+    'ops': 'operations',
+    'vp': 'vice president',
+    'cto': 'chief technology officer',
+    'cfo': 'chief financial officer',
+    'ceo': 'chief executive officer',
+    'coo': 'chief operating officer',
+}
+
+# Singular forms for common plural/variant tokens
+TOKEN_STEMS = {
+    'engineers': 'engineer',
+    'engineering': 'engineer',
+    'developers': 'developer',
+    'development': 'developer',
+    'managers': 'manager',
+    'management': 'manager',
+    'analysts': 'analyst',
+    'analytics': 'analyst',
+    'specialists': 'specialist',
+    'designers': 'designer',
+    'scientists': 'scientist',
+}
+
+# Seniority is tracked by the `level` field, not the title
+SENIORITY_TOKENS = {
+    'junior', 'jr', 'senior', 'sr', 'mid', 'associate', 'principal', 'staff',
+    'entry', 'level', 'i', 'ii', 'iii', 'iv',
+}
+
+STOP_TOKENS = {'of', 'and', 'the', 'for', 'a', 'an', 'to', 'in', '&', '-', '/'}
+
+# Minimum similarity for a title to join an existing canonical title
+DEFAULT_MATCH_THRESHOLD = 0.72
+
+# Minimum trigram similarity for correcting a misspelled token
+TOKEN_CORRECTION_THRESHOLD = 0.45
+
+# Postings larger than this are too common to be useful for candidate generation
+MAX_POSTING_SCAN = 2000
+
+_TOKEN_RE = re.compile(r"[a-z0-9&]+")
+
+
+def normalize_tokens(title: str) -> List[str]:
+    """
+    Normalize a free-text title into a sorted, de-duplicated token list
+
+    Args:
+        title: Raw job title
+
+    Returns:
+        Sorted list of canonical tokens
+    """
+    tokens = set()
+    for raw in _TOKEN_RE.findall((title or '').lower()):
+        expanded = TOKEN_EXPANSIONS.get(raw, raw)
+        for token in expanded.split():
+            token = TOKEN_STEMS.get(token, token)
+            if token in SENIORITY_TOKENS or token in STOP_TOKENS:
+                continue
+            tokens.add(token)
+    return sorted(tokens)
+
+
+def normalize_title(title: str) -> str:
+    """Return the normalized key used for exact canonical-title lookups"""
+    return ' '.join(normalize_tokens(title))
+
+
+def trigrams(text: str) -> Set[str]:
+    """Character trigrams of a normalized key, padded at word boundaries"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TitleIndex:
+    """
+    In-memory index of canonical titles
+
+    Exact normalized keys resolve through a dict. Everything else is scored
+    by counting shared postings in a token inverted index, so a lookup only
+    touches the postings of the query's own tokens instead of every title.
+    Tokens missing from the vocabulary (typos such as "Enginer") are first
+    corrected to their nearest vocabulary token by trigram similarity.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_MATCH_THRESHOLD):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._by_key: Dict[str, int] = {}
+        self._token_counts: Dict[int, int] = {}
+        self._token_postings: Dict[str, List[int]] = defaultdict(list)
+        self._vocab_trigrams: Dict[str, Set[str]] = defaultdict(set)
+        self._vocab_gram_counts: Dict[str, int] = {}
+
+    def __len__(self):
+        return len(self._token_counts)
+
+    def add(self, canonical_id: int, key: str):
+        """Register a canonical title under its normalized key"""
+        with self._lock:
+            if canonical_id in self._token_counts:
+                return
+            self._by_key.setdefault(key, canonical_id)
+            tokens = set(key.split())
+            self._token_counts[canonical_id] = len(tokens)
+            for token in tokens:
+                if token not in self._token_postings:
+                    grams = trigrams(token)
+                    self._vocab_gram_counts[token] = len(grams)
+                    for gram in grams:
+                        self._vocab_trigrams[gram].add(token)
+                self._token_postings[token].append(canonical_id)
+
+    def _correct_token(self, token: str) -> str:
+        """Map an unknown token to the most similar vocabulary token, if close enough"""
+        grams = trigrams(token)
+        shared: Dict[str, int] = defaultdict(int)
+        for gram in grams:
+            for candidate in self._vocab_trigrams.get(gram, ()):
+                shared[candidate] += 1
+
+        best, best_score = token, 0.0
+        for candidate, count in shared.items():
+            score = count / (len(grams) + self._vocab_gram_counts[candidate] - count)
+            if score > best_score or (score == best_score and candidate < best):
+                best, best_score = candidate, score
+        return best if best_score >= TOKEN_CORRECTION_THRESHOLD else token
+
+    def match(self, title: str) -> Tuple[Optional[int], float]:
+        """
+        Find the best matching canonical title
+
+        Args:
+            title: Raw job title
+
+        Returns:
+            (canonical_id, score) or (None, best_score) if below threshold
+        """
+        key = normalize_title(title)
+        if not key:
+            return None, 0.0
+
+        exact = self._by_key.get(key)
+        if exact is not None:
+            return exact, 1.0
+
+        tokens = {
+            token if token in self._token_postings else self._correct_token(token)
+            for token in key.split()
+        }
+        corrected = self._by_key.get(' '.join(sorted(tokens)))
+        if corrected is not None:
+            return corrected, 1.0
+
+        # Visit postings rarest first; very common tokens are skipped once
+        # rarer ones have produced candidates, keeping lookups bounded
+        postings = sorted(
+            (self._token_postings[t] for t in tokens if t in self._token_postings),
+            key=len,
+        )
+        hits: Dict[int, int] = defaultdict(int)
+        for posting in postings:
+            if len(posting) > MAX_POSTING_SCAN and hits:
+                break
+            for canonical_id in posting:
+                hits[canonical_id] += 1
+
+        best_id, best_score = None, 0.0
+        for canonical_id, shared in hits.items():
+            score = shared / (len(tokens) + self._token_counts[canonical_id] - shared)
+            if score > best_score or (score == best_score and canonical_id < best_id):
+                best_id, best_score = canonical_id, score
+
+        if best_score >= self.threshold:
+            return best_id, best_score
+        return None, best_score
+
+
+_index: Optional[TitleIndex] = None
+_index_version = None
+_loaded_through_id = 0
+_index_lock = threading.Lock()
+
+
+def _load_titles(index: TitleIndex, queryset) -> int:
+    """Add canonical titles to an index; returns the highest id added"""
+    latest = 0
+    for canonical_id, key in queryset.values_list('id', 'normalized_key').iterator():
+        index.add(canonical_id, key)
+        latest = max(latest, canonical_id)
+    return latest
+
+
+def get_title_index() -> TitleIndex:
+    """
+    Return the process-wide title index, loading it from the database on first use
+
+    Stamped with the 'titles' data version: once another process commits
+    new canonical titles, the ones added since the last load are read, so
+    fuzzy matches see them too. The index is reloaded in full if it no
+    longer holds exactly the titles in the database (deletes, or ids
+    committed out of order).
+    """
+    global _index, _index_version, _loaded_through_id
+    version = get_data_version('titles')
+    if _index is not None and _index_version == version:
+        return _index
+    with _index_lock:
+        if _index is None or _index_version != version:
+            from .models import CanonicalTitle
+            reload = True
+            if _index is not None:
+                _loaded_through_id = max(
+                    _load_titles(_index, CanonicalTitle.objects.filter(id__gt=_loaded_through_id)),
+                    _loaded_through_id,
+                )
+                reload = len(_index) != CanonicalTitle.objects.count()
+            if reload:
+                index = TitleIndex()
+                _loaded_through_id = _load_titles(index, CanonicalTitle.objects.all())
+                _index = index
+            _index_version = version
+    return _index
+
+
+def reset_title_index():
+    """Drop the cached index so the next lookup reloads from the database"""
+    global _index, _index_version
+    with _index_lock:
+        _index = None
+        _index_version = None
+
+
+def resolve_canonical_title(title: str):
+    """
+    Resolve a free-text title to a CanonicalTitle, creating one if nothing matches
+
+    Args:
+        title: Raw job title
+
+    Returns:
+        CanonicalTitle id, or None for empty titles
+    """
+    from .models import CanonicalTitle
+
+    key = normalize_title(title)
+    if not key:
+        return None
+
+    index = get_title_index()
+    canonical_id, _ = index.match(title)
+    if canonical_id is not None:
+        return canonical_id
+
+    canonical, _ = CanonicalTitle.objects.get_or_create(
+        normalized_key=key,
+        defaults={'title': title.strip()[:200]},
+    )
+    index.add(canonical.id, key)
+    return canonical.id
@@ -8,6 +8,8 @@ from .views import (
     EmployeeViewSet,
     AnalysisRunViewSet,
     MissingRoleViewSet,
+    dashboard_snapshot,
+    skills_coverage,
     chatbot_message,
     list_conversations,
     get_conversation
@@ -22,6 +24,8 @@ router.register(r'missing-roles', MissingRoleViewSet, basename='missingrole')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('skills/coverage/', skills_coverage, name='skills_coverage'),
+    path('dashboard/snapshot/', dashboard_snapshot, name='dashboard_snapshot'),
     path('chatbot/', chatbot_message, name='chatbot'),
     path('conversations/', list_conversations, name='list_conversations'),
     path('conversations/<str:conversation_id>/', get_conversation, name='get_conversation'),
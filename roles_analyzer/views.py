@@ -3,9 +3,16 @@ Django REST Framework Views
 """
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.renderers import BaseRenderer, JSONRenderer
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
+from django.http import StreamingHttpResponse
 from django.utils import timezone
-from django.db.models import Count
+from django.utils.dateparse import parse_date, parse_datetime
+from django.db.models import Count, F, Prefetch, Subquery, Window
+from django.db.models.functions import RowNumber
+from datetime import datetime
+import json
 import time
 
 from .models import JobRole, Employee, AnalysisRun, MissingRole, Conversation, ConversationMessage
@@ -19,11 +26,152 @@ from .serializers import (
     ConversationSerializer,
     ConversationDetailSerializer
 )
-from .ai_agents import run_analysis
+from . import aggregates, dashboard
+from .ai_agents import can_resume_analysis
+from .analysis_service import (
+    cancel_analysis_run, claim_failed_run, execute_analysis_run, mark_run_failed, run_or_join_analysis,
+    submit_analysis,
+)
+from .analysis_events import format_sse, stream_events
+from .analysis_leases import recover_stale_runs
+from .analysis_queue import AnalysisQueueFull
+from .structure_engine import analyze_structure
+from .skills_engine import SkillMatrix, compute_skill_coverage, DEFAULT_RISK_THRESHOLD
+from .cache_utils import cached_for_data
+from .candidate_matching import get_candidate_index, DEFAULT_TOP_K
+from .pagination import EmployeeKeysetPagination, JobRoleKeysetPagination
 from .chatbot import HRChatbot
 from rest_framework.decorators import api_view
 
 
+def group_by_canonical_title(roles_data):
+    """
+    Group serialized missing roles by canonical title
+    
+    Returns a list of groups ordered by size, each with the canonical title,
+    the distinct raw titles seen and the member recommendations.
+    """
+    groups = {}
+    for role in roles_data:
+        key = role.get('canonical_title_id') or role['recommended_role_title']
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {
+                'canonical_title_id': role.get('canonical_title_id'),
+                'canonical_title': role.get('canonical_title') or role['recommended_role_title'],
+                'titles': [],
+                'count': 0,
+                'roles': [],
+            }
+        if role['recommended_role_title'] not in group['titles']:
+            group['titles'].append(role['recommended_role_title'])
+        group['count'] += 1
+        group['roles'].append(role)
+    return sorted(groups.values(), key=lambda g: -g['count'])
+
+
+def parse_csv_param(request, name):
+    """Parse a comma-separated query parameter into a list (None if absent)"""
+    value = request.query_params.get(name)
+    if value is None:
+        return None
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+class SparseFieldsViewSetMixin:
+    """
+    Pass ?fields= and ?expand= query parameters through to SparseFieldsMixin serializers
+    """
+    
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', parse_csv_param(self.request, 'fields'))
+        kwargs.setdefault('expand', parse_csv_param(self.request, 'expand'))
+        return super().get_serializer(*args, **kwargs)
+
+
+class FilterParamsViewSetMixin:
+    """
+    Exact-match filters from query parameters (comma-separated values are ORed)
+    
+    Subclasses map query parameter names to model lookups in `filter_params`.
+    """
+    filter_params = {}
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        for param, lookup in self.filter_params.items():
+            values = parse_csv_param(self.request, param)
+            if values:
+                queryset = queryset.filter(**{f'{lookup}__in': values})
+        return queryset
+
+
+class SkillFilterViewSetMixin:
+    """
+    Filter by ?skill=<name>[,<name>...] (rows must have every listed skill)
+    
+    Runs as indexed joins through the skill link tables instead of scanning
+    the JSON skill lists.
+    """
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        skills = parse_csv_param(self.request, 'skill')
+        if skills:
+            queryset = queryset.with_all_skills(*skills)
+        return queryset
+
+
+def org_skill_coverage(departments=None, risk_threshold=DEFAULT_RISK_THRESHOLD):
+    """
+    Skill coverage for the org (or selected departments), cached until org data changes
+    
+    Args:
+        departments: Optional list of departments to restrict the analysis to
+        risk_threshold: Required skills with at most this many holders are at risk
+    """
+    def compute():
+        employees_qs = Employee.objects.order_by()
+        job_roles_qs = JobRole.objects.order_by()
+        if departments:
+            employees_qs = employees_qs.filter(department__in=departments)
+            job_roles_qs = job_roles_qs.filter(department__in=departments)
+        matrix = SkillMatrix(
+            employees_qs.values_list('department', 'skills').iterator(chunk_size=5000),
+            job_roles_qs.values_list('department', 'required_skills').iterator(chunk_size=5000),
+        )
+        return compute_skill_coverage(matrix, risk_threshold=risk_threshold)
+    
+    scope_key = ','.join(sorted(departments)) if departments else '*'
+    return cached_for_data('org', f'skills_coverage:{scope_key}:{risk_threshold}', compute)
+
+
+def fast_analysis(departments=None):
+    """
+    Rule-based analysis computed directly from HR data, without the LLM agents
+    
+    Args:
+        departments: Optional list of departments to restrict the analysis to
+    """
+    start_time = time.time()
+    job_roles_qs = JobRole.objects.all()
+    if departments:
+        job_roles_qs = job_roles_qs.filter(department__in=departments)
+    
+    job_roles = list(job_roles_qs.values(
+        'role_id', 'role_title', 'department', 'level',
+        'reports_to', 'current_headcount', 'team_size',
+    ))
+    
+    return {
+        'mode': 'fast',
+        'departments_analyzed': sorted({role['department'] for role in job_roles}),
+        'structure': analyze_structure(job_roles),
+        'skills': org_skill_coverage(departments),
+        'execution_time_seconds': round(time.time() - start_time, 3),
+    }
+
+
 def find_role_in_tree(node, role_id):
     """Helper function to check if a role exists in a tree"""
     if node['role_id'] == role_id:
@@ -34,44 +182,39 @@ def find_role_in_tree(node, role_id):
     return False
 
 
-class JobRoleViewSet(viewsets.ReadOnlyModelViewSet):
+class JobRoleViewSet(SparseFieldsViewSetMixin, FilterParamsViewSetMixin, SkillFilterViewSetMixin,
+                     viewsets.ReadOnlyModelViewSet):
     """
     API endpoint for viewing job roles
     
-    list: Get all job roles
+    list: Get job roles, cursor-paginated by (department, level, role_title)
+        department=, level=   Filter (comma-separated values allowed)
+        skill=                Filter by required skills
+        fields=               Only return these fields
     retrieve: Get a specific job role by ID
     """
     queryset = JobRole.objects.all()
     serializer_class = JobRoleSerializer
+    pagination_class = JobRoleKeysetPagination
+    filter_params = {
+        'department': 'department',
+        'level': 'level',
+    }
     
     @action(detail=False, methods=['get'])
     def by_department(self, request):
-        """Get job roles grouped by department"""
-        departments = JobRole.objects.values('department').annotate(
-            role_count=Count('role_id')
-        ).order_by('department')
-        
-        result = {}
-        for dept_data in departments:
-            dept = dept_data['department']
-            roles = JobRole.objects.filter(department=dept)
-            result[dept] = JobRoleSerializer(roles, many=True).data
-        
-        return Response(result)
+        """Get job roles grouped by department (served from the cached org summary)"""
+        return Response(aggregates.org_summary()['by_department'])
     
     @action(detail=False, methods=['get'])
     def statistics(self, request):
-        """Get overall job role statistics"""
-        total_roles = JobRole.objects.count()
-        total_headcount = sum(role.current_headcount for role in JobRole.objects.all())
-        departments = JobRole.objects.values_list('department', flat=True).distinct()
-        
-        return Response({
-            'total_roles': total_roles,
-            'total_headcount': total_headcount,
-            'total_departments': len(departments),
-            'departments': list(departments),
-        })
+        """Get overall job role statistics (cached separately from the heavier org summary)"""
+        return Response(aggregates.org_statistics())
+    
+    @action(detail=False, methods=['get'])
+    def org_summary(self, request):
+        """Get job role statistics and roles grouped by department in one response"""
+        return Response(aggregates.org_summary())
     
     @action(detail=False, methods=['get'])
     def org_chart(self, request):
@@ -164,15 +307,25 @@ class JobRoleViewSet(viewsets.ReadOnlyModelViewSet):
         })
 
 
-class EmployeeViewSet(viewsets.ReadOnlyModelViewSet):
+class EmployeeViewSet(SparseFieldsViewSetMixin, FilterParamsViewSetMixin, SkillFilterViewSetMixin,
+                      viewsets.ReadOnlyModelViewSet):
     """
     API endpoint for viewing employees
     
-    list: Get all employees
+    list: Get employees, cursor-paginated by (department, name)
+        department=, workload_status=, role=   Filter (comma-separated values allowed)
+        skill=                                 Filter by skills
+        fields=                                Only return these fields
     retrieve: Get a specific employee by ID
     """
     queryset = Employee.objects.all().select_related('role')
     serializer_class = EmployeeSerializer
+    pagination_class = EmployeeKeysetPagination
+    filter_params = {
+        'department': 'department',
+        'workload_status': 'workload_status',
+        'role': 'role_id',
+    }
     
     @action(detail=False, methods=['get'])
     def workload_stats(self, request):
@@ -302,21 +455,65 @@ class EmployeeViewSet(viewsets.ReadOnlyModelViewSet):
         })
 
 
-class AnalysisRunViewSet(viewsets.ReadOnlyModelViewSet):
+class EventStreamRenderer(BaseRenderer):
+    """Lets clients negotiate text/event-stream (the body is streamed by the view)"""
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Only error responses are rendered here
+        return json.dumps(data).encode('utf-8')
+
+
+class AnalysisRunViewSet(SparseFieldsViewSetMixin, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint for analysis runs
     
     list: Get all analysis runs
-    retrieve: Get a specific analysis run with full details
+    retrieve: Get a specific analysis run (?fields=, ?expand=sections,recommendations,missing_roles)
     trigger: Start a new analysis run
+    cancel: Stop a pending or running analysis run
+    events: Live progress events of a run (server-sent events)
+    sections: Get one LLM section text for a run
     """
-    queryset = AnalysisRun.objects.all().prefetch_related('missing_roles')
+    queryset = AnalysisRun.objects.all()
+    
+    # Large columns only loaded when the response includes them
+    LARGE_FIELDS = AnalysisRun.SECTION_FIELDS + ['recommendations']
     
     def get_serializer_class(self):
         if self.action == 'list':
             return AnalysisRunListSerializer
         return AnalysisRunSerializer
     
+    def get_queryset(self):
+        """Annotate missing role counts and defer/prefetch based on the requested fields"""
+        queryset = AnalysisRun.objects.annotate(
+            missing_roles_count=Count('missing_roles')
+        ).order_by('-run_date')
+        
+        fields = parse_csv_param(self.request, 'fields')
+        expand = set(parse_csv_param(self.request, 'expand') or ())
+        
+        def wanted(name, key):
+            if self.action == 'list':
+                return False
+            return key in expand or (fields is not None and name in fields)
+        
+        deferred = [name for name in AnalysisRun.SECTION_FIELDS if not wanted(name, 'sections')]
+        if not wanted('recommendations', 'recommendations'):
+            deferred.append('recommendations')
+        if deferred:
+            queryset = queryset.defer(*deferred)
+        
+        if wanted('missing_roles', 'missing_roles'):
+            queryset = queryset.prefetch_related(Prefetch(
+                'missing_roles',
+                queryset=MissingRole.objects.select_related('canonical_title'),
+            ))
+        return queryset
+    
     @action(detail=False, methods=['post'])
     def trigger(self, request):
         """
@@ -325,8 +522,15 @@ class AnalysisRunViewSet(viewsets.ReadOnlyModelViewSet):
         Body:
         {
             "departments": ["Engineering", "Product"],  // Optional
-            "include_benchmark": false  // Optional
+            "include_benchmark": false,  // Optional
+            "mode": "full",  // Optional: "fast" skips the LLM and returns computed findings
+            "background": false  // Optional: return 202 at once and run on the job queue
         }
+        
+        A request identical to one already running (same departments, same
+        input data) waits for that run and returns it with 200 instead of 201.
+        In the background, the run (new or joined) is returned immediately with
+        its events_url; follow progress there.
         """
         serializer = TriggerAnalysisSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -335,132 +539,128 @@ class AnalysisRunViewSet(viewsets.ReadOnlyModelViewSet):
         departments = serializer.validated_data.get('departments', [])
         include_benchmark = serializer.validated_data.get('include_benchmark', False)
         
-        # Create analysis run record
-        analysis_run = AnalysisRun.objects.create(
-            status='running',
-        )
+        if serializer.validated_data.get('mode') == 'fast':
+            return Response(fast_analysis(departments))
+        
+        if serializer.validated_data.get('background'):
+            try:
+                analysis_run, joined = submit_analysis(departments)
+            except AnalysisQueueFull as e:
+                return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            data = AnalysisRunSerializer(analysis_run).data
+            data['events_url'] = reverse('analysisrun-events', args=[analysis_run.id], request=request)
+            return Response(data, status=status.HTTP_200_OK if joined else status.HTTP_202_ACCEPTED)
         
         try:
-            start_time = time.time()
-            
-            # Load data from database
-            if departments:
-                job_roles_qs = JobRole.objects.filter(department__in=departments)
-                employees_qs = Employee.objects.filter(department__in=departments)
-            else:
-                job_roles_qs = JobRole.objects.all()
-                employees_qs = Employee.objects.all()
-            
-            # Convert to dictionaries for the AI agents
-            job_roles = []
-            for role in job_roles_qs:
-                job_roles.append({
-                    'role_id': role.role_id,
-                    'role_title': role.role_title,
-                    'department': role.department,
-                    'level': role.level,
-                    'responsibilities': role.responsibilities,
-                    'required_skills': role.required_skills,
-                    'reports_to': role.reports_to,
-                    'current_headcount': role.current_headcount,
-                    'team_size': role.team_size,
-                })
-            
-            employees = []
-            for emp in employees_qs:
-                employees.append({
-                    'employee_id': emp.employee_id,
-                    'name': emp.name,
-                    'role_id': emp.role.role_id,
-                    'department': emp.department,
-                    'workload_status': emp.workload_status,
-                    'skills': emp.skills,
-                })
-            
-            dept_list = list(job_roles_qs.values_list('department', flat=True).distinct())
-            
-            # Retrieve previous recommendations to avoid duplicates
-            previous_recommendations = []
-            previous_runs = AnalysisRun.objects.filter(
-                status='completed'
-            ).exclude(id=analysis_run.id).order_by('-run_date')[:5]  # Get last 5 completed runs
-            
-            for prev_run in previous_runs:
-                prev_missing_roles = prev_run.missing_roles.all()
-                for mr in prev_missing_roles:
-                    previous_recommendations.append({
-                        'role_title': mr.recommended_role_title,
-                        'department': mr.department,
-                        'level': mr.level,
-                        'gap_type': mr.gap_type,
-                        'justification': mr.justification,
-                        'expected_impact': mr.expected_impact,
-                        'priority': mr.priority,
-                        'recommended_headcount': mr.recommended_headcount,
-                        'estimated_timeline': mr.estimated_timeline,
-                        'required_skills': mr.required_skills,
-                        'responsibilities': mr.responsibilities,
-                    })
-            
-            # Run AI analysis
-            result = run_analysis(
-                job_roles=job_roles,
-                employees=employees,
-                departments=dept_list,
-                previous_recommendations=previous_recommendations
-            )
-            
-            execution_time = time.time() - start_time
-            
-            # Update analysis run with results
-            analysis_run.status = 'completed' if result['success'] else 'failed'
-            analysis_run.total_roles_analyzed = len(job_roles)
-            analysis_run.total_employees_analyzed = len(employees)
-            analysis_run.departments_analyzed = dept_list
-            analysis_run.execution_time_seconds = round(execution_time, 2)
-            
-            if result['success']:
-                analysis_run.org_structure_gaps = result.get('org_structure_analysis', '')
-                analysis_run.responsibility_gaps = result.get('responsibility_analysis', '')
-                analysis_run.workload_gaps = result.get('workload_analysis', '')
-                analysis_run.skills_gaps = result.get('skills_analysis', '')
-                analysis_run.recommendations = result.get('recommendations', [])
-                
-                # Create MissingRole records
-                for rec in result.get('recommendations', []):
-                    MissingRole.objects.create(
-                        analysis_run=analysis_run,
-                        recommended_role_title=rec.get('role_title', 'Unknown'),
-                        department=rec.get('department', 'Unknown'),
-                        level=rec.get('level', 'mid'),
-                        gap_type=rec.get('gap_type', 'unknown'),
-                        justification=rec.get('justification', ''),
-                        expected_impact=rec.get('expected_impact', ''),
-                        priority=rec.get('priority', 'medium'),
-                        recommended_headcount=rec.get('recommended_headcount', 1),
-                        estimated_timeline=rec.get('estimated_timeline', ''),
-                        required_skills=rec.get('required_skills', []),
-                        responsibilities=rec.get('responsibilities', []),
-                    )
-            else:
-                analysis_run.error_message = result.get('error', 'Unknown error')
-            
-            analysis_run.save()
+            # An identical analysis already in flight (any worker) is joined instead of repeated
+            analysis_run, _, joined = run_or_join_analysis(departments)
             
             # Return result
-            serializer = AnalysisRunSerializer(analysis_run)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            serializer = AnalysisRunSerializer(analysis_run, expand=['missing_roles'])
+            return Response(serializer.data, status=status.HTTP_200_OK if joined else status.HTTP_201_CREATED)
         
         except Exception as e:
-            # Mark as failed
-            analysis_run.status = 'failed'
-            analysis_run.error_message = str(e)
-            analysis_run.save()
-            
+            # The run itself is marked failed by run_or_join_analysis
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+    
+    @action(detail=True, methods=['post'])
+    def resume(self, request, pk=None):
+        """
+        Resume a failed analysis run from its last completed node
+        
+        Agent outputs that were already computed are reused, so retrying
+        after e.g. a synthesis failure only repeats the failed LLM call. A run
+        whose worker stopped mid-run is failed first and can be resumed too.
+        """
+        recover_stale_runs(pk)
+        analysis_run = AnalysisRun.objects.filter(pk=pk).first()
+        if analysis_run is None:
+            return Response({'error': 'Analysis run not found'}, status=status.HTTP_404_NOT_FOUND)
+        if analysis_run.status != 'failed':
+            return Response(
+                {'error': f'Only failed runs can be resumed (status: {analysis_run.status})'},
+                status=status.HTTP_409_CONFLICT
+            )
+        if not can_resume_analysis(analysis_run.id):
+            return Response(
+                {'error': 'No checkpoint available for this run; trigger a new analysis instead'},
+                status=status.HTTP_409_CONFLICT
+            )
+        if not claim_failed_run(analysis_run):
+            return Response(
+                {'error': f'The run is already being resumed (status: {analysis_run.status})'},
+                status=status.HTTP_409_CONFLICT
+            )
+        
+        try:
+            execute_analysis_run(analysis_run, resume=True)
+        except Exception as e:
+            mark_run_failed(analysis_run, str(e))
             return Response(
                 {'error': str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+        
+        serializer = AnalysisRunSerializer(analysis_run, expand=['missing_roles'])
+        return Response(serializer.data)
+    
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        """
+        Cancel a pending or running analysis run
+        
+        The run is marked cancelled immediately and its queue slot goes to the
+        next waiting run; the executing worker stops at the next node or
+        streamed model chunk. Sections and recommendations saved so far are kept.
+        """
+        analysis_run = AnalysisRun.objects.filter(pk=pk).first()
+        if analysis_run is None:
+            return Response({'error': 'Analysis run not found'}, status=status.HTTP_404_NOT_FOUND)
+        if not cancel_analysis_run(analysis_run):
+            return Response(
+                {'error': f'Only pending or running runs can be cancelled (status: {analysis_run.status})'},
+                status=status.HTTP_409_CONFLICT
+            )
+        
+        serializer = AnalysisRunSerializer(analysis_run)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+    
+    @action(detail=True, methods=['get'], renderer_classes=[JSONRenderer, EventStreamRenderer])
+    def events(self, request, pk=None):
+        """
+        Progress events of an analysis run as server-sent events
+        
+        Replays the run's recorded events, then streams new ones live until
+        run_completed, run_failed or run_cancelled. Event types: run_started,
+        node_started, node_text (section text deltas), node_finished (elapsed
+        time, tokens, cost, section text), recommendation, run_completed,
+        run_failed, run_cancelled.
+        
+        Reconnecting clients resume after the Last-Event-ID header (or ?after=<event id>).
+        """
+        if not AnalysisRun.objects.filter(pk=pk).exists():
+            return Response({'error': 'Analysis run not found'}, status=status.HTTP_404_NOT_FOUND)
+        # Ends the stream of a run whose worker stopped
+        recover_stale_runs(pk)
+        cursor = request.META.get('HTTP_LAST_EVENT_ID') or request.query_params.get('after') or 0
+        try:
+            after_id = int(cursor)
+        except (TypeError, ValueError):
+            return Response({'error': f"Invalid event id: {cursor}"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        def frames():
+            yield 'retry: 3000\n\n'
+            for payload in stream_events(int(pk), after_id):
+                yield format_sse(payload)
+        
+        response = StreamingHttpResponse(frames(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Proxies (nginx) must not buffer the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
     
     @action(detail=True, methods=['get'])
     def recommendations(self, request, pk=None):
@@ -472,8 +672,8 @@ class AnalysisRunViewSet(viewsets.ReadOnlyModelViewSet):
     
     @action(detail=False, methods=['get'])
     def latest(self, request):
-        """Get the latest analysis run"""
-        latest_run = AnalysisRun.objects.filter(status='completed').order_by('-run_date').first()
+        """Get the latest analysis run (accepts ?fields= and ?expand=)"""
+        latest_run = self.get_queryset().filter(status='completed').order_by('-run_date').first()
         
         if not latest_run:
             return Response(
@@ -481,40 +681,213 @@ class AnalysisRunViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        serializer = AnalysisRunSerializer(latest_run)
+        serializer = self.get_serializer(latest_run)
         return Response(serializer.data)
+    
+    @action(detail=True, methods=['get'], url_path=r'sections/(?P<section>[a-z_]+)')
+    def sections(self, request, pk=None, section=None):
+        """
+        Get a single LLM section text for an analysis run
+        
+        section: org_structure_gaps, responsibility_gaps, workload_gaps or skills_gaps
+        """
+        if section not in AnalysisRun.SECTION_FIELDS:
+            return Response(
+                {'error': f"Unknown section '{section}'. Choose from: {', '.join(AnalysisRun.SECTION_FIELDS)}"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        row = AnalysisRun.objects.filter(pk=pk).values('id', section).first()
+        if row is None:
+            return Response({'error': 'Analysis run not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response({
+            'analysis_run_id': row['id'],
+            'section': section,
+            'content': row[section] or '',
+        })
 
 
-class MissingRoleViewSet(viewsets.ReadOnlyModelViewSet):
+class MissingRoleViewSet(SkillFilterViewSetMixin, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint for viewing missing role recommendations
+    
+    by_priority / by_department accept:
+        run=latest|<id>           Only recommendations from one analysis run
+        since=<date or datetime>  Only recommendations created at or after this time
+        limit=<n>                 Max recommendations per group (default 50, max 500)
+        group_by=canonical_title  Sub-group each bucket by canonical title
+    
+    All endpoints accept skill=<name>[,<name>...] to filter by required skills.
     """
-    queryset = MissingRole.objects.all().select_related('analysis_run')
+    queryset = MissingRole.objects.all().select_related('analysis_run', 'canonical_title')
     serializer_class = MissingRoleSerializer
     
-    @action(detail=False, methods=['get'])
-    def by_priority(self, request):
-        """Get missing roles grouped by priority"""
-        priorities = ['critical', 'high', 'medium', 'low']
-        result = {}
+    PRIORITIES = ['critical', 'high', 'medium', 'low']
+    DEFAULT_GROUP_LIMIT = 50
+    MAX_GROUP_LIMIT = 500
+    
+    def _grouped_queryset(self, request):
+        """
+        Build the single ordered queryset used by the grouping endpoints
+        
+        Raises:
+            ValueError: If a query parameter is invalid
+        """
+        queryset = self.get_queryset()
+        
+        run = request.query_params.get('run')
+        if run == 'latest':
+            latest_run = AnalysisRun.objects.filter(
+                status='completed'
+            ).order_by('-run_date').values('id')[:1]
+            queryset = queryset.filter(analysis_run_id=Subquery(latest_run))
+        elif run:
+            if not run.isdigit():
+                raise ValueError("run must be 'latest' or an analysis run id")
+            queryset = queryset.filter(analysis_run_id=int(run))
+        
+        since = request.query_params.get('since')
+        if since:
+            since_dt = parse_datetime(since)
+            if since_dt is None:
+                since_date = parse_date(since)
+                if since_date is None:
+                    raise ValueError("since must be an ISO date or datetime")
+                since_dt = datetime.combine(since_date, datetime.min.time())
+            if timezone.is_naive(since_dt):
+                since_dt = timezone.make_aware(since_dt)
+            queryset = queryset.filter(created_at__gte=since_dt)
+        
+        return queryset.order_by('-analysis_run_id', 'id')
+    
+    def _group_limit(self, request):
+        """Parse the per-group limit query parameter"""
+        limit = request.query_params.get('limit', self.DEFAULT_GROUP_LIMIT)
+        try:
+            limit = int(limit)
+        except (TypeError, ValueError):
+            raise ValueError("limit must be an integer")
+        return max(1, min(limit, self.MAX_GROUP_LIMIT))
+    
+    def _group_response(self, request, key_field, keys=None):
+        """
+        Fetch the first `limit` recommendations of each group in one query, then group and serialize them
         
-        for priority in priorities:
-            roles = MissingRole.objects.filter(priority=priority).order_by('-analysis_run__run_date')
-            result[priority] = MissingRoleSerializer(roles, many=True).data
+        Args:
+            request: Current request
+            key_field: Model attribute to group by
+            keys: Optional fixed list of group keys (always present in the result)
+        """
+        try:
+            queryset = self._grouped_queryset(request)
+            limit = self._group_limit(request)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # The per-group limit is applied in SQL, so only the returned rows are read
+        queryset = queryset.annotate(group_rank=Window(
+            RowNumber(),
+            partition_by=[F(key_field)],
+            order_by=[F('analysis_run_id').desc(), F('id').asc()],
+        )).filter(group_rank__lte=limit)
+        
+        grouped = {key: [] for key in keys} if keys else {}
+        for missing_role in queryset:
+            grouped.setdefault(getattr(missing_role, key_field), []).append(missing_role)
+        
+        by_canonical = request.query_params.get('group_by') == 'canonical_title'
+        result = {}
+        for key in (keys or sorted(grouped)):
+            data = MissingRoleSerializer(grouped[key], many=True).data
+            result[key] = group_by_canonical_title(data) if by_canonical else data
         
         return Response(result)
     
+    @action(detail=True, methods=['get'])
+    def candidates(self, request, pk=None):
+        """
+        Top internal candidates for a recommended missing role
+        
+        Scores employees by IDF-weighted overlap with the role's required_skills,
+        minus a workload penalty that prefers underutilized employees.
+        
+        Query params:
+            k=<n>  Number of candidates (default 10, max 100)
+        """
+        missing_role = self.get_object()
+        try:
+            k = max(1, min(int(request.query_params.get('k', DEFAULT_TOP_K)), 100))
+        except ValueError:
+            return Response({'error': 'k must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        candidates = get_candidate_index().top_candidates(missing_role.required_skills, k=k)
+        role_titles = dict(JobRole.objects.filter(
+            role_id__in={c['role_id'] for c in candidates}
+        ).values_list('role_id', 'role_title'))
+        for candidate in candidates:
+            candidate['role_title'] = role_titles.get(candidate['role_id'])
+        
+        return Response({
+            'missing_role_id': missing_role.id,
+            'recommended_role_title': missing_role.recommended_role_title,
+            'department': missing_role.department,
+            'required_skills': missing_role.required_skills,
+            'candidates': candidates,
+        })
+    
+    @action(detail=False, methods=['get'])
+    def by_priority(self, request):
+        """Get missing roles grouped by priority"""
+        return self._group_response(request, 'priority', keys=self.PRIORITIES)
+    
     @action(detail=False, methods=['get'])
     def by_department(self, request):
         """Get missing roles grouped by department"""
-        departments = MissingRole.objects.values_list('department', flat=True).distinct()
-        result = {}
-        
-        for dept in departments:
-            roles = MissingRole.objects.filter(department=dept).order_by('-analysis_run__run_date')
-            result[dept] = MissingRoleSerializer(roles, many=True).data
-        
-        return Response(result)
+        return self._group_response(request, 'department')
+
+
+@api_view(['GET'])
+def skills_coverage(request):
+    """
+    Org-wide skill coverage matrix summary
+    
+    Query params:
+        departments=A,B      Restrict to these departments
+        risk_threshold=<n>   Required skills with at most n holders are at risk (default 1)
+    """
+    try:
+        risk_threshold = int(request.query_params.get('risk_threshold', DEFAULT_RISK_THRESHOLD))
+    except ValueError:
+        return Response({'error': 'risk_threshold must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response(org_skill_coverage(parse_csv_param(request, 'departments'), risk_threshold))
+
+
+@api_view(['GET'])
+def dashboard_snapshot(request):
+    """
+    All dashboard numbers in one response, served from the materialized snapshot
+    
+    Responses carry an ETag of the snapshot version; send it back in
+    If-None-Match to get 304 Not Modified until the data changes.
+    """
+    snapshot = dashboard.get_snapshot()
+    etag = f'"dashboard-{snapshot.version}"'
+    
+    # Compression middleware may weaken the ETag (W/"..."), so compare the opaque part
+    if_none_match = request.headers.get('If-None-Match', '')
+    if if_none_match.removeprefix('W/') == etag:
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response({
+            'version': snapshot.version,
+            'refreshed_at': snapshot.refreshed_at,
+            **snapshot.data,
+        })
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    return response
 
 
 @api_view(['POST'])